@@ -0,0 +1,142 @@
+# a contention benchmark of the ticket inventory: many threads reserve, pay for and release seats
+# of the same few ticket types and dates at once, and at the end no seat may be sold twice
+# run it from this folder, for example:
+#   python bench_inventory.py --threads 32 --attempts 2000 --capacity 20000
+#   python bench_inventory.py --threads 16 --attempts 200 --model   (through the model, with the order files)
+import argparse  # this is used to read the command line options
+import json  # this is used to print (and save) the results
+import os  # this is used to work inside the temporary folder
+import random  # this is used to choose what every attempt does
+import tempfile  # this is used for the temporary folder of --model
+import threading  # this is used to run the customers at the same time
+import time  # this is used to time every attempt
+from inventory import Inventory, LOCK_STRIPES  # the ticket inventory
+
+TICKET_TYPES = ("Single Race Pass", "Weekend Package", "Season Membership", "Group Discount Pack")
+
+#one customer: reserve seats, then pay for them (commit) or change their mind (release)
+def run_customer(reserve, commit, release, args, seed, dates, latencies, counts):
+    rng = random.Random(seed)
+    for _ in range(args.attempts):
+        ticket_type, date, quantity = rng.choice(TICKET_TYPES), rng.choice(dates), rng.randint(1, 4)
+        start = time.perf_counter()
+        hold_id = reserve(ticket_type, date, quantity)
+        if hold_id is None:
+            outcome = "sold_out"
+        elif rng.random() < args.release_share:
+            release(hold_id)
+            outcome = "released"
+        else:
+            outcome = "sold" if commit(hold_id, ticket_type, date, quantity) else "expired"
+        latencies.append(time.perf_counter() - start)
+        counts[outcome] = counts.get(outcome, 0) + 1
+        if outcome == "sold":
+            counts["seats"] = counts.get("seats", 0) + quantity
+
+#return the value below which the given share of the sorted latencies fall
+def percentile(sorted_values, share):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(share * len(sorted_values)))]
+
+#run all customers and return the timings and counts
+def run_threads(reserve, commit, release, args, dates):
+    latencies, counts = [[] for _ in range(args.threads)], [{} for _ in range(args.threads)]
+    threads = [threading.Thread(target=run_customer,
+                                args=(reserve, commit, release, args, args.seed + n, dates, latencies[n], counts[n]))
+               for n in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    totals = {}
+    for thread_counts in counts:
+        for name, value in thread_counts.items():
+            totals[name] = totals.get(name, 0) + value
+    all_latencies = sorted(value for thread_latencies in latencies for value in thread_latencies)
+    return {"attempts": len(all_latencies), "seconds": round(elapsed, 3),
+            "attempts_per_second": round(len(all_latencies) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(all_latencies, 0.50) * 1000, 4),
+            "p99_ms": round(percentile(all_latencies, 0.99) * 1000, 4),
+            "outcomes": totals}
+
+#check that the counters match what the customers saw, it returns a list of problems
+def check_inventory(status, result, args, dates):
+    problems = []
+    sold = 0
+    for ticket_type in TICKET_TYPES:
+        for date in dates:
+            counters = status(ticket_type, date)
+            sold += counters["sold"]
+            if counters["sold"] > counters["capacity"]:
+                problems.append(f"{ticket_type} {date}: {counters['sold']} sold, capacity {counters['capacity']}")
+            if counters["held"]:
+                problems.append(f"{ticket_type} {date}: {counters['held']} seats still held")
+    if sold != result["outcomes"].get("seats", 0):
+        problems.append(f"{sold} seats sold, but the customers bought {result['outcomes'].get('seats', 0)}")
+    return problems
+
+#the benchmark against the inventory alone
+def bench_inventory(args, dates, stripes):
+    inventory = Inventory({ticket_type: args.capacity for ticket_type in TICKET_TYPES}, stripes=stripes)
+    result = run_threads(inventory.reserve, inventory.commit, inventory.release, args, dates)
+    result["stripes"] = stripes
+    result["problems"] = check_inventory(inventory.status, result, args, dates)
+    return result
+
+#the benchmark through the model, so every sale is also saved as an order
+def bench_model(args, dates):
+    from model import TicketBookingModel  # Import the model layer
+    here = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        try:
+            model = TicketBookingModel(storage="pickle", journal=True, group_commit_window=0.005)
+            for ticket_type in TICKET_TYPES:
+                for date in dates:
+                    model.set_capacity(ticket_type, date, args.capacity)
+
+            def commit(hold_id, ticket_type, date, quantity):
+                return model.purchase_ticket("bench", ticket_type, quantity, "Credit Card", race_date=date,
+                                             hold_id=hold_id) is not None
+
+            reserve = lambda ticket_type, date, quantity: model.reserve_tickets(ticket_type, quantity, race_date=date)
+            result = run_threads(reserve, commit, model.release_hold, args, dates)
+            result["problems"] = check_inventory(model.inventory.status, result, args, dates)
+            orders = sum(order["quantity"] for order in model.get_orders())
+            if orders != result["outcomes"].get("seats", 0):
+                result["problems"].append(f"{orders} seats in the orders, but {result['outcomes'].get('seats', 0)} sold")
+            model.close()
+        finally:
+            os.chdir(here)
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Contention benchmark of the ticket inventory")
+    parser.add_argument("--threads", type=int, default=32, help="customers at the same time")
+    parser.add_argument("--attempts", type=int, default=2000, help="reservations per customer")
+    parser.add_argument("--dates", type=int, default=2, help="race days (few days = more contention)")
+    parser.add_argument("--capacity", type=int, default=20000, help="seats per ticket type and date")
+    parser.add_argument("--release-share", type=float, default=0.2, help="share of the holds that are released")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--model", action="store_true", help="go through the model and save the orders")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    dates = [f"2025-07-{day:02d}" for day in range(5, 5 + args.dates)]
+    if args.model:
+        results = {"model": bench_model(args, dates)}
+    else:
+        #one lock for everything against the striped locks the program uses
+        results = {"one_lock": bench_inventory(args, dates, 1), "striped": bench_inventory(args, dates, LOCK_STRIPES)}
+    report = {"config": vars(args), "results": results}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    if any(result["problems"] for result in results.values()):
+        raise SystemExit(1)
@@ -0,0 +1,54 @@
+# a benchmark that compares the memory used by a list of order dictionaries and by the OrderStore
+# run it from this folder: python bench_memory.py --orders 200000
+import argparse  # this is used to read the command line options
+import gc  # this is used to clean up between the measurements
+import pickle  # this is used to load the orders the same way the program loads orders.pkl
+import random  # this is used to create the test orders
+import tracemalloc  # this is used to measure the memory used by the loaded orders
+from orderstore import OrderStore  # the compact order store
+
+#create test orders that look like the ones the program saves
+def make_orders(count, customers, days):
+    random.seed(1)
+    prices = {"Single Race Pass": 120, "Weekend Package": 300, "Season Membership": 1200, "Group Discount Pack": 1000}
+    orders = []
+    for _ in range(count):
+        ticket_type = random.choice(list(prices))
+        quantity = random.randint(1, 10)
+        orders.append({
+            "username": f"customer{random.randrange(customers)}",
+            "ticket_type": ticket_type,
+            "quantity": quantity,
+            "total_cost": prices[ticket_type] * quantity,
+            "payment_method": random.choice(["Credit Card", "Debit Card"]),
+            "date": f"2025-{random.randint(1, 12):02d}-{random.randint(1, days):02d}"
+        })
+    return orders
+
+#return the bytes still allocated after loading the pickled data
+def measure_load(data):
+    gc.collect()
+    tracemalloc.start()
+    loaded = pickle.loads(data)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del loaded
+    return size
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory used per million orders")
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--customers", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=28)
+    args = parser.parse_args()
+
+    orders = make_orders(args.orders, args.customers, args.days)
+    list_bytes = measure_load(pickle.dumps(orders))
+    store_bytes = measure_load(pickle.dumps(OrderStore(orders)))
+
+    scale = 1000000 / args.orders
+    print(f"{'Orders measured:':28}{args.orders}")
+    print(f"{'List of dictionaries:':28}{list_bytes * scale / 2**20:8.1f} MB per million orders")
+    print(f"{'OrderStore (array columns):':28}{store_bytes * scale / 2**20:8.1f} MB per million orders")
+    print(f"{'Saving:':28}{(list_bytes - store_bytes) * scale / 2**20:8.1f} MB per million orders "
+          f"({100 * (1 - store_bytes / list_bytes):.0f}%)")
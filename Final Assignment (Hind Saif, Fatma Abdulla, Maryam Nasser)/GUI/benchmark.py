@@ -0,0 +1,206 @@
+# a reproducible benchmark of the booking model and controller
+# run it from this folder, for example:
+#   python benchmark.py --accounts 10000 --orders 200000 --output results.json
+#   python benchmark.py --orders 200000 --baseline baseline.json --margin 0.25
+# it works in a temporary folder, so the real accounts and orders files are never touched
+import argparse  # this is used to read the command line options
+import json  # this is used to write the results and read the baseline
+import os  # this is used to work inside the temporary folder
+import platform  # this is used to record where the benchmark ran
+import random  # this is used to create the synthetic workload
+import statistics  # this is used for the median of the timings
+import sys  # this is used for the exit code when the baseline is exceeded
+import tempfile  # this is used for the temporary folder
+import time  # this is used to time every operation
+from datetime import date, timedelta  # this is used for the order dates
+from types import SimpleNamespace  # this is used to call controller logic without a window
+from model import DEFAULT_STORAGE, TicketBookingModel  # Import the model layer
+
+# ---------- Synthetic Workload ----------
+
+#how often each ticket type, payment method and quantity is chosen
+TICKET_WEIGHTS = {"Single Race Pass": 55, "Weekend Package": 25, "Season Membership": 5, "Group Discount Pack": 15}
+PAYMENT_WEIGHTS = {"Credit Card": 65, "Debit Card": 35}
+QUANTITY_WEIGHTS = {1: 40, 2: 30, 3: 12, 4: 10, 5: 5, 6: 3}
+
+#create N usernames and M orders that look like a real season: most tickets are bought in the
+#weeks before one of the race weekends
+def make_workload(accounts, orders, seed):
+    rng = random.Random(seed)
+    prices = {"Single Race Pass": 120, "Weekend Package": 300, "Season Membership": 1200, "Group Discount Pack": 1000}
+    usernames = [f"customer{number}" for number in range(accounts)]
+    race_days = [date(2025, 3, 2) + timedelta(weeks=2 * race) for race in range(24)]
+
+    ticket_types, ticket_weights = zip(*TICKET_WEIGHTS.items())
+    payments, payment_weights = zip(*PAYMENT_WEIGHTS.items())
+    quantities, quantity_weights = zip(*QUANTITY_WEIGHTS.items())
+
+    workload = []
+    for _ in range(orders):
+        ticket_type = rng.choices(ticket_types, ticket_weights)[0]
+        quantity = rng.choices(quantities, quantity_weights)[0]
+        days_before = min(int(rng.expovariate(1 / 14)), 120)
+        race_day = rng.choice(race_days)
+        workload.append({
+            "username": usernames[int(rng.paretovariate(1.2)) % accounts],  #a few customers buy a lot
+            "ticket_type": ticket_type,
+            "quantity": quantity,
+            "total_cost": prices[ticket_type] * quantity,
+            "payment_method": rng.choices(payments, payment_weights)[0],
+            "date": (race_day - timedelta(days=days_before)).isoformat(),
+            "race_date": race_day.isoformat()
+        })
+    return usernames, workload
+
+#write the workload into the storage of the current folder
+def create_data(storage, usernames, workload):
+    model = TicketBookingModel(storage=storage)
+    for username in usernames:
+        model.add_account(username, "password")
+    for start in range(0, len(workload), 50000):
+        #copies, because adding an order sets its order_id and the workload is used again for the next backend
+        model.storage.add_orders([dict(order) for order in workload[start:start + 50000]])
+    #the orders keep their old dates, so they are added to the storage directly and the model's indexes
+    #are built again from the storage before close saves them
+    model.sales_summary = model.storage.sales_totals()
+    model.customer_stats = model.storage.customer_totals()
+    model.close()
+
+#make a new folder inside the temporary folder and work in it, so a backend never finds the files of another one
+def enter_folder(parent, name):
+    folder = os.path.join(parent, name)
+    os.mkdir(folder)
+    os.chdir(folder)
+
+# ---------- Timing ----------
+
+#run a function several times and return its timings in milliseconds
+def time_calls(function, repeat, setup=None):
+    timings = []
+    for run in range(repeat):
+        argument = setup(run) if setup else None
+        start = time.perf_counter()
+        function(argument) if setup else function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"runs": repeat, "median_ms": round(statistics.median(timings), 4),
+            "p95_ms": round(sorted(timings)[min(repeat - 1, int(0.95 * repeat))], 4),
+            "max_ms": round(max(timings), 4)}
+
+#time the model startup (open and close, so every run starts from the files)
+def bench_startup(storage, repeat):
+    def start_model():
+        TicketBookingModel(storage=storage).close()
+    return time_calls(start_model, repeat)
+
+#time the model operations on an already opened model
+def bench_model(storage, usernames, repeat, rng):
+    results = {}
+    model = TicketBookingModel(storage=storage)
+    try:
+        ticket_types = list(model.get_ticket_info())
+        results["purchase_ticket"] = time_calls(
+            lambda _: model.purchase_ticket(rng.choice(usernames), rng.choice(ticket_types), 1, "Credit Card"),
+            repeat, setup=lambda run: None)
+        results["delete_order"] = time_calls(
+            lambda index: model.delete_order(index), repeat,
+            setup=lambda run: rng.randrange(len(model.get_orders())))
+        results["get_customer_orders_count"] = time_calls(
+            lambda username: model.get_customer_orders_count(username), repeat,
+            setup=lambda run: rng.choice(usernames))
+        #the controller's summary report only needs the model, so it is called without a window
+        from controller import TicketBookingController
+        holder = SimpleNamespace(model=model)
+        results["generate_ticket_sales_summary"] = time_calls(
+            lambda: TicketBookingController.generate_ticket_sales_summary(holder), repeat)
+    finally:
+        model.close()
+    return results
+
+#time building the Delete Orders screen against a hidden Tk root (skipped if there is no display)
+def bench_display_orders(repeat):
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:  # no display, or Tk is not installed
+        return {"skipped": f"Tk is not available: {e}"}
+    root.withdraw()
+    from controller import TicketBookingController
+    controller = TicketBookingController(root)  #uses the files in the current (temporary) folder
+    try:
+        def build_screen():
+            controller.delete_orders_screen()
+            root.update_idletasks()  #make Tk do the layout work as well
+        return time_calls(build_screen, repeat)
+    finally:
+        controller.model.close()
+        root.destroy()
+
+# ---------- Baseline ----------
+
+#compare the medians with the baseline, it returns the list of operations that got too slow
+def compare_with_baseline(results, baseline, margin):
+    failures = []
+    for name, result in results.items():
+        old = baseline.get("results", {}).get(name, {})
+        if "median_ms" in result and "median_ms" in old:
+            limit = old["median_ms"] * (1 + margin)
+            if result["median_ms"] > limit:
+                failures.append(f"{name}: {result['median_ms']:.3f} ms > {limit:.3f} ms "
+                                f"(baseline {old['median_ms']:.3f} ms + {margin:.0%})")
+    return failures
+
+# ---------- Main Program ----------
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the booking model and controller")
+    parser.add_argument("--accounts", type=int, default=5000)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--storage", choices=["pickle", "snapshot", "sharded", "sqlite"], default=DEFAULT_STORAGE)
+    parser.add_argument("--repeat", type=int, default=50, help="runs per operation")
+    parser.add_argument("--startup-repeat", type=int, default=3, help="runs of the startup benchmark")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="fail if a median is slower than in this JSON file")
+    parser.add_argument("--margin", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    args = parser.parse_args()
+
+    usernames, workload = make_workload(args.accounts, args.orders, args.seed)
+    rng = random.Random(args.seed)
+    here = os.getcwd()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    with tempfile.TemporaryDirectory() as folder:
+        try:
+            enter_folder(folder, args.storage)
+            create_data(args.storage, usernames, workload)
+            results = {"startup": bench_startup(args.storage, args.startup_repeat)}
+            results.update(bench_model(args.storage, usernames, args.repeat, rng))
+            enter_folder(folder, "gui")
+            create_data(DEFAULT_STORAGE, [], workload)  #the storage the GUI reads its orders from
+            results["display_orders"] = bench_display_orders(max(1, args.repeat // 10))
+        finally:
+            os.chdir(here)
+
+    report = {
+        "config": {"accounts": args.accounts, "orders": args.orders, "storage": args.storage,
+                   "repeat": args.repeat, "seed": args.seed},
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "results": results
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            failures = compare_with_baseline(results, json.load(file), args.margin)
+        if failures:
+            print("\nSlower than the baseline:", file=sys.stderr)
+            for failure in failures:
+                print("  " + failure, file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,43 @@
+import argparse  #for the optional metrics and profiling options
 import tkinter as tk  #for creating the main application window
-from model import TicketBookingModel  # Import the model layer
+from datetime import datetime  #for checking the dates of the sales report
+from export import ExportJob, export_orders, export_sales_report  # the exports that run on a worker thread
+from metrics import Metrics, MODEL_OPERATIONS  # the optional operation metrics
+from model import TicketBookingModel, race_day  # Import the model layer
 from view import TicketBookingView  # Import the view layer
 
 class TicketBookingController:
     ''' a class that connects the model and view'''
-    def __init__(self, root):
+    #the handlers that are measured when metrics are on
+    HANDLERS = ("show_account_menu", "show_ticket_menu", "show_admin_menu", "add_account", "login", "edit_account",
+                "delete_account", "display_customer_details", "delete_orders_screen", "show_orders_page",
+                "delete_orders", "purchase_ticket", "apply_discount", "disable_discount", "add_discount_rule",
+                "remove_discount_rule", "generate_ticket_sales_summary", "show_sales_between", "start_export")
+
+    def __init__(self, root, metrics=False, profile=(), profile_rate=0.1):
+        #the metrics are off by default, then nothing is wrapped and nothing is measured
+        self.metrics = None
+        if metrics or profile:
+            self.metrics = Metrics(profile, profile_rate)
+            self.metrics.instrument_storage()  #before the model, so loading the files is measured too
+
         #create instances of model and view
-        self.model = TicketBookingModel()  # this will handle the data (accounts, tickets, orders)
+        #this will handle the data (accounts, tickets, orders): orders are read lazily from a snapshot file
+        #so startup does not depend on the order history, and accounts are saved off the GUI thread
+        self.model = TicketBookingModel(background_writes=True)
+        if self.metrics:
+            self.metrics.instrument(self.model, MODEL_OPERATIONS, "model")
+            self.metrics.instrument(self, self.HANDLERS, "controller")  #before the view creates its buttons
         self.view = TicketBookingView(root, self)  #and this will handle the GUI, passing self as the controller
+        self.root = root
+        self.export_job = None  #the running (or last) export
+        self.export_file = None
+
+        #make sure pending writes are finished before the window closes
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        #check regularly if the background saves have finished
+        self.root.after(200, self.check_saves)
 
     # ------------------- Navigation Functions -------------------
 
@@ -23,13 +53,30 @@ class TicketBookingController:
             self.login_screen()
         else:
             # Otherwise, it will show ticket selection screen
-            self.view.build_ticket_menu(self.model.get_ticket_info())
+            race_date = self.selected_race_day()
+            if race_date is None:  #the error was shown, so show the seats of today instead
+                self.view.race_date.set("")
+                race_date = race_day()
+            tickets = self.model.get_ticket_info()
+            seats = {ticket_type: self.model.get_availability(ticket_type, race_date)["available"]
+                     for ticket_type in tickets}
+            self.view.build_ticket_menu(tickets, seats, race_date)
+
+    #return the race day entered on the ticket screen (today if it is empty), or None if it is not a date
+    def selected_race_day(self):
+        value = self.view.race_date.get().strip()
+        try:
+            return race_day(value or None)
+        except ValueError:
+            self.view.show_error("Error", f"{value} is not a date (YYYY-MM-DD).")
+            return None
 
     #show the Admin Dashboard
     def show_admin_menu(self):
-        #generate a summary of all ticket sales and pass it to the view
-        ticket_sales = self.generate_ticket_sales_summary()
-        self.view.build_admin_menu(ticket_sales)
+        #get the summary of all ticket sales and revenue and pass it to the view
+        performance = self.metrics.report() if self.metrics else None
+        self.view.build_admin_menu(self.generate_ticket_sales_summary(), self.model.get_sales_summary(), performance,
+                                   list(self.model.get_ticket_info()), self.model.get_price_table())
 
     # ------------------- Account Management Logic -------------------
 
@@ -89,25 +136,39 @@ class TicketBookingController:
             self.view.show_error("Error", "Account not found.")
         self.show_account_menu()
 
-    #display the list of all customers and their order count
+    #display the list of all customers with their order count, tickets and spend
     def display_customer_details(self):
-        #duild a dictionary: {username: number of orders}
-        customers = {user: self.model.get_customer_orders_count(user)
-                     for user in self.model.get_all_customers()}
+        #one call to the model's customer index: {username: {"orders", "quantity", "total_spent"}}
+        customers = self.model.get_all_customer_stats()
         self.view.display_customers(customers)
 
-    #show screen to delete individual orders
+    #show screen to delete orders (the list shows one page at a time)
     def delete_orders_screen(self):
-        orders = self.model.get_orders()
-        self.view.display_orders(orders, self.delete_order)
-
-    #delete a specific order by index
-    def delete_order(self, index):
-        if self.model.delete_order(index):
-            self.view.show_message("Deleted", "Order deleted successfully.")
+        self.view.display_orders(list(self.model.get_ticket_info()), self.show_orders_page, self.delete_orders)
+        self.show_orders_page(0)
+
+    #load one page of orders into the list, filtered by username, date and ticket type (empty = all)
+    def show_orders_page(self, offset, username="", date="", ticket_type=""):
+        filters = [value or None for value in (username.strip(), date.strip(), ticket_type)]
+        total, rows = self.model.get_orders_page(offset, self.view.orders_page_size, *filters)
+        if offset and offset >= total:  #the last page became empty, so go back one page
+            offset = max(0, (total - 1) // self.view.orders_page_size * self.view.orders_page_size)
+            total, rows = self.model.get_orders_page(offset, self.view.orders_page_size, *filters)
+        self.view.show_orders_page(offset, total, rows)
+
+    #delete the selected orders by their order ids (saved once for all of them)
+    def delete_orders(self, order_ids):
+        if not order_ids:
+            self.view.show_error("Error", "Select the orders you want to delete.")
+            return
+        deleted = self.model.delete_orders(order_ids)
+        if not deleted:
+            self.view.show_error("Error", "Could not delete order, it no longer exists.")
+        elif deleted < len(order_ids):  #the list was out of date, some orders were already deleted
+            self.view.show_message("Deleted", f"{deleted} order(s) deleted, the others no longer existed.")
         else:
-            self.view.show_error("Error", "Could not delete order.")
-        self.delete_orders_screen()
+            self.view.show_message("Deleted", f"{deleted} order(s) deleted successfully.")
+        self.view.refresh_orders_page()
 
     # ------------------- Ticket Purchasing Logic -------------------
 
@@ -126,9 +187,17 @@ class TicketBookingController:
         ticket_type = self.view.selected_ticket.get()
         payment_method = self.view.payment_method.get()
         username = self.view.logged_in_user
+        race_date = self.selected_race_day()
+        if race_date is None:
+            return
 
         #process purchase in model and get total cost
-        total_cost = self.model.purchase_ticket(username, ticket_type, quantity, payment_method)
+        total_cost = self.model.purchase_ticket(username, ticket_type, quantity, payment_method, race_date)
+        if total_cost is None:  #not enough seats left on that race day
+            available = self.model.get_availability(ticket_type, race_date)["available"]
+            self.view.show_error("Sold Out", f"Only {available} {ticket_type} ticket(s) are left on {race_date}.")
+            self.show_ticket_menu()
+            return
         self.view.show_message("Purchase Successful", f"Total cost: ${total_cost}")
         self.view.build_main_menu()
 
@@ -138,33 +207,178 @@ class TicketBookingController:
     def apply_discount(self):
         self.model.apply_discount_to_all()
         self.view.show_message("Discount Applied", "All tickets are now 50% off.")
+        self.show_admin_menu()  #show the new prices
 
     #remove the discount and restore original ticket prices
     def disable_discount(self):
         self.model.disable_discount_to_all()
         self.view.show_message("Discount Disabled", "Ticket prices restored.")
+        self.show_admin_menu()
+
+    #turn "YYYY-MM-DD" or "YYYY-MM-DD HH:MM" (local time) into seconds since the epoch,
+    #it returns None for an empty time and False if the time is wrong
+    def check_discount_time(self, value):
+        value = value.strip()
+        if not value:
+            return None
+        for time_format in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+            try:
+                return datetime.strptime(value, time_format).timestamp()
+            except ValueError:
+                pass
+        self.view.show_error("Error", f"{value} is not a time (YYYY-MM-DD or YYYY-MM-DD HH:MM).")
+        return False
+
+    #add a discount for one ticket type (or all of them) that can start and end at a given time
+    def add_discount_rule(self, name, ticket_type, percent, start, end):
+        name = name.strip()
+        if not name:
+            self.view.show_error("Error", "Enter a name for the discount.")
+            return
+        try:
+            percent = int(percent)
+        except ValueError:
+            self.view.show_error("Error", "Enter the discount as a whole percent.")
+            return
+        start, end = self.check_discount_time(start), self.check_discount_time(end)
+        if start is False or end is False:
+            return
+        try:
+            version = self.model.add_discount_rule(name, percent, [ticket_type] if ticket_type else None, start, end)
+        except ValueError as e:
+            self.view.show_error("Error", str(e))
+            return
+        self.view.show_message("Discount Added", f"The discount {name!r} was added (price version {version}).")
+        self.show_admin_menu()
+
+    #remove a discount by its name
+    def remove_discount_rule(self, name):
+        if self.model.remove_discount_rule(name.strip()) is None:
+            self.view.show_error("Error", f"There is no discount called {name.strip()!r}.")
+            return
+        self.view.show_message("Discount Removed", f"The discount {name.strip()!r} was removed.")
+        self.show_admin_menu()
 
     # ------------------- Group Sales Summary -------------------
 
-    #create a report of all ticket sales grouped by date and type
+    #return the report of all ticket sales grouped by date and type
     def generate_ticket_sales_summary(self):
-        summary = {}  # Format: {date: {ticket_type: quantity}}
-
-        for order in self.model.get_orders():
-            date = order.get("date", "Unknown")
-            ticket_type = order.get("ticket_type", "Unknown")
-            quantity = order.get("quantity", 0)
-
-            if date not in summary:
-                summary[date] = {}
-            summary[date][ticket_type] = summary[date].get(ticket_type, 0) + quantity
-
-        return summary
+        #Format: {date: {ticket_type: quantity}}, the model updates it after every purchase and delete
+        return self.model.get_sales_summary()["tickets"]
+
+    #check the From and To dates, it returns (start, end) with None for an empty date, or None if they are wrong
+    def check_date_range(self, start, end):
+        start, end = start.strip() or None, end.strip() or None
+        for value in (start, end):
+            if value is not None:
+                try:
+                    datetime.strptime(value, "%Y-%m-%d")
+                except ValueError:
+                    self.view.show_error("Error", f"{value} is not a date (YYYY-MM-DD).")
+                    return None
+        if start and end and start > end:
+            self.view.show_error("Error", "The From date must be before the To date.")
+            return None
+        return start, end
+
+    #show the tickets and revenue between two dates (an empty date means no limit)
+    def show_sales_between(self, start, end):
+        dates = self.check_date_range(start, end)
+        if dates:
+            self.view.show_sales_range(self.model.get_sales_between(*dates))
+
+    # ------------------- Exporting -------------------
+
+    #export the orders (or the sales report) on a worker thread, so the GUI keeps running during the export
+    def start_export(self, file_name, report=False, file_format="csv", compress=False, start="", end="",
+                     username="", ticket_type=""):
+        if self.export_job and not self.export_job.finished:
+            self.view.show_error("Error", "An export is already running.")
+            return
+        dates = self.check_date_range(start, end)
+        if not dates:
+            return
+        if compress and not file_name.endswith(".gz"):
+            file_name += ".gz"
+        if report:
+            self.export_job = ExportJob(export_sales_report, self.model, file_name, file_format, compress, *dates)
+        else:
+            self.export_job = ExportJob(export_orders, self.model, file_name, file_format, compress,
+                                        username.strip() or None, *dates, ticket_type or None)
+        self.export_file = file_name
+        self.export_job.start()
+        self.view.show_export_progress("Exporting...")
+        self.root.after(100, self.check_export)
+
+    #show the progress of the export, the worker thread only puts it in a queue (Tk is not thread safe)
+    def check_export(self):
+        for kind, value in self.export_job.get_updates():
+            if kind == "progress":
+                self.view.show_export_progress(f"Exporting... {value} rows")
+            elif kind == "done":
+                self.view.show_export_progress(f"{value} rows exported to {self.export_file}")
+                self.view.show_message("Export Finished", f"{value} rows exported to {self.export_file}.")
+            elif kind == "cancelled":
+                self.view.show_export_progress(value)
+            else:
+                self.view.show_export_progress("The export failed.")
+                self.view.show_error("Export Failed", f"Could not export to {self.export_file}: {value}")
+        if not self.export_job.finished:
+            self.root.after(100, self.check_export)
+
+    #stop the running export after its current chunk
+    def cancel_export(self):
+        if self.export_job and not self.export_job.finished:
+            self.export_job.cancel()
+
+    # ------------------- Performance Metrics -------------------
+
+    #save the metrics to a JSON file
+    def dump_metrics(self):
+        if not self.metrics:
+            self.view.show_error("Error", "Metrics are off. Start the program with --metrics.")
+            return
+        try:
+            file_name = self.metrics.dump("metrics.json")
+            self.view.show_message("Metrics Saved", f"The metrics were saved to {file_name}.")
+        except OSError as e:
+            self.view.show_error("Error", f"Could not save the metrics: {e}")
+
+    # ------------------- Background Saving -------------------
+
+    #report the results of the background saves in the GUI
+    def check_saves(self):
+        for file_name, error in self.model.get_write_results():
+            if error:
+                self.view.show_status(f"Could not save {file_name}")
+                self.view.show_error("Save Failed", f"Could not save {file_name}: {error}")
+            else:
+                self.view.show_status("All changes saved.")
+        self.root.after(200, self.check_saves)
+
+    # ------------------- Closing the Application -------------------
+
+    #finish pending writes and close the window
+    def on_close(self):
+        self.view.show_status("Saving...")
+        self.root.update_idletasks()
+        if self.export_job and not self.export_job.finished:  #the export reads the orders, so stop it first
+            self.export_job.cancel()
+            self.export_job.thread.join()
+        self.model.close()
+        self.root.destroy()
 
 # ------------------- Main Program Entry Point -------------------
 
 #start the application
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grand Prix Ticket Booking System")
+    parser.add_argument("--metrics", action="store_true", help="measure the operations (Admin Dashboard)")
+    parser.add_argument("--profile", action="append", default=[], metavar="HANDLER",
+                        help="profile a sample of the calls of this handler (can be repeated)")
+    parser.add_argument("--profile-rate", type=float, default=0.1, help="share of the calls that are profiled")
+    args = parser.parse_args()
+
     root = tk.Tk()  # Create the root Tkinter window
-    TicketBookingController(root)  # Instantiate the controller (this triggers the whole app)
+    TicketBookingController(root, args.metrics, args.profile, args.profile_rate)  # Instantiate the controller (this triggers the whole app)
     root.mainloop()  # Start the Tkinter event loop (GUI runs here)
\ No newline at end of file
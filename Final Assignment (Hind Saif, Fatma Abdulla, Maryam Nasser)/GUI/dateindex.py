@@ -0,0 +1,115 @@
+# Import necessary modules
+from bisect import bisect_left, bisect_right  # this is used to find the days of a date range
+
+# ---------- Classes ----------
+
+class FenwickTree:
+    ''' a class that keeps running totals, so the sum of the first n values takes log(n) steps'''
+    def __init__(self, values=()):
+        #tree[i] holds the sum of the values (i - lowest bit of i, i], tree[0] is not used
+        self.tree = [0] + list(values)
+        for i in range(1, len(self.tree)):  #build it in one pass
+            parent = i + (i & -i)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[i]
+
+    def __len__(self):
+        return len(self.tree) - 1
+
+    #the sum of the first n values
+    def prefix(self, n):
+        total = 0
+        while n > 0:
+            total += self.tree[n]
+            n -= n & -n
+        return total
+
+    #add delta to the value at a position (counted from 0)
+    def add(self, position, delta):
+        i = position + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    #add a new value at the end
+    def append(self, value):
+        i = len(self.tree)
+        self.tree.append(value + self.prefix(i - 1) - self.prefix(i - (i & -i)))
+
+    #all values (used when a day is inserted in the middle and the tree is rebuilt)
+    def values(self):
+        return [self.prefix(i + 1) - self.prefix(i) for i in range(len(self))]
+
+class DateRangeIndex:
+    ''' a class that answers "tickets and revenue between two dates" without going through the orders
+
+    The days are kept sorted, and every ticket type and payment method has one tree of running totals for
+    the quantity and one for the revenue. A range query finds its first and last day with bisect and then
+    reads two prefix sums per tree, so it does not depend on the number of orders.'''
+    GROUPS = ("ticket_type", "payment_method")
+
+    def __init__(self, daily_totals=None):
+        #daily_totals: {date: {"ticket_type": {name: [quantity, revenue]}, "payment_method": {...}}}
+        daily_totals = daily_totals or {}
+        self.days = sorted(daily_totals)
+        self.trees = {}  #{(group, name): (quantity tree, revenue tree)}
+        columns = {}
+        for position, date in enumerate(self.days):
+            for group in self.GROUPS:
+                for name, (quantity, revenue) in daily_totals[date].get(group, {}).items():
+                    values = columns.setdefault((group, name), ([0] * len(self.days), [0] * len(self.days)))
+                    values[0][position] = quantity
+                    values[1][position] = revenue
+        for key, (quantities, revenues) in columns.items():
+            self.trees[key] = (FenwickTree(quantities), FenwickTree(revenues))
+
+    #return the position of a day, adding the day first if it is new
+    def day_position(self, date):
+        position = bisect_left(self.days, date)
+        if position < len(self.days) and self.days[position] == date:
+            return position
+        if position == len(self.days):  #a new last day (the usual case: today's first order)
+            self.days.append(date)
+            for trees in self.trees.values():
+                for tree in trees:
+                    tree.append(0)
+        else:  #a day in the middle, the trees are rebuilt with a zero inserted
+            self.days.insert(position, date)
+            for key, trees in self.trees.items():
+                rebuilt = []
+                for tree in trees:
+                    values = tree.values()
+                    values.insert(position, 0)
+                    rebuilt.append(FenwickTree(values))
+                self.trees[key] = tuple(rebuilt)
+        return position
+
+    #add (sign = 1) or remove (sign = -1) one order
+    def update(self, order, sign):
+        position = self.day_position(order["date"])
+        for group in self.GROUPS:
+            key = (group, order[group])
+            if key not in self.trees:  #a ticket type or payment method that was never sold before
+                self.trees[key] = (FenwickTree([0] * len(self.days)), FenwickTree([0] * len(self.days)))
+            quantity_tree, revenue_tree = self.trees[key]
+            quantity_tree.add(position, sign * order["quantity"])
+            revenue_tree.add(position, sign * order["total_cost"])
+
+    #return the tickets and revenue per ticket type and payment method from start to end (both included)
+    #an empty start or end means the first or the last day
+    def query(self, start=None, end=None):
+        first = bisect_left(self.days, start) if start else 0
+        last = bisect_right(self.days, end) if end else len(self.days)
+        result = {group: {} for group in self.GROUPS}
+        result["quantity"] = result["revenue"] = 0
+        if first >= last:
+            return result
+        for (group, name), (quantity_tree, revenue_tree) in sorted(self.trees.items()):
+            quantity = quantity_tree.prefix(last) - quantity_tree.prefix(first)
+            revenue = revenue_tree.prefix(last) - revenue_tree.prefix(first)
+            if quantity or revenue:
+                result[group][name] = {"quantity": quantity, "revenue": revenue}
+        for totals in result["ticket_type"].values():  #every order has exactly one ticket type
+            result["quantity"] += totals["quantity"]
+            result["revenue"] += totals["revenue"]
+        return result
@@ -0,0 +1,152 @@
+# Import necessary modules
+import csv  # this is used to write the CSV files
+import gzip  # this is used for the optional compressed exports
+import json  # this is used to write the JSON Lines files
+import os  # this is used to replace the export file only when it is complete
+import queue  # this is used to hand the progress of the worker thread to the GUI
+import threading  # this is used to export on a worker thread
+
+#the columns of an order export, in this order
+ORDER_FIELDS = ("order_id", "username", "ticket_type", "quantity", "total_cost", "payment_method", "date",
+                "price_version", "race_date")
+#the columns of a sales report export
+REPORT_FIELDS = ("date", "group", "name", "quantity", "revenue")
+FORMATS = ("csv", "jsonl")
+
+# ---------- Export Functions ----------
+
+class ExportCancelled(Exception):
+    ''' an error that stops an export when the user cancels it'''
+
+#open the file an export writes to, compressed with gzip if asked
+def open_export(file_name, compress=False):
+    if compress:
+        return gzip.open(file_name, "wt", encoding="utf-8", newline="")
+    return open(file_name, "w", encoding="utf-8", newline="")
+
+#write rows (dictionaries) from an iterator of chunks to the file, it returns the number of rows written
+#the file is written under a temporary name first, so a failed or cancelled export leaves no half file
+def write_chunks(file_name, chunks, fields, file_format="csv", compress=False, progress=None, cancel=None):
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format: {file_format}")
+    temp_file = file_name + ".tmp"
+    count = 0
+    try:
+        with open_export(temp_file, compress) as file:
+            if file_format == "csv":
+                writer = csv.DictWriter(file, fieldnames=fields, extrasaction="ignore")
+                writer.writeheader()
+            for chunk in chunks:
+                if cancel is not None and cancel.is_set():
+                    raise ExportCancelled("The export was cancelled.")
+                if file_format == "csv":
+                    writer.writerows(chunk)
+                else:
+                    file.writelines(json.dumps({field: row.get(field) for field in fields}) + "\n" for row in chunk)
+                count += len(chunk)
+                if progress:
+                    progress(count)
+        os.replace(temp_file, file_name)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    return count
+
+#export the orders matching the filters, only one chunk of orders is in memory at a time
+def export_orders(model, file_name, file_format="csv", compress=False, username=None, start=None, end=None,
+                  ticket_type=None, chunk_size=5000, progress=None, cancel=None):
+    chunks = model.iter_orders(chunk_size, username, start, end, ticket_type)
+    return write_chunks(file_name, chunks, ORDER_FIELDS, file_format, compress, progress, cancel)
+
+#yield the sales report rows of the days from start to end (both included), one day at a time
+def iter_report_rows(daily_totals, start=None, end=None):
+    for date in sorted(daily_totals):
+        if (start and date < start) or (end and date > end):
+            continue
+        yield [{"date": date, "group": group, "name": name, "quantity": quantity, "revenue": revenue}
+               for group, totals in sorted(daily_totals[date].items())
+               for name, (quantity, revenue) in sorted(totals.items())]
+
+#export the tickets and revenue per day, ticket type and payment method
+def export_sales_report(model, file_name, file_format="csv", compress=False, start=None, end=None,
+                        progress=None, cancel=None):
+    #a copy, because purchases on other threads change the summary during the export
+    chunks = iter_report_rows(model.get_sales_summary_copy()["daily_totals"], start, end)
+    return write_chunks(file_name, chunks, REPORT_FIELDS, file_format, compress, progress, cancel)
+
+# ---------- Classes ----------
+
+class ExportJob:
+    ''' a class that runs an export on a worker thread
+
+    The progress callback runs on the worker thread and only puts messages in a queue,
+    the GUI reads them with get_updates() from root.after, so Tk is only used from its own thread.'''
+    def __init__(self, export, *args, **kwargs):
+        self.updates = queue.Queue()  #("progress", rows) / ("done", rows) / ("cancelled" or "error", message)
+        self.cancelled = threading.Event()
+        self.finished = False
+        self.thread = threading.Thread(target=self.run, args=(export, args, kwargs), daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self, export, args, kwargs):
+        try:
+            count = export(*args, progress=lambda rows: self.updates.put(("progress", rows)),
+                           cancel=self.cancelled, **kwargs)
+            self.updates.put(("done", count))
+        except ExportCancelled as e:
+            self.updates.put(("cancelled", str(e)))
+        except Exception as e:  #reported in the GUI instead of being lost on the worker thread
+            self.updates.put(("error", str(e)))
+
+    #ask the worker to stop after the chunk it is writing
+    def cancel(self):
+        self.cancelled.set()
+
+    #return the messages since the last call
+    def get_updates(self):
+        updates = []
+        while True:
+            try:
+                updates.append(self.updates.get_nowait())
+            except queue.Empty:
+                break
+        if updates and updates[-1][0] != "progress":
+            self.finished = True
+        return updates
+
+# ------------------- Main Program Entry Point -------------------
+
+#export from the command line, for example: python export.py orders.csv.gz --from 2025-01-01
+if __name__ == "__main__":
+    import argparse  # this is used to read the command line options
+    import sys  # this is used to show the progress on one line
+    from model import DEFAULT_STORAGE, TicketBookingModel  # Import the model layer
+
+    parser = argparse.ArgumentParser(description="Export the orders or the sales report")
+    parser.add_argument("file", help="the export file (a name ending in .gz is compressed)")
+    parser.add_argument("--report", action="store_true", help="export the sales report instead of the orders")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="csv or jsonl (default: from the file name)")
+    parser.add_argument("--storage", choices=("pickle", "snapshot", "sharded", "sqlite"), default=DEFAULT_STORAGE)
+    parser.add_argument("--from", dest="start", help="the first date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", help="the last date (YYYY-MM-DD)")
+    parser.add_argument("--username")
+    parser.add_argument("--ticket-type")
+    args = parser.parse_args()
+
+    compress = args.file.endswith(".gz")
+    file_format = args.format or ("jsonl" if args.file.removesuffix(".gz").endswith(".jsonl") else "csv")
+    show_progress = lambda rows: print(f"\r{rows} rows", end="", file=sys.stderr)
+    model = TicketBookingModel(storage=args.storage)
+    try:
+        if args.report:
+            count = export_sales_report(model, args.file, file_format, compress, args.start, args.end, show_progress)
+        else:
+            count = export_orders(model, args.file, file_format, compress, args.username, args.start, args.end,
+                                  args.ticket_type, progress=show_progress)
+    finally:
+        model.close()
+    print(f"\r{count} rows exported to {args.file}")
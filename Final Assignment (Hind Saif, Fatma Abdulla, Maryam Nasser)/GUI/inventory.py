@@ -0,0 +1,170 @@
+# Import necessary modules
+import heapq  # this is used to find the holds that expire first
+import itertools  # this is used to number the holds
+import threading  # this is used because many purchases can run at the same time
+import time  # this is used for the hold expiry times
+import zlib  # this is used to choose the lock of a ticket type and date
+
+LOCK_STRIPES = 64  #the number of locks, purchases of different days and ticket types rarely wait for each other
+HOLD_SECONDS = 120  #how long reserved seats are kept for a customer who has not paid yet
+
+# ---------- Classes ----------
+
+class SeatPool:
+    ''' a class that keeps the seat counters of one ticket type on one date'''
+    __slots__ = ("capacity", "sold", "held", "expiries")
+
+    def __init__(self, capacity, sold=0):
+        self.capacity = capacity  #None = no limit
+        self.sold = sold
+        self.held = 0  #seats reserved by holds that were not paid (committed) yet
+        self.expiries = []  #heap of (expiry time, hold id)
+
+    #the seats that can still be reserved
+    def available(self):
+        if self.capacity is None:
+            return None
+        return max(0, self.capacity - self.sold - self.held)
+
+class Inventory:
+    ''' a class that keeps the capacity of every ticket type per date, so tickets can not be oversold
+
+    Every (ticket type, date) has three counters: capacity, sold and held. A reservation is a hold
+    that is either committed (the seats become sold), released, or expires after a while. The pools
+    are spread over several locks, so purchases for different days and ticket types run in parallel.'''
+    def __init__(self, capacities, sold=None, overrides=None, hold_seconds=HOLD_SECONDS, stripes=LOCK_STRIPES):
+        self.capacities = dict(capacities)  #{ticket_type: seats per date}, None or a missing type = no limit
+        self.overrides = dict(overrides or {})  #{(ticket_type, date): seats} for single dates
+        self.hold_seconds = hold_seconds
+        self.stripes = [(threading.Lock(), {}, {}) for _ in range(stripes)]  #(lock, pools, holds)
+        self.hold_numbers = itertools.count(1)
+
+        #the seats sold so far: {race_date: {ticket_type: quantity}} (the race days of the sales summary)
+        for date, tickets in (sold or {}).items():
+            for ticket_type, quantity in tickets.items():
+                lock, pools, holds = self.stripe(ticket_type, date)
+                pools[(ticket_type, date)] = SeatPool(self.capacity(ticket_type, date), quantity)
+
+    #the lock, pools and holds that a ticket type and date belong to
+    def stripe(self, ticket_type, date):
+        return self.stripes[self.stripe_number(ticket_type, date)]
+
+    def stripe_number(self, ticket_type, date):
+        return zlib.crc32(f"{ticket_type}|{date}".encode("utf-8")) % len(self.stripes)
+
+    #the capacity of a ticket type on a date
+    def capacity(self, ticket_type, date):
+        return self.overrides.get((ticket_type, date), self.capacities.get(ticket_type))
+
+    #the pool of a ticket type and date, it is created the first time (call it with the stripe lock held)
+    def pool(self, pools, ticket_type, date):
+        pool = pools.get((ticket_type, date))
+        if pool is None:
+            pool = pools[(ticket_type, date)] = SeatPool(self.capacity(ticket_type, date))
+        return pool
+
+    #give the seats of the holds that have expired back (call it with the stripe lock held)
+    def expire(self, pool, holds, now):
+        while pool.expiries and pool.expiries[0][0] <= now:
+            expiry, hold_id = heapq.heappop(pool.expiries)
+            hold = holds.pop(hold_id, None)
+            if hold is not None:
+                pool.held -= hold[2]
+
+    # ---------- Reading ----------
+
+    #the seats that can still be bought (None = no limit)
+    def available(self, ticket_type, date):
+        lock, pools, holds = self.stripe(ticket_type, date)
+        with lock:
+            pool = self.pool(pools, ticket_type, date)
+            self.expire(pool, holds, time.monotonic())
+            return pool.available()
+
+    #{"capacity", "sold", "held", "available"} of a ticket type and date
+    def status(self, ticket_type, date):
+        lock, pools, holds = self.stripe(ticket_type, date)
+        with lock:
+            pool = self.pool(pools, ticket_type, date)
+            self.expire(pool, holds, time.monotonic())
+            return {"capacity": pool.capacity, "sold": pool.sold, "held": pool.held, "available": pool.available()}
+
+    # ---------- Changing ----------
+
+    #hold seats for a while, it returns the hold id, or None if there are not enough seats left
+    def reserve(self, ticket_type, date, quantity, seconds=None):
+        if quantity <= 0:
+            raise ValueError("The quantity must be positive.")
+        stripe_number = self.stripe_number(ticket_type, date)
+        lock, pools, holds = self.stripes[stripe_number]
+        now = time.monotonic()
+        with lock:
+            pool = self.pool(pools, ticket_type, date)
+            self.expire(pool, holds, now)
+            available = pool.available()
+            if available is not None and quantity > available:
+                return None
+            #the hold id tells which stripe the hold is in, so no shared table of holds is needed
+            hold_id = next(self.hold_numbers) * len(self.stripes) + stripe_number
+            expiry = now + (self.hold_seconds if seconds is None else seconds)
+            holds[hold_id] = (ticket_type, date, quantity, expiry)
+            heapq.heappush(pool.expiries, (expiry, hold_id))
+            pool.held += quantity
+            return hold_id
+
+    #turn a hold into sold seats, it returns False if the hold expired, was released or does not match
+    #the given ticket type, date and quantity (None = not checked)
+    def commit(self, hold_id, ticket_type=None, date=None, quantity=None):
+        lock, pools, holds = self.stripes[hold_id % len(self.stripes)]
+        with lock:
+            hold = holds.get(hold_id)
+            if hold is None or hold[3] <= time.monotonic():
+                return False
+            if any(value is not None and value != held for value, held in zip((ticket_type, date, quantity), hold)):
+                return False
+            del holds[hold_id]  #its entry in the expiry heap is skipped when it comes up
+            pool = pools[hold[:2]]
+            pool.held -= hold[2]
+            pool.sold += hold[2]
+            return True
+
+    #give the seats of a hold back before it expires, it returns False if there was no such hold
+    def release(self, hold_id):
+        lock, pools, holds = self.stripes[hold_id % len(self.stripes)]
+        with lock:
+            hold = holds.pop(hold_id, None)
+            if hold is None:
+                return False
+            pools[hold[:2]].held -= hold[2]
+            return True
+
+    #sell seats straight away (reserve and commit in one step), it returns False if they are not available
+    def take(self, ticket_type, date, quantity):
+        if quantity <= 0:
+            raise ValueError("The quantity must be positive.")  #a negative quantity would add seats
+        lock, pools, holds = self.stripe(ticket_type, date)
+        with lock:
+            pool = self.pool(pools, ticket_type, date)
+            self.expire(pool, holds, time.monotonic())
+            available = pool.available()
+            if available is not None and quantity > available:
+                return False
+            pool.sold += quantity
+            return True
+
+    #give sold seats back (a cancelled or deleted order)
+    def return_seats(self, ticket_type, date, quantity):
+        lock, pools, holds = self.stripe(ticket_type, date)
+        with lock:
+            pool = self.pool(pools, ticket_type, date)
+            pool.sold = max(0, pool.sold - quantity)
+
+    #change the capacity of a ticket type on one date (None = back to the ticket type's capacity)
+    def set_capacity(self, ticket_type, date, capacity):
+        lock, pools, holds = self.stripe(ticket_type, date)
+        with lock:
+            if capacity is None:
+                self.overrides.pop((ticket_type, date), None)
+            else:
+                self.overrides[(ticket_type, date)] = capacity
+            self.pool(pools, ticket_type, date).capacity = self.capacity(ticket_type, date)
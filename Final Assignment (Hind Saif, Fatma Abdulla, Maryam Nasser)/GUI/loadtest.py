@@ -0,0 +1,89 @@
+# a local load-test client for service.py
+# start the service first (python service.py) and then run: python loadtest.py --requests 2000 --concurrency 50
+import argparse  # this is used to read the command line options
+import asyncio  # this is used to run many clients at once
+import json  # this is used to write requests and read responses
+import time  # this is used to measure the latency of every request
+
+#send one request on an open connection and return (status, data)
+async def send_request(reader, writer, method, path, body=None):
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(payload)}\r\n\r\n").encode("latin-1") + payload)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+#one client: log in once and then keep sending requests until the shared counter runs out
+async def run_client(args, counter, latencies, errors):
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    try:
+        account = {"username": args.username, "password": args.password}
+        await send_request(reader, writer, "POST", "/accounts", account)  #fails harmlessly if it exists
+        status, data = await send_request(reader, writer, "POST", "/login", account)
+        if status != 200:
+            raise RuntimeError(f"Login failed: {data}")
+        token = data["token"]
+
+        while counter[0] > 0:
+            counter[0] -= 1
+            if args.endpoint == "purchase":
+                request = ("POST", "/purchase", {"token": token, "ticket_type": "Single Race Pass",
+                                                  "quantity": 1, "payment_method": "Credit Card"})
+            elif args.endpoint == "orders":
+                request = ("GET", f"/orders?token={token}", None)
+            else:
+                request = ("GET", f"/summary?token={token}", None)
+
+            start = time.perf_counter()
+            status, data = await send_request(reader, writer, *request)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(data)
+    finally:
+        writer.close()
+
+#return the value below which the given share of the sorted latencies fall
+def percentile(sorted_values, share):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(share * len(sorted_values)))]
+
+async def main(args):
+    counter, latencies, errors = [args.requests], [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(args, counter, latencies, errors) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    report = {
+        "endpoint": args.endpoint,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "concurrency": args.concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2)
+    }
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test for the booking service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--requests", type=int, default=1000, help="total number of requests")
+    parser.add_argument("--concurrency", type=int, default=20, help="number of clients at the same time")
+    parser.add_argument("--endpoint", choices=["purchase", "orders", "summary"], default="purchase")
+    parser.add_argument("--username", default="loadtest")
+    parser.add_argument("--password", default="loadtest")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,182 @@
+# Import necessary modules
+import cProfile  # this is used for the optional profiling of chosen handlers
+import io  # this is used to turn the profile statistics into text
+import json  # this is used to save the metrics to a file
+import pstats  # this is used to collect the profiles of many calls into one report
+import random  # this is used to choose which calls are profiled
+import threading  # this is used because the model is also called from worker threads
+import time  # this is used to time every call
+from functools import wraps  # this keeps the name of the wrapped functions
+import storage  # the storage module that is timed and that reports the bytes it reads and writes
+
+#the model operations that are measured when metrics are on
+MODEL_OPERATIONS = ("add_account", "validate_login", "edit_account", "delete_account", "purchase_ticket",
+                    "purchase_tickets_bulk", "get_orders", "get_orders_page", "delete_orders", "delete_order",
+                    "get_customer_orders_count", "get_all_customer_stats", "get_sales_summary", "get_sales_between",
+                    "apply_discount_to_all", "disable_discount_to_all", "reserve_tickets", "release_hold",
+                    "get_availability", "add_discount_rule", "remove_discount_rule", "get_price_table", "close")
+
+#the file functions of the storage module that are timed (every backend and the model call them through the module)
+STORAGE_FUNCTIONS = ("save_data", "load_data", "load_orders")
+
+# ---------- Classes ----------
+
+class OperationStats:
+    ''' a class that keeps the call count and the latency histogram of one operation'''
+    #the upper limit of every histogram bucket in milliseconds (the last bucket has no limit)
+    BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = [0] * (len(self.BUCKETS_MS) + 1)
+
+    #record one call
+    def add(self, elapsed_ms, failed):
+        self.count += 1
+        self.errors += failed
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        bucket = 0
+        while bucket < len(self.BUCKETS_MS) and elapsed_ms > self.BUCKETS_MS[bucket]:
+            bucket += 1
+        self.histogram[bucket] += 1
+
+    #return the stats as a dictionary (for the admin dashboard and the JSON file)
+    def report(self):
+        labels = [f"<={limit}ms" for limit in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+        return {"count": self.count, "errors": self.errors,
+                "mean_ms": round(self.total_ms / self.count, 4) if self.count else 0.0,
+                "max_ms": round(self.max_ms, 4), "total_ms": round(self.total_ms, 4),
+                "histogram": {label: n for label, n in zip(labels, self.histogram) if n}}
+
+class Metrics:
+    ''' a class that measures the model operations, the bytes of the storage files and the controller handlers
+
+    Nothing is measured until something is instrumented: the methods are only replaced on the
+    objects that are passed in, so when metrics are off the program runs the original code.
+    The file functions of the storage module are timed like the operations. The storage module also
+    reports the bytes of every read and write itself (pickle files, journals and snapshots), the SQLite
+    database and the pages of a memory-mapped snapshot are read by the system and not counted.'''
+
+    def __init__(self, profile=(), profile_rate=0.1):
+        self.lock = threading.Lock()
+        self.operations = {}  #{name: OperationStats}
+        self.files = {}  #{file name: {"read": bytes, "written": bytes}}
+        self.started = time.time()
+        self.originals = []  #(object, attribute, original value) so everything can be undone
+
+        #the optional profiling: only the named handlers, and only a sample of their calls
+        self.profile_names = set(profile)
+        self.profile_rate = profile_rate
+        self.profile_stats = None  #pstats.Stats that collects all profiled calls
+        self.profiled_calls = 0
+        self.profiling = threading.local()  #only one profiler can run at a time in a thread
+
+    # ---------- Recording ----------
+
+    def record(self, name, elapsed_ms, failed=False):
+        with self.lock:
+            stats = self.operations.get(name)
+            if stats is None:
+                stats = self.operations[name] = OperationStats()
+            stats.add(elapsed_ms, failed)
+
+    def record_bytes(self, file_name, direction, size):
+        with self.lock:
+            totals = self.files.setdefault(file_name, {"read": 0, "written": 0})
+            totals[direction] += size
+
+    #run one call under the profiler and add it to the collected statistics
+    def run_profiled(self, function, args, kwargs):
+        if getattr(self.profiling, "active", False):  #a profiled handler called another one
+            return function(*args, **kwargs)
+        profiler = cProfile.Profile()
+        self.profiling.active = True
+        try:
+            return profiler.runcall(function, *args, **kwargs)
+        finally:
+            self.profiling.active = False
+            with self.lock:
+                if self.profile_stats is None:
+                    self.profile_stats = pstats.Stats(profiler)
+                else:
+                    self.profile_stats.add(profiler)
+                self.profiled_calls += 1
+
+    #return a function that measures every call of the given function
+    def wrap(self, name, function):
+        profiled = name.split(".")[-1] in self.profile_names or name in self.profile_names
+
+        @wraps(function)
+        def measured(*args, **kwargs):
+            failed = True
+            start = time.perf_counter()
+            try:
+                if profiled and random.random() < self.profile_rate:
+                    result = self.run_profiled(function, args, kwargs)
+                else:
+                    result = function(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                self.record(name, (time.perf_counter() - start) * 1000, failed)
+        return measured
+
+    # ---------- Instrumenting ----------
+
+    #replace the given methods of one object (only this object, not its class)
+    def instrument(self, obj, method_names, prefix):
+        for method_name in method_names:
+            original = getattr(obj, method_name)
+            self.originals.append((obj, method_name, None))
+            setattr(obj, method_name, self.wrap(f"{prefix}.{method_name}", original))
+
+    #time the file functions of the storage module, and count the bytes the storage reads and writes
+    #(the storage module reports them through record_io at the place where the file is used)
+    def instrument_storage(self):
+        for function_name in STORAGE_FUNCTIONS:
+            original = getattr(storage, function_name)
+            self.originals.append((storage, function_name, original))
+            setattr(storage, function_name, self.wrap(f"storage.{function_name}", original))
+        self.originals.append((storage, "record_io", storage.record_io))
+        storage.record_io = self.record_bytes
+
+    #undo all instrumenting
+    def uninstrument(self):
+        for obj, name, original in reversed(self.originals):
+            if original is None:
+                delattr(obj, name)  #the class method is used again
+            else:
+                setattr(obj, name, original)
+        self.originals = []
+
+    # ---------- Reporting ----------
+
+    #return the top functions of the profiled calls as text
+    def profile_report(self, limit=15):
+        with self.lock:
+            if self.profile_stats is None:
+                return ""
+            text = io.StringIO()
+            self.profile_stats.stream = text
+            self.profile_stats.sort_stats("cumulative").print_stats(limit)
+            return text.getvalue()
+
+    #return all metrics as a dictionary
+    def report(self):
+        with self.lock:
+            operations = {name: stats.report() for name, stats in sorted(self.operations.items())}
+            files = {name: dict(totals) for name, totals in sorted(self.files.items())}
+        return {"uptime_s": round(time.time() - self.started, 1), "operations": operations, "files": files,
+                "profiled_calls": self.profiled_calls}
+
+    #save the metrics (and the profile, if there is one) to a JSON file
+    def dump(self, file_name="metrics.json"):
+        data = self.report()
+        data["profile"] = self.profile_report()
+        with open(file_name, "w") as file:
+            json.dump(data, file, indent=2)
+        return file_name
@@ -0,0 +1,15 @@
+# a one-shot tool that imports accounts.pkl and the orders into booking.db
+# (the orders of orders.snap, or of orders.pkl if the snapshot was never created)
+# run it once from this folder: python migrate_to_sqlite.py
+import sys  # this is used to read optional file names from the command line
+from storage import migrate_pickle_to_sqlite  # the function that does the copying
+
+if __name__ == "__main__":
+    #the file names can be given as: accounts.pkl orders.pkl booking.db [orders.snap]
+    file_names = sys.argv[1:5] if len(sys.argv) in (4, 5) else ["accounts.pkl", "orders.pkl", "booking.db"]
+    try:
+        accounts_count, orders_count = migrate_pickle_to_sqlite(*file_names)
+    except ValueError as e:  # the database was already migrated
+        print(f"Nothing was imported: {e}")
+        sys.exit(1)
+    print(f"Imported {accounts_count} accounts and {orders_count} orders into {file_names[2]}")
@@ -1,48 +1,90 @@
 # Import necessary modules
-import pickle  # this is used for serializing (saving) and deserializing (loading) Python objects to/from files
+import copy  # this is used to hand out copies of the sales summary to other threads
+import threading  # this is used to guard the in-memory indexes when purchases run at the same time
 from datetime import datetime  # this is used to get the current date and time
+from storage import PickleStorage, ShardedStorage, SnapshotStorage, SQLiteStorage  # the storage backends for accounts and orders
+from storage import load_summary, save_summary, update_customer_totals, update_sales_summary  # the indexes
+import storage as files  # save_data/load_data for the capacities and prices (called through the module, so the metrics can time them)
+from dateindex import DateRangeIndex  # the index for sales between two dates
+from inventory import Inventory  # the seats that are left per ticket type and race day
+from pricing import PriceEngine  # the versioned prices and discount rules
 
-# ---------- File Utility Functions ----------
+#the storage backend used by the GUI, the service, the benchmark and the export when none is chosen
+#(the first time, the snapshot imports the orders of orders.pkl)
+DEFAULT_STORAGE = "snapshot"
 
-#a function to save data to a binary (.pkl) file
-def save_data(file_name, data):
-    #Save data to a pickle file
-    try:
-        with open(file_name, 'wb') as file:  # open the file in write-binary mode
-            pickle.dump(data, file)  # save the Python object to the file
-    except Exception as e:  # catch any errors during saving
-        raise IOError(f"Could not save data: {e}")  # Raise an error
-
-#a function to load data from a binary (.pkl) file
-def load_data(file_name):
-    #Load data from a pickle file
+#the name of the discount rule of the "Apply 50% Discount to ALL Tickets" button
+ALL_TICKETS_DISCOUNT = "50% off all tickets"
+
+#True if a quantity is a positive whole number (True and False are ints in Python, so they are refused first)
+def is_quantity(quantity):
+    return not isinstance(quantity, bool) and isinstance(quantity, int) and quantity > 0
+
+#return the race day of an order as YYYY-MM-DD text (today if it is not given), a wrong date raises ValueError
+def race_day(race_date=None):
+    if race_date is None:
+        return datetime.now().strftime("%Y-%m-%d")
     try:
-        with open(file_name, 'rb') as file:  # open the file in read-binary mode
-            data = pickle.load(file)  # load the object from the file
-
-            # check what type of object is expected based on the filename
-            if 'accounts' in file_name:
-                return data if isinstance(data, dict) else {}  # expect a dictionary for accounts
-            elif 'orders' in file_name:
-                return data if isinstance(data, list) else []  # expect a list for orders
-            return data
-    except FileNotFoundError:  # if the file does not exist
-        return {} if 'accounts' in file_name else []  # return an empty structure depending on file type
-    except Exception as e:  # catch all other errors
-        raise IOError(f"Could not load data: {e}")  # Raise error
+        if datetime.strptime(race_date, "%Y-%m-%d").strftime("%Y-%m-%d") == race_date:
+            return race_date
+    except (TypeError, ValueError):
+        pass
+    raise ValueError(f"{race_date!r} is not a race day (YYYY-MM-DD).")
 
 # ---------- Classes ----------
 
 class TicketBookingModel:
     ''' a class the represents the data logic for ticket booking'''
-    def __init__(self):
+    def __init__(self, storage=DEFAULT_STORAGE, journal=False, fsync_every=1, compact_interval=60.0, db_file="booking.db",
+                 group_commit_window=None, group_commit_size=100, background_writes=False, shard_by="username",
+                 shard_count=8, shard_workers=None, capacities=None):
         #define filenames for storing account and order data
         self.accounts_file = "accounts.pkl"
         self.orders_file = "orders.pkl"
 
-        #load the existing data from files (or initialize empty if not found)
-        self.accounts = load_data(self.accounts_file)  # Dictionary: {username: password}
-        self.orders = load_data(self.orders_file)  # List of order dictionaries
+        #choose where accounts and orders are kept: "pickle" (.pkl files), "snapshot" (a memory-mapped
+        #orders file that is read lazily, plus a journal), "sharded" (one .pkl file per username group or month,
+        #loaded in parallel) or "sqlite" (one database file)
+        if storage == "pickle":
+            self.storage = PickleStorage(self.accounts_file, self.orders_file, journal=journal,
+                                         fsync_every=fsync_every, compact_interval=compact_interval,
+                                         group_commit_window=group_commit_window, group_commit_size=group_commit_size,
+                                         background_writes=background_writes)
+        elif storage == "snapshot":
+            self.storage = SnapshotStorage(self.accounts_file, fsync_every=fsync_every, compact_interval=compact_interval,
+                                           group_commit_window=group_commit_window,
+                                           group_commit_size=group_commit_size,
+                                           background_writes=background_writes)
+        elif storage == "sharded":
+            self.storage = ShardedStorage(self.accounts_file, shard_by=shard_by, shard_count=shard_count,
+                                          workers=shard_workers, group_commit_window=group_commit_window,
+                                          group_commit_size=group_commit_size, background_writes=background_writes)
+        elif storage == "sqlite":
+            self.storage = SQLiteStorage(db_file, group_commit_window=group_commit_window,
+                                         group_commit_size=group_commit_size)
+        else:
+            raise ValueError(f"Unknown storage backend: {storage}")
+
+        #the locks make the model safe to use from several threads (e.g. the booking service)
+        self.lock = threading.Lock()  #guards the customer index and the sales summary
+        self.accounts_lock = threading.Lock()  #guards the accounts dictionary and its file
+
+        #load the existing accounts (or initialize empty if not found)
+        self.accounts = self.storage.load_accounts()  # Dictionary: {username: password}
+
+        #build the per-customer index once: {username: {"orders": n, "quantity": n, "total_spent": n}}
+        self.customer_stats = self.storage.customer_totals()
+
+        #the pickle backend saves the sales summary on close, it is only rebuilt if that file is missing or was made
+        #from other orders (the other backends keep their totals up to date themselves, so they have no summary file)
+        self.sales_summary = None
+        if self.storage.summary_file:
+            self.sales_summary = load_summary(self.storage.summary_file, self.storage.summary_key())
+        if self.sales_summary is None:
+            self.sales_summary = self.storage.sales_totals()
+
+        #the date range index is built from the daily totals, so it does not read the orders
+        self.date_index = DateRangeIndex(self.sales_summary["daily_totals"])
 
         #define the available ticket types and their details
         self.tickets = {
@@ -50,37 +92,62 @@ class TicketBookingModel:
                 "price": 120,
                 "validity": "One Day",
                 "features": "Access to one race",
-                "discount": False
+                "discount": False,
+                "capacity": 5000  #seats per race day
             },
             "Weekend Package": {
                 "price": 300,
                 "validity": "Three Days",
                 "features": "All races during the weekend",
-                "discount": False
+                "discount": False,
+                "capacity": 2000
             },
             "Season Membership": {
                 "price": 1200,
                 "validity": "Full Season",
                 "features": "Access to all season races",
-                "discount": False
+                "discount": False,
+                "capacity": 500
             },
             "Group Discount Pack": {
                 "price": 1000,
                 "validity": "One Day",
                 "features": "10 tickets at a discounted rate",
-                "discount": True
+                "discount": True,
+                "capacity": 100  #packs per race day
             }
         }
 
+        #the capacities above are placeholders until the real grandstand sizes are known, so they can be
+        #replaced with {ticket_type: seats per race day} (None = no limit), or changed for one race day with set_capacity
+        for ticket_type, capacity in (capacities or {}).items():
+            if ticket_type not in self.tickets:
+                raise ValueError(f"Unknown ticket type: {ticket_type}")
+            self.tickets[ticket_type]["capacity"] = capacity
+
+        #the seats per ticket type and race day, the seats already sold come from the sales summary
+        #and the capacities that were changed for single race days are kept in their own file
+        self.capacity_file = "capacity.pkl"
+        self.inventory = Inventory({ticket_type: info["capacity"] for ticket_type, info in self.tickets.items()},
+                                   self.sales_summary["race_days"], files.load_data(self.capacity_file) or {})
+
+        #the "price" of a ticket type is its price without discounts, the discounts are rules that make a new
+        #version of the price table, every order saves the version it was priced with
+        self.prices_file = "prices.pkl"
+        self.pricing = PriceEngine({ticket_type: info["price"] for ticket_type, info in self.tickets.items()},
+                                   files.load_data(self.prices_file) or None,
+                                   lambda state: files.save_data(self.prices_file, state))
+
     # ---------- Account Management ----------
 
     #add a new account to the system
     def add_account(self, username, password):
-        if username in self.accounts:  # do not allow duplicate usernames
-            return False
-        self.accounts[username] = password  # add new user
-        save_data(self.accounts_file, self.accounts)  # save the updated accounts
-        return True
+        with self.accounts_lock:
+            if username in self.accounts:  # do not allow duplicate usernames
+                return False
+            self.accounts[username] = password  # add new user
+            self.storage.save_account(self.accounts, username)  # save the updated accounts
+            return True
 
     #checking if login credentials are valid
     def validate_login(self, username, password):
@@ -88,19 +155,26 @@ class TicketBookingModel:
 
     #update the password for an existing account
     def edit_account(self, username, new_password):
-        if username in self.accounts:
-            self.accounts[username] = new_password  # Update password
-            save_data(self.accounts_file, self.accounts)
-            return True
-        return False
+        with self.accounts_lock:
+            if username in self.accounts:
+                self.accounts[username] = new_password  # Update password
+                self.storage.save_account(self.accounts, username)
+                return True
+            return False
 
     #remove an account from the system
     def delete_account(self, username):
-        if username in self.accounts:
-            del self.accounts[username]  # Delete user
-            save_data(self.accounts_file, self.accounts)
-            return True
-        return False
+        with self.accounts_lock:
+            if username in self.accounts:
+                del self.accounts[username]  # Delete user
+                self.storage.save_account(self.accounts, username)
+                #the orders of the user are kept, so their index entry stays for them, but an
+                #empty entry (a user without orders) is not needed anymore
+                with self.lock:
+                    if self.customer_stats.get(username, {}).get("orders") == 0:
+                        del self.customer_stats[username]
+                return True
+            return False
 
     #return a list of all usernames
     def get_all_customers(self):
@@ -109,55 +183,234 @@ class TicketBookingModel:
     # ---------- Orders Management ----------
 
     #create a new ticket order and save it
-    def purchase_ticket(self, username, ticket_type, quantity, payment_method):
-        price = self.tickets[ticket_type]["price"]  #get the unit price for the selected ticket
-        total_cost = price * quantity  #calculate total cost
+    #it returns the total cost, or None if the tickets are sold out (or the hold expired)
+    #with a hold_id from reserve_tickets the held seats are used, otherwise free seats are taken straight away,
+    #the order date is always today and race_date is the day the tickets are for (today if not given)
+    def purchase_ticket(self, username, ticket_type, quantity, payment_method, race_date=None, hold_id=None):
+        #a bad value is refused before any seats are taken (a negative quantity would add free seats)
+        if not is_quantity(quantity):
+            raise ValueError("The quantity must be a positive whole number.")
+        if not isinstance(username, str) or not isinstance(payment_method, str):
+            raise ValueError("The username and payment method must be text.")
+        race_date = race_day(race_date)
+        date = datetime.now().strftime("%Y-%m-%d")  #save order date as string
+        total_cost, price_version = self.pricing.quote(ticket_type, quantity)  #the cached cost, without a lock
+        if hold_id is None:
+            if not self.inventory.take(ticket_type, race_date, quantity):
+                return None
+        elif not self.inventory.commit(hold_id, ticket_type, race_date, quantity):
+            return None
         order = {
             "username": username,
             "ticket_type": ticket_type,
             "quantity": quantity,
             "total_cost": total_cost,
             "payment_method": payment_method,
-            "date": datetime.now().strftime("%Y-%m-%d")  #save order date as string
+            "date": date,
+            "price_version": price_version,
+            "race_date": race_date
         }
-        self.orders.append(order)  #add the order to the list
-        save_data(self.orders_file, self.orders)  #save updated orders
+        try:
+            self.storage.add_order(order)  #add the order and save it (this also sets order["order_id"])
+        except Exception:
+            self.inventory.return_seats(ticket_type, race_date, quantity)  #the order was not saved, so neither are its seats
+            raise
+        self.update_indexes(order, 1)  #keep the customer index and the sales summary up to date
         return total_cost
 
-    #return all saved orders
-    def get_orders(self):
-        return self.orders
+    #create many ticket orders at once and save them with one write (all or nothing)
+    #each order is a dictionary with "username", "ticket_type", "quantity", "payment_method" and optionally "race_date"
+    def purchase_tickets_bulk(self, orders):
+        #check every order before any seats are taken or anything is saved
+        race_dates = []
+        for position, order in enumerate(orders):
+            if order.get("ticket_type") not in self.tickets:
+                raise ValueError(f"Order {position + 1}: unknown ticket type {order.get('ticket_type')!r}")
+            if not is_quantity(order.get("quantity")):
+                raise ValueError(f"Order {position + 1}: quantity must be a positive whole number")
+            if not isinstance(order.get("username"), str) or not isinstance(order.get("payment_method"), str):
+                raise ValueError(f"Order {position + 1}: the username and payment method must be text")
+            try:
+                race_dates.append(race_day(order.get("race_date")))
+            except ValueError as e:
+                raise ValueError(f"Order {position + 1}: {e}")
+
+        #price the whole batch with the same price table and date
+        prices = self.pricing.current()
+        date = datetime.now().strftime("%Y-%m-%d")
+
+        #take the seats of every order, and give them all back if one of them is sold out
+        taken = []
+        for position, (order, race_date) in enumerate(zip(orders, race_dates)):
+            if not self.inventory.take(order["ticket_type"], race_date, order["quantity"]):
+                for seats in taken:
+                    self.inventory.return_seats(*seats)
+                raise ValueError(f"Order {position + 1}: {order['ticket_type']} is sold out")
+            taken.append((order["ticket_type"], race_date, order["quantity"]))
+
+        #from here on the seats are taken, so any error gives them back
+        try:
+            new_orders = [{
+                "username": order["username"],
+                "ticket_type": order["ticket_type"],
+                "quantity": order["quantity"],
+                "total_cost": prices.prices[order["ticket_type"]] * order["quantity"],
+                "payment_method": order["payment_method"],
+                "date": date,
+                "price_version": prices.version,
+                "race_date": race_date
+            } for order, race_date in zip(orders, race_dates)]
+            self.storage.add_orders(new_orders)  #one atomic write for the whole batch
+        except Exception:
+            for seats in taken:
+                self.inventory.return_seats(*seats)
+            raise
+        for order in new_orders:
+            self.update_indexes(order, 1)
+        return [order["total_cost"] for order in new_orders]
+
+    #return the saved orders (optionally only the ones for a user, date or ticket type)
+    def get_orders(self, username=None, date=None, ticket_type=None):
+        return self.storage.get_orders(username, date, ticket_type)
+
+    #return (number of matching orders, [(order id, order)]) for one page of the orders,
+    #the ids can be passed to delete_orders (they stay the same when other orders are deleted)
+    def get_orders_page(self, offset, limit, username=None, date=None, ticket_type=None):
+        return self.storage.get_orders_page(offset, limit, username, date, ticket_type)
 
-    #delete an order by its index in the list
+    #yield the orders matching the filters in lists of at most chunk_size orders,
+    #so an export of all orders never has them all in memory at once (start and end are dates, both included)
+    def iter_orders(self, chunk_size=5000, username=None, start=None, end=None, ticket_type=None):
+        return self.storage.iter_orders(chunk_size, username, start, end, ticket_type)
+
+    #delete the orders with the given ids with one save, it returns how many were deleted
+    #(an id that was already deleted is skipped, so a list that is out of date can not delete the wrong order)
+    def delete_orders(self, order_ids):
+        removed = self.storage.delete_orders(order_ids)
+        for order in removed:
+            self.update_indexes(order, -1)
+            self.inventory.return_seats(order["ticket_type"], order["race_date"], order["quantity"])
+        return len(removed)
+
+    #delete an order by its index in the list (delete_orders with the order id is the safer way)
     def delete_order(self, index):
-        if 0 <= index < len(self.orders):  # make sure that the index is valid
-            del self.orders[index]
-            save_data(self.orders_file, self.orders)
-            return True
-        return False
+        order = self.storage.delete_order(index)  #the removed order (or None)
+        if order is None:
+            return False
+        self.update_indexes(order, -1)
+        self.inventory.return_seats(order["ticket_type"], order["race_date"], order["quantity"])  #the seats can be sold again
+        return True
+
+    #return [(file_name, error or None)] for the background writes that finished since the last call
+    def get_write_results(self):
+        return self.storage.get_write_results()
+
+    #finish all pending writes (called when the application closes)
+    def close(self):
+        if self.storage.summary_file:
+            save_summary(self.storage.summary_file, self.sales_summary, self.storage.summary_key())
+        self.storage.close()
 
     #count how many orders a specific user has made
     def get_customer_orders_count(self, username):
-        return len([order for order in self.orders if order["username"] == username])
+        return self.customer_stats.get(username, {}).get("orders", 0)
+
+    # ---------- Ticket Inventory ----------
+
+    #hold seats for a customer who is still paying, it returns the hold id for purchase_ticket,
+    #or None if there are not enough seats (the seats are given back if the hold is not used in time)
+    def reserve_tickets(self, ticket_type, quantity, race_date=None, seconds=None):
+        if not is_quantity(quantity):
+            raise ValueError("The quantity must be a positive whole number.")
+        return self.inventory.reserve(ticket_type, race_day(race_date), quantity, seconds)
+
+    #give the seats of a hold back before it expires
+    def release_hold(self, hold_id):
+        return self.inventory.release(hold_id)
+
+    #return {"capacity", "sold", "held", "available"} of a ticket type on a race day (today if not given)
+    def get_availability(self, ticket_type, race_date=None):
+        return self.inventory.status(ticket_type, race_day(race_date))
+
+    #change the capacity of a ticket type on one race day (None = the usual capacity of the ticket type)
+    def set_capacity(self, ticket_type, race_date, capacity):
+        if ticket_type not in self.tickets:
+            raise ValueError(f"Unknown ticket type: {ticket_type}")
+        if capacity is not None and (isinstance(capacity, bool) or not isinstance(capacity, int) or capacity < 0):
+            raise ValueError("The capacity must be a whole number of seats (0 or more).")
+        self.inventory.set_capacity(ticket_type, race_day(race_date), capacity)
+        files.save_data(self.capacity_file, dict(self.inventory.overrides))
+
+    # ---------- Customer Index ----------
+
+    #add (sign = 1) or remove (sign = -1) one order from the customer index and the sales summary
+    def update_indexes(self, order, sign):
+        with self.lock:
+            update_customer_totals(self.customer_stats, order, sign)
+            update_sales_summary(self.sales_summary, order, sign)
+            self.date_index.update(order, sign)
+
+    #return the order count, ticket quantity and total spend of every customer in one call
+    def get_all_customer_stats(self):
+        empty = {"orders": 0, "quantity": 0, "total_spent": 0}
+        with self.accounts_lock, self.lock:
+            return {username: dict(self.customer_stats.get(username, empty)) for username in self.accounts}
+
+    # ---------- Sales Summary ----------
+
+    #return the sales summary that is kept up to date after every purchase and delete
+    #(revenue comes from the cost saved in each order, so discounts do not change past sales)
+    def get_sales_summary(self):
+        return self.sales_summary
+
+    #return the tickets and revenue per ticket type and payment method between two dates (YYYY-MM-DD,
+    #both included, None = no limit): {"ticket_type": {name: {"quantity", "revenue"}}, "payment_method": {...},
+    #"quantity": total, "revenue": total}
+    def get_sales_between(self, start=None, end=None):
+        with self.lock:
+            return self.date_index.query(start, end)
+
+    #return a copy of the sales summary that other threads can read while orders keep coming in
+    def get_sales_summary_copy(self):
+        with self.lock:
+            return copy.deepcopy(self.sales_summary)
 
     # ---------- Discount Management ----------
 
-    # apply a 50% discount to all ticket prices
+    # apply a 50% discount to all ticket prices (a new price version, the orders already made keep their cost)
     def apply_discount_to_all(self):
-        for ticket in self.tickets.values():
-            if "original_price" not in ticket:  #store the original price if not already stored
-                ticket["original_price"] = ticket["price"]
-            ticket["price"] = ticket["price"] // 2  #apply discount (integer division)
+        self.pricing.add_rule(ALL_TICKETS_DISCOUNT, 50)
 
     #restore all ticket prices to their original values (without the discount)
     def disable_discount_to_all(self):
-        for ticket in self.tickets.values():
-            if "original_price" in ticket:
-                ticket["price"] = ticket["original_price"]  # Restore price
-                del ticket["original_price"]  #remove the temporary key
+        self.pricing.remove_rule(ALL_TICKETS_DISCOUNT)
+
+    #add a discount of percent % for some ticket types (None = all) from start to end (seconds since the epoch,
+    #None = no limit), a rule with the same name is replaced, it returns the new price version
+    def add_discount_rule(self, name, percent, ticket_types=None, start=None, end=None):
+        if isinstance(percent, bool) or not isinstance(percent, int) or not 0 < percent <= 100:
+            raise ValueError("The discount must be a whole percent from 1 to 100.")
+        unknown = [ticket_type for ticket_type in ticket_types or () if ticket_type not in self.tickets]
+        if unknown:
+            raise ValueError(f"Unknown ticket type {unknown[0]!r}")
+        if start is not None and end is not None and start >= end:
+            raise ValueError("The discount must end after it starts.")
+        return self.pricing.add_rule(name, percent, ticket_types, start, end)
+
+    #remove a discount rule, it returns the new price version (or None if there was no such rule)
+    def remove_discount_rule(self, name):
+        return self.pricing.remove_rule(name)
+
+    #return a price table as a dictionary {"version", "prices", "base_prices", "rules", "created"},
+    #the current one or the one of an older version (to check the cost of old orders), None if it is unknown
+    def get_price_table(self, version=None):
+        if version is None:
+            return self.pricing.current().to_dict()
+        return self.pricing.history.get(version)
 
     # ---------- Ticket Info Getter ----------
 
-    #return the full ticket dictionary
+    #return the full ticket dictionary, with the prices of the current price version
     def get_ticket_info(self):
-        return self.tickets
\ No newline at end of file
+        prices = self.pricing.current().prices
+        return {ticket_type: dict(info, price=prices[ticket_type]) for ticket_type, info in self.tickets.items()}
\ No newline at end of file
@@ -0,0 +1,291 @@
+# Import necessary modules
+import hashlib  # this is used for the digest of the orders
+import pickle  # this is used to add the string tables to the digest
+from array import array  # this is used to keep every order field in one compact column
+from bisect import bisect_left, bisect_right  # this is used to find an order by its id
+from itertools import compress, islice  # this is used to skip the deleted orders quickly
+
+# ---------- Classes ----------
+
+class StringCodes:
+    ''' a class that gives every distinct string a small number, so each order only stores the number'''
+    def __init__(self):
+        self.strings = []  #code -> string
+        self.codes = {}  #string -> code
+
+    #return the code of a string (a new string gets the next free code)
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.strings)
+            self.strings.append(value)
+            self.codes[value] = code
+        return code
+
+    #return the code of a string, or None if no order uses it
+    def lookup(self, value):
+        return self.codes.get(value)
+
+    #only the list is saved, the dictionary is rebuilt when loading
+    def __getstate__(self):
+        return self.strings
+
+    def __setstate__(self, strings):
+        self.strings = strings
+        self.codes = {value: code for code, value in enumerate(strings)}
+
+#the value of a field that older orders do not have: no price version (0 = before price versions),
+#and the race day was the day the tickets were bought
+ORDER_DEFAULTS = {"price_version": lambda order: 0, "race_date": lambda order: order["date"]}
+
+#the value of a field of an order dictionary (or its default if the order is older than the field)
+def order_value(order, field):
+    if field in order or field not in ORDER_DEFAULTS:
+        return order[field]
+    return ORDER_DEFAULTS[field](order)
+
+#bytes.translate table that turns tombstone flags (1 = deleted) into keep flags (1 = live)
+KEEP = bytes([1, 0]) + bytes(254)
+
+#the number of live orders in every block of block_size positions
+def count_live(dead, block_size):
+    return array('I', (min(block_size, len(dead) - start) - dead.count(1, start, start + block_size)
+                       for start in range(0, len(dead), block_size)))
+
+class OrderStore:
+    ''' a class that keeps orders in array columns instead of one dictionary per order
+
+    It behaves like the list of order dictionaries it replaces: reading an order returns a
+    dictionary that is built from the columns, so the rest of the program does not change.
+    Every order gets an increasing order_id. A delete only marks the order's position as a
+    tombstone, so nothing is moved, and compact() drops the tombstones later in one pass.'''
+    FIELDS = ("order_id", "username", "ticket_type", "quantity", "total_cost", "payment_method", "date",
+              "price_version", "race_date")
+    ENCODED = ("username", "ticket_type", "payment_method", "date", "race_date")  #the fields stored as string codes
+    LIMITS = {'I': (0, 2**32 - 1), 'q': (-2**63, 2**63 - 1)}  #the numbers a column of each type can hold
+    BLOCK = 1024  #positions per block when counting the live orders
+
+    def __init__(self, orders=()):
+        #one string table per encoded field (shared by all orders)
+        self.tables = {field: StringCodes() for field in self.ENCODED}
+
+        #one column per field: 'I' = 4-byte codes and quantities, 'q' = 8-byte costs and ids
+        self.columns = {field: array('I') for field in self.ENCODED}
+        self.columns["quantity"] = array('I')
+        self.columns["price_version"] = array('I')
+        self.columns["total_cost"] = array('q')
+        self.columns["order_id"] = array('q')  #always increasing, so it is also the id -> position map
+
+        #the tombstones: one flag per position, and the live orders per block to find the n-th live order
+        self.dead = bytearray()
+        self.dead_count = 0
+        self.block_live = array('I')
+        self.next_id = 1  #the id of the next new order (ids are never used twice)
+        self.extend(orders)
+
+    # ---------- Positions ----------
+
+    def __len__(self):
+        return len(self.dead) - self.dead_count
+
+    #the position in the columns of the n-th live order
+    def physical(self, position):
+        if not self.dead_count:
+            return position
+        for block, live in enumerate(self.block_live):
+            if position < live:
+                break
+            position -= live
+        for physical in range(block * self.BLOCK, len(self.dead)):
+            if not self.dead[physical]:
+                if position == 0:
+                    return physical
+                position -= 1
+        raise IndexError("order index out of range")
+
+    #the positions of the live orders, starting at a position in the columns
+    def live_positions(self, start=0):
+        if not self.dead_count:
+            return iter(range(start, len(self.dead)))
+        return compress(range(start, len(self.dead)), self.dead[start:].translate(KEEP))
+
+    #the position of an order id, or None if there is no such order (or it was deleted)
+    def find(self, order_id):
+        ids = self.columns["order_id"]
+        position = bisect_left(ids, order_id)
+        if position < len(ids) and ids[position] == order_id and not self.dead[position]:
+            return position
+        return None
+
+    #the position of the first order (deleted or not) with an id bigger than order_id,
+    #a long export goes on from here even when orders were deleted or compacted in between
+    def position_after(self, order_id):
+        return bisect_right(self.columns["order_id"], order_id)
+
+    #the share of the positions that are tombstones
+    def tombstone_ratio(self):
+        return self.dead_count / len(self.dead) if self.dead else 0.0
+
+    #a digest of every order (the columns, tombstones, string tables and next id), it changes with any order
+    def digest(self):
+        digest = hashlib.blake2b(digest_size=16)
+        for field in self.FIELDS:  #every column has one value per position, so the columns can not run together
+            digest.update(self.columns[field])
+        digest.update(self.dead)
+        digest.update(pickle.dumps(([self.tables[field].strings for field in self.ENCODED], self.next_id)))
+        return digest.hexdigest()
+
+    # ---------- Reading ----------
+
+    #build the dictionary of the order at a position in the columns
+    def decode(self, position):
+        order = {}
+        for field in self.FIELDS:
+            value = self.columns[field][position]
+            order[field] = self.tables[field].strings[value] if field in self.tables else value
+        return order
+
+    order_at = decode  #the same name as in SnapshotOrders
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            start, stop, step = position.indices(len(self))
+            if step != 1 or start >= stop:
+                return [self[index] for index in range(start, stop, step)]
+            return [self.decode(physical) for physical in islice(self.live_positions(self.physical(start)), stop - start)]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("order index out of range")
+        return self.decode(self.physical(position))
+
+    def __iter__(self):
+        for position in self.live_positions():
+            yield self.decode(position)
+
+    #return the positions (in the columns) of the live orders that match the filters,
+    #comparing codes instead of strings
+    def positions_matching(self, username=None, date=None, ticket_type=None):
+        tests = []
+        for field, value in (("username", username), ("date", date), ("ticket_type", ticket_type)):
+            if value is not None:
+                code = self.tables[field].lookup(value)
+                if code is None:
+                    return []  #no order uses this value at all
+                tests.append((self.columns[field], code))
+        if not tests:
+            return list(self.live_positions())
+        column, code = tests[0]
+        positions = [position for position, value in enumerate(column) if value == code]
+        for column, code in tests[1:]:
+            positions = [position for position in positions if column[position] == code]
+        if self.dead_count:
+            positions = [position for position in positions if not self.dead[position]]
+        return positions
+
+    # ---------- Changing ----------
+
+    #add one order dictionary, a new order gets the next id (it is also set in the dictionary)
+    #every value is checked before any column is changed, so a rejected order can not leave the columns
+    #with different lengths (which would give the fields of one order to the orders after it)
+    def append(self, order):
+        order_id = order.get("order_id")
+        if order_id is None:
+            order_id = self.next_id
+        ids = self.columns["order_id"]
+        if ids and isinstance(order_id, int) and order_id <= ids[-1]:
+            #find() looks the ids up with bisect, so they have to stay sorted
+            raise ValueError(f"The order_id of an order must be greater than the last one ({ids[-1]}), not {order_id}")
+        row = []
+        for field in self.FIELDS:
+            if field == "order_id":
+                value = order_id
+            else:
+                value = order_value(order, field)
+            if field in self.tables:
+                if not isinstance(value, str):
+                    raise TypeError(f"The {field} of an order must be text, not {value!r}")
+            else:
+                low, high = self.LIMITS[self.columns[field].typecode]
+                if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+                    raise ValueError(f"The {field} of an order must be a whole number from {low} to {high}, "
+                                     f"not {value!r}")
+            row.append(value)
+
+        for field, value in zip(self.FIELDS, row):
+            self.columns[field].append(self.tables[field].encode(value) if field in self.tables else value)
+        order["order_id"] = order_id
+        self.next_id = max(self.next_id, order_id + 1)
+        if len(self.dead) % self.BLOCK == 0:
+            self.block_live.append(0)
+        self.dead.append(0)
+        self.block_live[-1] += 1
+
+    #add several order dictionaries, either all of them or none (if one of them is rejected)
+    def extend(self, orders):
+        size = len(self.dead)
+        try:
+            for order in orders:
+                self.append(order)
+        except Exception:
+            self.discard_last(len(self.dead) - size)
+            raise
+
+    #mark the order at a position in the columns as deleted and return its dictionary
+    def tombstone(self, position):
+        if self.dead[position]:
+            return None
+        self.dead[position] = 1
+        self.block_live[position // self.BLOCK] -= 1
+        self.dead_count += 1
+        return self.decode(position)
+
+    #delete the orders with the given ids and return their dictionaries (unknown ids are skipped)
+    def remove_ids(self, order_ids):
+        removed = []
+        for order_id in order_ids:
+            position = self.find(order_id)
+            if position is not None:
+                removed.append(self.tombstone(position))
+        return removed
+
+    #remove the n-th live order and return its dictionary
+    def pop(self, position=-1):
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("order index out of range")
+        return self.tombstone(self.physical(position))
+
+    def __delitem__(self, position):
+        self.pop(position)
+
+    #take back the last orders that were added (when saving them failed), their ids are not used again
+    def discard_last(self, count):
+        size = len(self.dead) - count
+        for column in self.columns.values():
+            del column[size:]
+        self.dead_count -= self.dead.count(1, size)
+        del self.dead[size:]
+        self.block_live = count_live(self.dead, self.BLOCK)
+
+    #drop the tombstones with one pass over every column (the ids do not change)
+    def compact(self):
+        if not self.dead_count:
+            return
+        keep = self.dead.translate(KEEP)
+        for field, column in self.columns.items():
+            self.columns[field] = array(column.typecode, compress(column, keep))
+        self.dead = bytearray(len(self.columns["quantity"]))
+        self.dead_count = 0
+        self.block_live = count_live(self.dead, self.BLOCK)
+
+    #a copy for saving while orders keep changing (the columns are copied, the string tables are shared
+    #because strings are only ever added to them)
+    def copy(self):
+        duplicate = OrderStore.__new__(OrderStore)
+        duplicate.__dict__.update(self.__dict__)
+        duplicate.columns = {field: array(column.typecode, column) for field, column in self.columns.items()}
+        duplicate.dead = bytearray(self.dead)
+        duplicate.block_live = array('I', self.block_live)
+        return duplicate
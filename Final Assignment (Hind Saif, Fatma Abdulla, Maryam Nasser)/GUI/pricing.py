@@ -0,0 +1,124 @@
+# Import necessary modules
+import threading  # this is used so only one price change is made at a time
+import time  # this is used for the time windows of the discount rules
+from collections import namedtuple  # this is used for the discount rules
+from types import MappingProxyType  # this is used so a published price table can not be changed
+
+#a discount of percent % on the given ticket types (None = all of them) from start to end
+#(seconds since the epoch, None = no limit)
+DiscountRule = namedtuple("DiscountRule", "name percent ticket_types start end")
+MAX_QUOTES = 10000  #the quote cache is emptied when it gets bigger than this
+
+# ---------- Classes ----------
+
+class PriceTable:
+    ''' a class that holds one version of the ticket prices, it is never changed after it is made
+
+    A change of the rules (or a discount that starts or ends) makes a new table with the next version
+    number, so an order can always be checked against the prices of the version it was sold with.'''
+    __slots__ = ("version", "prices", "base_prices", "rules", "created", "valid_until")
+
+    def __init__(self, version, base_prices, rules, now):
+        self.version = version
+        self.base_prices = MappingProxyType(dict(base_prices))
+        self.rules = tuple(rule for rule in rules if rule.end is None or rule.end > now)  #ended rules are dropped
+        self.created = now
+        self.prices = MappingProxyType({ticket_type: self.discounted(ticket_type, price, now)
+                                        for ticket_type, price in base_prices.items()})
+        #the table is only right until the next rule starts or ends
+        boundaries = [moment for rule in self.rules for moment in (rule.start, rule.end)
+                      if moment is not None and moment > now]
+        self.valid_until = min(boundaries, default=float("inf"))
+
+    #the price of one ticket with the biggest discount that applies now (discounts are not added together)
+    def discounted(self, ticket_type, price, now):
+        percent = max((rule.percent for rule in self.rules
+                       if (rule.ticket_types is None or ticket_type in rule.ticket_types)
+                       and (rule.start is None or rule.start <= now) and (rule.end is None or now < rule.end)),
+                      default=0)
+        return price * (100 - percent) // 100
+
+    #the table as a dictionary (for saving it and for showing it)
+    def to_dict(self):
+        return {"version": self.version, "prices": dict(self.prices), "base_prices": dict(self.base_prices),
+                "rules": [rule._asdict() for rule in self.rules], "created": self.created}
+
+class PriceEngine:
+    ''' a class that hands out the current price table and caches the quotes
+
+    Buying tickets only reads: the current table is one attribute (replacing it is atomic), and the
+    quotes are cached per (ticket type, quantity, version), so a purchase never waits for a lock.
+    Changing the prices makes a new table (copy-on-write) under a lock, publishes it and starts a new
+    quote cache, so a buyer always gets prices that all come from the same version.'''
+    def __init__(self, base_prices, state=None, save=None):
+        self.lock = threading.Lock()  #only for changes, the purchases do not use it
+        self.save = save  #called with the state after every change (to keep the history in a file)
+        state = state or {}  #{"rules": [rule dictionaries], "history": [table dictionaries]} saved by save_state
+        rules = [DiscountRule(**rule) for rule in state.get("rules", [])]
+        self.history = {table["version"]: table for table in state.get("history", [])}  #{version: table dictionary}
+        self.quotes = {}  #{(ticket type, quantity, version): total cost}
+
+        #keep the version of the last run if the prices and rules are still the same
+        last = self.history[max(self.history)] if self.history else None
+        self.table = PriceTable(last["version"] if last else 1, base_prices, rules, time.time())
+        new = self.table.to_dict()
+        if last is None or any(last[key] != new[key] for key in ("prices", "base_prices", "rules")):
+            if last is not None:
+                self.table = PriceTable(last["version"] + 1, base_prices, rules, time.time())
+            self.history[self.table.version] = self.table.to_dict()
+            self.save_state()
+
+    #the price table to use now (a new version is made when a discount has started or ended since)
+    def current(self):
+        table = self.table
+        if time.time() >= table.valid_until:
+            with self.lock:
+                if self.table is table:  #another thread may have done it already
+                    self.publish(table.base_prices, table.rules)
+                table = self.table
+        return table
+
+    #return (total cost, price version) for a number of tickets
+    def quote(self, ticket_type, quantity):
+        table = self.current()
+        key = (ticket_type, quantity, table.version)
+        total_cost = self.quotes.get(key)
+        if total_cost is None:
+            total_cost = table.prices[ticket_type] * quantity
+            quotes = self.quotes
+            if len(quotes) >= MAX_QUOTES:
+                quotes = self.quotes = {}
+            quotes[key] = total_cost  #two buyers may both add it, they add the same value
+        return total_cost, table.version
+
+    # ---------- Changing the Prices ----------
+
+    #make and publish the next version (call it with the lock held)
+    def publish(self, base_prices, rules):
+        table = PriceTable(self.table.version + 1, base_prices, rules, time.time())
+        self.history[table.version] = table.to_dict()
+        self.table = table  #from now on every purchase uses the new version
+        self.quotes = {}  #the old quotes have the old version in their key, so they would not be used anyway
+        self.save_state()
+        return table
+
+    #add a discount rule (a rule with the same name is replaced), it returns the new version
+    def add_rule(self, name, percent, ticket_types=None, start=None, end=None):
+        rule = DiscountRule(name, percent, None if ticket_types is None else tuple(ticket_types), start, end)
+        with self.lock:
+            rules = [old for old in self.table.rules if old.name != name] + [rule]
+            return self.publish(self.table.base_prices, rules).version
+
+    #remove a discount rule, it returns the new version (or None if there was no such rule)
+    def remove_rule(self, name):
+        with self.lock:
+            rules = [rule for rule in self.table.rules if rule.name != name]
+            if len(rules) == len(self.table.rules):
+                return None
+            return self.publish(self.table.base_prices, rules).version
+
+    #save the rules and all versions
+    def save_state(self):
+        if self.save:
+            self.save({"rules": [rule._asdict() for rule in self.table.rules],
+                       "history": list(self.history.values())})
@@ -0,0 +1,301 @@
+# Import necessary modules
+import argparse  # this is used to read the command line options
+import asyncio  # this is used to serve many clients at once on one event loop
+import json  # this is used to read requests and write responses
+import secrets  # this is used to create the login session tokens
+import time  # this is used to forget the holds that have expired
+from datetime import datetime  # this is used to check the dates of GET /sales
+from concurrent.futures import ThreadPoolExecutor  # model calls (and their file writes) run here, off the event loop
+from urllib.parse import parse_qs, urlsplit  # this is used to read the filters of GET /orders
+from model import DEFAULT_STORAGE, TicketBookingModel, race_day  # Import the model layer
+
+# ---------- Classes ----------
+
+class HTTPError(Exception):
+    ''' an error that is sent back to the client with an HTTP status code'''
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class BookingService:
+    ''' a class that serves the booking model as a JSON-over-HTTP API without any GUI'''
+    REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+               405: "Method Not Allowed", 409: "Conflict", 500: "Internal Server Error"}
+
+    def __init__(self, model, workers=8):
+        self.model = model  #the model is thread safe, so the worker threads can share it
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.sessions = {}  #{token: username} for logged-in clients
+        #{hold id: (username, race day, expiry time)}, so only the customer who reserved seats can use or release them
+        #(every hold lasts as long, so the dictionary is in the order the holds expire)
+        self.holds = {}
+
+        #the routes of the API: {(method, path): handler}
+        self.routes = {
+            ("POST", "/accounts"): self.create_account,
+            ("POST", "/login"): self.login,
+            ("POST", "/reserve"): self.reserve,
+            ("POST", "/release"): self.release,
+            ("POST", "/purchase"): self.purchase,
+            ("GET", "/orders"): self.list_orders,
+            ("GET", "/summary"): self.sales_summary,
+            ("GET", "/sales"): self.sales_between,
+            ("GET", "/prices"): self.prices
+        }
+
+    #run a (blocking) model call in the worker threads
+    async def call_model(self, function, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, function, *args)
+
+    #return the user of a session token, or refuse the request
+    #(the token is in the JSON body, a GET request can also send it as ?token=...)
+    def session_user(self, body, query=None):
+        token = body.get("token")
+        if token is None and query:
+            token = query.get("token", [None])[0]
+        username = self.sessions.get(token) if isinstance(token, str) else None
+        if username is None:
+            raise HTTPError(401, "You must be logged in.")
+        return username
+
+    #return a YYYY-MM-DD date of the query (None if it is not given), or refuse the request
+    def query_date(self, query, name):
+        value = query.get(name, [None])[0]
+        if value is not None:
+            try:
+                if datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d") != value:
+                    raise ValueError
+            except ValueError:
+                raise HTTPError(400, f"The {name} must be a date (YYYY-MM-DD).")
+        return value
+
+    # ------------------- API Handlers -------------------
+
+    #POST /accounts {"username", "password"} -> {"created": true}
+    async def create_account(self, body, query):
+        username, password = body.get("username"), body.get("password")
+        if not isinstance(username, str) or not isinstance(password, str) or not username or not password:
+            raise HTTPError(400, "Username and Password cannot be empty.")
+        if not await self.call_model(self.model.add_account, username, password):
+            raise HTTPError(400, "Account already exists.")
+        return {"created": True}
+
+    #POST /login {"username", "password"} -> {"token"}
+    async def login(self, body, query):
+        username, password = body.get("username"), body.get("password")
+        if not isinstance(username, str) or not isinstance(password, str):
+            raise HTTPError(400, "The username and password must be text.")
+        if not await self.call_model(self.model.validate_login, username, password):
+            raise HTTPError(401, "Invalid username or password.")
+        token = secrets.token_hex(16)
+        self.sessions[token] = username
+        return {"token": token}
+
+    #check the ticket type, quantity and race day (YYYY-MM-DD, today if not given) of a request
+    def ticket_request(self, body):
+        ticket_type, quantity = body.get("ticket_type"), body.get("quantity")
+        if not isinstance(ticket_type, str) or ticket_type not in self.model.get_ticket_info():
+            raise HTTPError(400, "Unknown ticket type.")
+        if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity <= 0:
+            raise HTTPError(400, "Enter a valid quantity.")
+        try:
+            race_date = race_day(body.get("race_date"))
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        return ticket_type, quantity, race_date
+
+    #return the hold id of a request if it belongs to the session user
+    def session_hold(self, body, username):
+        hold_id = body.get("hold_id")
+        if hold_id is not None and self.holds.get(hold_id, (None,))[0] != username:
+            raise HTTPError(404, "Unknown hold.")
+        return hold_id
+
+    #forget the holds that have expired, the oldest ones are at the front of the dictionary
+    def prune_holds(self):
+        now = time.monotonic()
+        while self.holds:
+            hold_id = next(iter(self.holds))
+            if self.holds[hold_id][2] > now:
+                break
+            del self.holds[hold_id]
+
+    #POST /reserve {"token", "ticket_type", "quantity", optional "race_date"} -> {"hold_id"}, the seats are held for a while
+    async def reserve(self, body, query):
+        username = self.session_user(body)
+        ticket_type, quantity, race_date = self.ticket_request(body)
+        self.prune_holds()
+        hold_id = await self.call_model(self.model.reserve_tickets, ticket_type, quantity, race_date)
+        if hold_id is None:
+            raise HTTPError(409, "Sold out.")
+        self.holds[hold_id] = (username, race_date, time.monotonic() + self.model.inventory.hold_seconds)
+        return {"hold_id": hold_id}
+
+    #POST /release {"token", "hold_id"} -> {"released": true/false}
+    async def release(self, body, query):
+        hold_id = self.session_hold(body, self.session_user(body))
+        released = await self.call_model(self.model.release_hold, hold_id)
+        self.holds.pop(hold_id, None)
+        return {"released": released}
+
+    #POST /purchase {"token", "ticket_type", "quantity", "payment_method", optional "race_date" and "hold_id"}
+    #-> {"total_cost"}, with a hold the race day of the hold is used
+    async def purchase(self, body, query):
+        username = self.session_user(body)
+        ticket_type, quantity, race_date = self.ticket_request(body)
+        hold_id = self.session_hold(body, username)
+        if hold_id is not None:
+            held_date = self.holds[hold_id][1]
+            if body.get("race_date") is not None and race_date != held_date:
+                raise HTTPError(400, f"The hold is for {held_date}.")
+            race_date = held_date
+        payment_method = body.get("payment_method", "Credit Card")
+        if not isinstance(payment_method, str):
+            raise HTTPError(400, "The payment method must be text.")
+        total_cost = await self.call_model(self.model.purchase_ticket, username, ticket_type, quantity,
+                                           payment_method, race_date, hold_id)
+        if total_cost is None:  #a hold that does not match the order stays, so it can still be used
+            raise HTTPError(409, "Sold out." if hold_id is None else "The hold expired or is for other tickets.")
+        self.holds.pop(hold_id, None)  #the held seats are sold now
+        return {"total_cost": total_cost}
+
+    #GET /orders?token=...&date=...&ticket_type=... -> [orders], only the orders of the logged-in user
+    #(there are no admin accounts, so a username filter can only name the user of the session)
+    async def list_orders(self, body, query):
+        username = self.session_user(body, query)
+        if query.get("username", [username])[0] != username:
+            raise HTTPError(403, "You can only see your own orders.")
+        date, ticket_type = [query.get(name, [None])[0] for name in ("date", "ticket_type")]
+        orders = await self.call_model(lambda: list(self.model.get_orders(username, date, ticket_type)))
+        return orders
+
+    #GET /summary?token=... -> the sales summary
+    async def sales_summary(self, body, query):
+        self.session_user(body, query)
+        return await self.call_model(self.model.get_sales_summary_copy)
+
+    #GET /sales?token=...&start=YYYY-MM-DD&end=YYYY-MM-DD -> tickets and revenue in that date range
+    async def sales_between(self, body, query):
+        self.session_user(body, query)
+        start, end = self.query_date(query, "start"), self.query_date(query, "end")
+        if start and end and start > end:
+            raise HTTPError(400, "The start date must be before the end date.")
+        return await self.call_model(self.model.get_sales_between, start, end)
+
+    #GET /prices?version=N -> the current price table, or the one of an older version (the price_version of an order)
+    async def prices(self, body, query):
+        version = query.get("version", [None])[0]
+        if version is not None and not version.isdigit():
+            raise HTTPError(400, "The version must be a number.")
+        table = await self.call_model(self.model.get_price_table, None if version is None else int(version))
+        if table is None:
+            raise HTTPError(404, "Unknown price version.")
+        return table
+
+    # ------------------- HTTP Handling -------------------
+
+    #read one request from the connection, it returns None when the client has closed it
+    async def read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(400, "Malformed request line.")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+        keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+        return method, target, body, keep_alive
+
+    #send one JSON response
+    async def write_response(self, writer, status, data, keep_alive):
+        payload = json.dumps(data).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {self.REASONS.get(status, 'Error')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + payload)
+        await writer.drain()
+
+    #serve all requests of one client connection
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self.read_request(reader)
+                    if request is None:
+                        break
+                    method, target, raw_body, keep_alive = request
+                    url = urlsplit(target)
+                    handler = self.routes.get((method, url.path))
+                    if handler is None:
+                        known_path = any(path == url.path for _, path in self.routes)
+                        raise HTTPError(405 if known_path else 404, "No such endpoint.")
+                    try:
+                        body = json.loads(raw_body) if raw_body else {}
+                    except ValueError:
+                        raise HTTPError(400, "The request body must be JSON.")
+                    if not isinstance(body, dict):
+                        raise HTTPError(400, "The request body must be a JSON object.")
+                    status, data = 200, await handler(body, parse_qs(url.query))
+                except HTTPError as e:
+                    status, data = e.status, {"error": str(e)}
+                except Exception as e:  # catch all other errors so one request can not stop the server
+                    status, data = 500, {"error": str(e)}
+
+                await self.write_response(writer, status, data, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  #the client went away
+        finally:
+            writer.close()
+
+    #start listening and serve until the task is cancelled
+    async def serve(self, host="127.0.0.1", port=8080):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+    #stop the worker threads and finish all pending writes
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.model.close()
+
+# ------------------- Main Program Entry Point -------------------
+
+#start the service
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless Grand Prix ticket booking service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--storage", choices=["pickle", "snapshot", "sharded", "sqlite"], default=DEFAULT_STORAGE)
+    parser.add_argument("--shard-by", choices=["username", "month"], default="username",
+                        help="how the orders are split (sharded storage)")
+    parser.add_argument("--journal", action="store_true", help="append orders to a journal (pickle storage)")
+    parser.add_argument("--group-commit", type=float, default=None, metavar="SECONDS",
+                        help="let concurrent purchases share one write within this window")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    service = BookingService(TicketBookingModel(storage=args.storage, journal=args.journal,
+                                                group_commit_window=args.group_commit, shard_by=args.shard_by),
+                             workers=args.workers)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
@@ -0,0 +1,417 @@
+# Import necessary modules
+from array import array  # this is used for the live record counts
+from itertools import compress, islice  # this is used to skip the deleted snapshot records quickly
+import mmap  # this is used to read the snapshot file without loading it into memory
+import os  # this is used for syncing and swapping in the new snapshot file
+import pickle  # this is used for the string tables and the aggregates sections
+import struct  # this is used to read and write the header and the fixed-size records
+import sys  # this is used to check the byte order before reading the records as raw words
+from orderstore import KEEP, OrderStore, StringCodes, count_live  # the in-memory order store used for new orders
+
+# ---------- Snapshot Format ----------
+#
+# header | record blocks | block index | string tables | aggregates
+#
+# The header has a fixed size and holds the counts and totals, so they can be read without touching
+# the orders. Every record has the same size and the records are grouped in blocks of BLOCK_RECORDS,
+# so a block is found through the block index and only the blocks that are used get decoded.
+
+MAGIC = b"GPORDERS"
+VERSION = 1
+BLOCK_RECORDS = 4096  #records per block
+
+#magic, version, flags, order count, records per block, record size, journal sequence number,
+#total quantity, total revenue, the offsets/lengths of the other sections, and the next order id
+#(no flags are defined yet, so a file with flags was written by a newer program and is refused,
+#the total quantity and revenue of the records are used to check the saved aggregates)
+PREFIX = struct.Struct("<8sH")
+HEADER = struct.Struct("<8sHHQIIQqqQQQQQQQ")
+
+#username, ticket type, payment method, date and race day codes, quantity, total cost, order id, price version
+RECORD = struct.Struct("<IIIIIIqqI")
+ORDER_ID = struct.Struct("<q")  #the order id, right after the total cost
+ORDER_ID_OFFSET = struct.calcsize("<IIIIIIq")
+ENCODED = ("username", "ticket_type", "payment_method", "date", "race_date")
+
+class SnapshotHeader:
+    ''' a class that holds the values of a snapshot header'''
+    def __init__(self, values):
+        (self.magic, self.version, self.flags, self.order_count, self.block_records, self.record_size,
+         self.journal_seq, self.total_quantity, self.total_revenue, self.records_offset, self.index_offset,
+         self.tables_offset, self.tables_length, self.aggregates_offset, self.aggregates_length,
+         self.next_order_id) = values
+
+#the packed records of the live orders in an OrderStore, encoded with the given string tables
+def store_records(store, tables):
+    #the codes of the store are mapped to the codes of the new tables
+    mapping = [[tables[field].encode(value) for value in store.tables[field].strings] for field in ENCODED]
+    columns = [store.columns[field] for field in ENCODED + ("quantity", "total_cost", "order_id", "price_version")]
+    rows = zip(*columns)
+    if store.dead_count:
+        rows = compress(rows, store.dead.translate(KEEP))
+    for username, ticket_type, payment_method, date, race_date, quantity, total_cost, order_id, price_version in rows:
+        yield RECORD.pack(mapping[0][username], mapping[1][ticket_type], mapping[2][payment_method],
+                          mapping[3][date], mapping[4][race_date], quantity, total_cost, order_id, price_version)
+
+#a function to write a snapshot file from an OrderStore or a SnapshotOrders
+def write_snapshot(file_name, orders, journal_seq, aggregates):
+    tables = {field: StringCodes() for field in ENCODED}
+    records = orders.iter_records(tables) if isinstance(orders, SnapshotOrders) else store_records(orders, tables)
+    temp_name = file_name + ".tmp"
+    try:
+        with open(temp_name, 'wb') as file:
+            file.write(b"\0" * HEADER.size)  #the header is written last, when everything is known
+            records_offset = file.tell()
+            block_offsets, count, total_quantity, total_revenue = [], 0, 0, 0
+
+            for record in records:
+                if count % BLOCK_RECORDS == 0:
+                    block_offsets.append(file.tell())
+                file.write(record)
+                quantity, total_cost = RECORD.unpack(record)[5:7]
+                total_quantity += quantity
+                total_revenue += total_cost
+                count += 1
+
+            index_offset = file.tell()
+            file.write(struct.pack(f"<{len(block_offsets)}Q", *block_offsets))
+            tables_offset = file.tell()
+            file.write(pickle.dumps({field: table.strings for field, table in tables.items()}))
+            aggregates_offset = file.tell()
+            file.write(pickle.dumps(aggregates))
+            end = file.tell()
+
+            file.seek(0)
+            file.write(HEADER.pack(MAGIC, VERSION, 0, count, BLOCK_RECORDS, RECORD.size, journal_seq,
+                                   total_quantity, total_revenue, records_offset, index_offset,
+                                   tables_offset, aggregates_offset - tables_offset,
+                                   aggregates_offset, end - aggregates_offset, orders.next_id))
+            file.flush()
+            os.fsync(file.fileno())
+        return temp_name  #the caller swaps it in with os.replace once the old file is closed
+    except Exception as e:  # catch any errors during saving
+        raise IOError(f"Could not save data: {e}")  # Raise an error
+
+# ---------- Classes ----------
+
+class SnapshotOrders:
+    ''' a class that reads orders from a memory-mapped snapshot file only when they are used
+
+    It behaves like the OrderStore: the snapshot records are never changed, deleted ones are
+    tombstones, and new orders are kept in an OrderStore after them. A position below snapshot_count
+    is a record in the file, the positions after it are the positions in the OrderStore.'''
+    CACHED_BLOCKS = 64  #how many decoded blocks are kept
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.file, self.map, self.header = None, None, None
+        self.snapshot_count = 0
+        self.dead = bytearray()  #1 = the snapshot record at this position was deleted
+        self.dead_count = 0
+        self.block_live = array('I')  #live snapshot records per block of BLOCK_RECORDS
+        self.tail = OrderStore()  #orders added after the snapshot was written
+        self.blocks = {}  #{block number: [record tuples]}
+        self.tables = None  #the string tables are loaded the first time an order is decoded
+        self.codes = None  #{field: {string: code}} for the filters
+        self.block_offsets = None
+
+        if os.path.exists(file_name) and os.path.getsize(file_name) >= HEADER.size:
+            self.file = open(file_name, 'rb')
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version = PREFIX.unpack_from(self.map, 0)
+            if magic != MAGIC or version != VERSION:
+                raise IOError(f"Could not load data: {file_name} is not a version {VERSION} orders snapshot")
+            self.header = SnapshotHeader(HEADER.unpack_from(self.map, 0))
+            if self.header.record_size != RECORD.size or self.header.block_records != BLOCK_RECORDS:
+                raise IOError(f"Could not load data: {file_name} has {self.header.record_size}-byte records in blocks of "
+                              f"{self.header.block_records}, this program reads {RECORD.size}-byte records in blocks of "
+                              f"{BLOCK_RECORDS}")
+            if self.header.flags:
+                raise IOError(f"Could not load data: {file_name} uses features this program does not know "
+                              f"(flags {self.header.flags:#x})")
+            self.snapshot_count = self.header.order_count
+            self.dead = bytearray(self.snapshot_count)
+            self.block_live = count_live(self.dead, BLOCK_RECORDS)
+            self.tail.next_id = self.header.next_order_id
+
+    # ---------- Header Values ----------
+
+    #the journal sequence number of the last change included in the snapshot
+    def journal_seq(self):
+        return self.header.journal_seq if self.header else 0
+
+    #the sales summary and customer totals saved in the snapshot (None if there is no snapshot, or if
+    #their ticket and revenue totals do not match the records, then they have to be built again)
+    def read_aggregates(self):
+        if not self.header:
+            return None
+        start = self.header.aggregates_offset
+        aggregates = pickle.loads(self.map[start:start + self.header.aggregates_length])
+        summary = aggregates.get("sales_summary", {})
+        quantity = sum(sum(day.values()) for day in summary.get("tickets", {}).values())
+        revenue = sum(summary.get("revenue_by_date", {}).values())
+        if quantity != self.header.total_quantity or revenue != self.header.total_revenue:
+            return None
+        return aggregates
+
+    # ---------- Decoding ----------
+
+    #load the string tables and the block index
+    def load_tables(self):
+        start = self.header.tables_offset
+        self.tables = pickle.loads(self.map[start:start + self.header.tables_length])
+        self.codes = {field: {value: code for code, value in enumerate(strings)} for field, strings in self.tables.items()}
+        block_count = (self.snapshot_count + BLOCK_RECORDS - 1) // BLOCK_RECORDS
+        self.block_offsets = struct.unpack_from(f"<{block_count}Q", self.map, self.header.index_offset)
+
+    #return the decoded records of one block
+    def block(self, number):
+        records = self.blocks.get(number)
+        if records is None:
+            if self.tables is None:
+                self.load_tables()
+            start = self.block_offsets[number]
+            size = min(BLOCK_RECORDS, self.snapshot_count - number * BLOCK_RECORDS) * RECORD.size
+            records = list(RECORD.iter_unpack(self.map[start:start + size]))
+            if len(self.blocks) >= self.CACHED_BLOCKS:
+                del self.blocks[next(iter(self.blocks))]  #forget the oldest block
+            self.blocks[number] = records
+        return records
+
+    #build the dictionary of one snapshot record
+    def decode(self, physical):
+        record = self.block(physical // BLOCK_RECORDS)[physical % BLOCK_RECORDS]
+        username, ticket_type, payment_method, date, race_date, quantity, total_cost, order_id, price_version = record
+        return {
+            "order_id": order_id,
+            "username": self.tables["username"][username],
+            "ticket_type": self.tables["ticket_type"][ticket_type],
+            "quantity": quantity,
+            "total_cost": total_cost,
+            "payment_method": self.tables["payment_method"][payment_method],
+            "date": self.tables["date"][date],
+            "price_version": price_version,
+            "race_date": self.tables["race_date"][race_date]
+        }
+
+    #build the dictionary of the order at a position (a snapshot record or an order of the tail)
+    def order_at(self, physical):
+        if physical < self.snapshot_count:
+            return self.decode(physical)
+        return self.tail.decode(physical - self.snapshot_count)
+
+    #the number of snapshot records that are not deleted
+    def live_snapshot_count(self):
+        return self.snapshot_count - self.dead_count
+
+    #the position of the n-th live order
+    def physical(self, position):
+        if position >= self.live_snapshot_count():
+            return self.snapshot_count + self.tail.physical(position - self.live_snapshot_count())
+        if not self.dead_count:
+            return position
+        for block, live in enumerate(self.block_live):
+            if position < live:
+                break
+            position -= live
+        for physical in range(block * BLOCK_RECORDS, self.snapshot_count):
+            if not self.dead[physical]:
+                if position == 0:
+                    return physical
+                position -= 1
+        raise IndexError("order index out of range")
+
+    #the positions of the live orders, starting at a position
+    def live_positions(self, start=0):
+        if start < self.snapshot_count:
+            if self.dead_count:
+                yield from compress(range(start, self.snapshot_count), self.dead[start:].translate(KEEP))
+            else:
+                yield from range(start, self.snapshot_count)
+        for position in self.tail.live_positions(max(0, start - self.snapshot_count)):
+            yield self.snapshot_count + position
+
+    #the order id of a snapshot record (read straight from the file)
+    def snapshot_id(self, physical):
+        return ORDER_ID.unpack_from(self.map, self.header.records_offset + physical * RECORD.size + ORDER_ID_OFFSET)[0]
+
+    #the position of an order id, or None if there is no such order (or it was deleted)
+    def find(self, order_id):
+        if self.snapshot_count and order_id <= self.snapshot_id(self.snapshot_count - 1):
+            low, high = 0, self.snapshot_count  #the ids in the file are in increasing order
+            while low < high:
+                middle = (low + high) // 2
+                if self.snapshot_id(middle) < order_id:
+                    low = middle + 1
+                else:
+                    high = middle
+            if self.snapshot_id(low) == order_id and not self.dead[low]:
+                return low
+            return None
+        position = self.tail.find(order_id)
+        return None if position is None else self.snapshot_count + position
+
+    #the position of the first order (deleted or not) with an id bigger than order_id
+    def position_after(self, order_id):
+        if self.snapshot_count and order_id < self.snapshot_id(self.snapshot_count - 1):
+            low, high = 0, self.snapshot_count
+            while low < high:
+                middle = (low + high) // 2
+                if self.snapshot_id(middle) <= order_id:
+                    low = middle + 1
+                else:
+                    high = middle
+            return low
+        return self.snapshot_count + self.tail.position_after(order_id)
+
+    #the id the next new order gets
+    @property
+    def next_id(self):
+        return self.tail.next_id
+
+    #the share of the orders that are tombstones
+    def tombstone_ratio(self):
+        total = self.snapshot_count + len(self.tail.dead)
+        return (self.dead_count + self.tail.dead_count) / total if total else 0.0
+
+    # ---------- Reading ----------
+
+    def __len__(self):
+        return self.live_snapshot_count() + len(self.tail)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            start, stop, step = position.indices(len(self))
+            if step != 1 or start >= stop:
+                return [self[index] for index in range(start, stop, step)]
+            return [self.order_at(physical) for physical in islice(self.live_positions(self.physical(start)), stop - start)]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("order index out of range")
+        return self.order_at(self.physical(position))
+
+    def __iter__(self):
+        for physical in self.live_positions():
+            yield self.order_at(physical)
+
+    #return the positions of the orders that match the filters, comparing codes instead of strings
+    def positions_matching(self, username=None, date=None, ticket_type=None):
+        positions = []
+        if self.snapshot_count:
+            if self.tables is None:
+                self.load_tables()
+            tests = []
+            for field, column, value in (("username", 0, username), ("date", 3, date), ("ticket_type", 1, ticket_type)):
+                if value is not None:
+                    if value not in self.codes[field]:
+                        tests = None  #no snapshot order uses this value
+                        break
+                    tests.append((column, self.codes[field][value]))
+            if tests is not None:
+                positions = self.physical_matching(tests)
+                if self.dead_count:
+                    positions = [physical for physical in positions if not self.dead[physical]]
+                else:
+                    positions = list(positions)
+        offset = self.snapshot_count
+        positions.extend(offset + position for position in self.tail.positions_matching(username, date, ticket_type))
+        return positions
+
+    #the file positions of the snapshot records whose code columns match all tests [(column, code)],
+    #the records are read as 4-byte words straight from the mapped file without decoding them
+    def physical_matching(self, tests):
+        if not tests:
+            return range(self.snapshot_count)
+        if sys.byteorder != "little":  #the file is little-endian, so decode the blocks instead
+            return [physical for physical in range(self.snapshot_count)
+                    if all(self.block(physical // BLOCK_RECORDS)[physical % BLOCK_RECORDS][column] == code
+                           for column, code in tests)]
+        start = self.header.records_offset
+        words_per_record = RECORD.size // 4
+        matches = None
+        with memoryview(self.map) as raw, raw[start:start + self.snapshot_count * RECORD.size] as records, \
+                records.cast('I') as words:
+            for column, code in tests:
+                with words[column::words_per_record] as values:
+                    if matches is None:
+                        matches = [physical for physical, value in enumerate(values) if value == code]
+                    else:
+                        matches = [physical for physical in matches if values[physical] == code]
+        return matches
+
+    #the packed records of every order, encoded with the given string tables (used to write a new snapshot)
+    def iter_records(self, tables):
+        if self.snapshot_count:
+            if self.tables is None:
+                self.load_tables()
+            #the codes of this snapshot are mapped to the codes of the new tables
+            mapping = [[tables[field].encode(value) for value in self.tables[field]] for field in ENCODED]
+            for physical in compress(range(self.snapshot_count), self.dead.translate(KEEP)):
+                record = RECORD.unpack_from(self.map, self.header.records_offset + physical * RECORD.size)
+                yield RECORD.pack(mapping[0][record[0]], mapping[1][record[1]], mapping[2][record[2]],
+                                  mapping[3][record[3]], mapping[4][record[4]], *record[5:])
+        yield from store_records(self.tail, tables)
+
+    # ---------- Changing ----------
+
+    #add one order dictionary
+    def append(self, order):
+        self.tail.append(order)
+
+    #add several order dictionaries (all of them or none)
+    def extend(self, orders):
+        self.tail.extend(orders)
+
+    #mark the order at a position as deleted and return its dictionary
+    def tombstone(self, physical):
+        if physical >= self.snapshot_count:
+            return self.tail.tombstone(physical - self.snapshot_count)
+        if self.dead[physical]:
+            return None
+        self.dead[physical] = 1
+        self.block_live[physical // BLOCK_RECORDS] -= 1
+        self.dead_count += 1
+        return self.decode(physical)
+
+    #delete the orders with the given ids and return their dictionaries (unknown ids are skipped)
+    def remove_ids(self, order_ids):
+        removed = []
+        for order_id in order_ids:
+            physical = self.find(order_id)
+            if physical is not None:
+                removed.append(self.tombstone(physical))
+        return removed
+
+    #remove the n-th live order and return its dictionary
+    def pop(self, position=-1):
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("order index out of range")
+        return self.tombstone(self.physical(position))
+
+    def __delitem__(self, position):
+        self.pop(position)
+
+    #take back the last orders that were added (when saving them failed)
+    def discard_last(self, count):
+        self.tail.discard_last(count)
+
+    #a copy for saving while orders keep changing (the mapped file is shared, it is never changed)
+    def copy(self):
+        duplicate = SnapshotOrders.__new__(SnapshotOrders)
+        duplicate.__dict__.update(self.__dict__)
+        duplicate.dead = bytearray(self.dead)
+        duplicate.block_live = array('I', self.block_live)
+        duplicate.tail = self.tail.copy()
+        duplicate.blocks = {}
+        return duplicate
+
+    #release the mapped file
+    def close(self):
+        self.blocks = {}
+        if self.map:
+            self.map.close()
+            self.file.close()
+            self.map, self.file = None, None
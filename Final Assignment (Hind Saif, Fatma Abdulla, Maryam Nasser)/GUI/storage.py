@@ -0,0 +1,1284 @@
+# Import necessary modules
+import hashlib  # this is used for the checksum of the saved sales summary
+import os  # this is used for renaming, syncing and removing files
+import queue  # this is used to hand the results of background writes back to the GUI
+import pickle  # this is used for serializing (saving) and deserializing (loading) Python objects to/from files
+import sqlite3  # this is used for the embedded database backend
+import struct  # this is used to write the length prefix of every journal record
+import threading  # this is used for the background journal compaction and to guard shared data
+import time  # this is used for the group commit window
+import zlib  # this is used to choose the shard of a username
+from concurrent.futures import ProcessPoolExecutor  # this is used to load the shards on several cores
+from itertools import islice  # this is used to read one page of orders
+from orderstore import OrderStore, order_value  # the compact in-memory representation of the orders
+from snapshot import SnapshotOrders, write_snapshot  # the memory-mapped snapshot file format
+
+# ---------- File Utility Functions ----------
+
+#this is told the bytes of every read and write of a storage file, direction is "read" or "written"
+#(it does nothing until the metrics replace it, see Metrics.instrument_storage)
+def record_io(file_name, direction, size):
+    pass
+
+#a function to save data to a binary (.pkl) file
+def save_data(file_name, data):
+    #Save data to a pickle file
+    try:
+        temp_name = file_name + ".tmp"  #write a temporary file first, so a failed save never leaves half a file
+        with open(temp_name, 'wb') as file:  # open the file in write-binary mode
+            pickle.dump(data, file)  # save the Python object to the file
+            size = file.tell()
+        os.replace(temp_name, file_name)  # then swap it in at once
+        record_io(file_name, "written", size)
+    except Exception as e:  # catch any errors during saving
+        raise IOError(f"Could not save data: {e}")  # Raise an error
+
+#a function to load data from a binary (.pkl) file
+def load_data(file_name):
+    #Load data from a pickle file
+    if 'orders' in file_name:
+        return load_orders(file_name)[0]  # orders also need their journal replayed
+    try:
+        with open(file_name, 'rb') as file:  # open the file in read-binary mode
+            data = pickle.load(file)  # load the object from the file
+            record_io(file_name, "read", file.tell())
+
+            # check what type of object is expected based on the filename
+            if 'accounts' in file_name:
+                return data if isinstance(data, dict) else {}  # expect a dictionary for accounts
+            return data
+    except FileNotFoundError:  # if the file does not exist
+        return {} if 'accounts' in file_name else []  # return an empty structure depending on file type
+    except Exception as e:  # catch all other errors
+        raise IOError(f"Could not load data: {e}")  # Raise error
+
+#a function to load an orders file and replay its journal, it returns (orders, snapshot sequence number)
+def load_orders(file_name):
+    try:
+        with open(file_name, 'rb') as file:
+            data = pickle.load(file)
+            seq = load_snapshot_seq(file)
+            record_io(file_name, "read", file.tell())
+    except FileNotFoundError:  # the journal can exist without a snapshot
+        data, seq = [], 0
+    except Exception as e:
+        raise IOError(f"Could not load data: {e}")
+
+    #expect an order store (older files hold a list of dictionaries, which is converted)
+    orders = data if isinstance(data, OrderStore) else OrderStore(data if isinstance(data, list) else [])
+    return replay_journal(orders, file_name, seq), seq
+
+#a function to load the orders of the default (snapshot) backend: once orders.snap exists the .pkl file
+#is no longer updated, so the snapshot and its journal are read, otherwise the .pkl file and its journal
+def load_current_orders(orders_file="orders.pkl", snapshot_file="orders.snap"):
+    if not os.path.exists(snapshot_file):
+        return load_orders(orders_file)[0]
+    snapshot = SnapshotOrders(snapshot_file)
+    try:
+        replay_journal(snapshot, snapshot_file, snapshot.journal_seq())
+        orders = OrderStore(snapshot)  #a copy in memory, so the mapped file can be closed
+        orders.next_id = snapshot.next_id  #the ids of deleted orders are not used again
+        return orders
+    finally:
+        snapshot.close()
+
+# ---------- Sales Summary Functions ----------
+
+#an empty sales summary (the model keeps it up to date after every change)
+def empty_sales_summary():
+    return {
+        "tickets": {},  # {date: {ticket_type: quantity}}
+        "revenue_by_date": {},  # {date: revenue}
+        "revenue_by_ticket_type": {},  # {ticket_type: revenue}
+        "revenue_by_payment_method": {},  # {payment_method: revenue}
+        "daily_totals": {},  # {date: {"ticket_type": {name: [quantity, revenue]}, "payment_method": {...}}}
+        "race_days": {}  # {race_date: {ticket_type: quantity}}, the seats sold for every race day
+    }
+
+#add (sign = 1) or remove (sign = -1) one order from a sales summary
+def update_sales_summary(summary, order, sign):
+    date, ticket_type = order.get("date", "Unknown"), order.get("ticket_type", "Unknown")
+    for group, key in (("tickets", date), ("race_days", order.get("race_date", date))):
+        day = summary[group].setdefault(key, {})
+        day[ticket_type] = day.get(ticket_type, 0) + sign * order.get("quantity", 0)
+        if day[ticket_type] == 0:  #remove entries that have no tickets left
+            del day[ticket_type]
+            if not day:
+                del summary[group][key]
+    for key, group in ((date, "revenue_by_date"), (ticket_type, "revenue_by_ticket_type"),
+                       (order.get("payment_method", "Unknown"), "revenue_by_payment_method")):
+        totals = summary[group]
+        totals[key] = totals.get(key, 0) + sign * order.get("total_cost", 0)
+        if totals[key] == 0:
+            del totals[key]
+
+    #the quantity and revenue of every day per ticket type and payment method (for the date range index)
+    daily = summary["daily_totals"].setdefault(date, {})
+    for group in ("ticket_type", "payment_method"):
+        totals = daily.setdefault(group, {})
+        name = order.get(group, "Unknown")
+        values = totals.setdefault(name, [0, 0])
+        values[0] += sign * order.get("quantity", 0)
+        values[1] += sign * order.get("total_cost", 0)
+        if values == [0, 0]:
+            del totals[name]
+            if not totals:
+                del daily[group]
+    if not daily:
+        del summary["daily_totals"][date]
+
+#add (sign = 1) or remove (sign = -1) one order from the per-customer totals
+def update_customer_totals(totals, order, sign):
+    stats = totals.setdefault(order["username"], {"orders": 0, "quantity": 0, "total_spent": 0})
+    stats["orders"] += sign
+    stats["quantity"] += sign * order["quantity"]
+    stats["total_spent"] += sign * order["total_cost"]
+
+#the checksum that protects a saved summary
+def summary_checksum(summary, orders_key):
+    return hashlib.sha256(pickle.dumps((summary, orders_key))).hexdigest()
+
+#a function to save the sales summary together with the digest of the orders it was made from
+def save_summary(file_name, summary, orders_key):
+    save_data(file_name, {"summary": summary, "orders_key": orders_key,
+                          "checksum": summary_checksum(summary, orders_key)})
+
+#a function to load a saved sales summary, it returns None if the summary can not be trusted
+#(it is only used if the orders are exactly the ones it was made from, not just as many)
+def load_summary(file_name, orders_key):
+    try:
+        with open(file_name, 'rb') as file:
+            data = pickle.load(file)
+            record_io(file_name, "read", file.tell())
+        os.remove(file_name)  #the summary is only valid until the next change, so it is saved again on close
+    except Exception:  #a missing or broken file just means the summary is rebuilt
+        return None
+    if not isinstance(data, dict) or data.get("orders_key") != orders_key:
+        return None
+    if not isinstance(data.get("summary"), dict) or set(data["summary"]) != set(empty_sales_summary()):
+        return None  #saved by an older version that kept fewer totals
+    if data.get("checksum") != summary_checksum(data.get("summary"), orders_key):
+        return None
+    return data["summary"]
+
+# ---------- Chunked Reading Functions ----------
+
+#True if an order matches the filters (start and end are dates, both included, None means no limit)
+def order_matches(order, username=None, start=None, end=None, ticket_type=None):
+    return ((username is None or order["username"] == username)
+            and (ticket_type is None or order["ticket_type"] == ticket_type)
+            and (start is None or order["date"] >= start) and (end is None or order["date"] <= end))
+
+#read up to chunk_size orders after an order id from an OrderStore or SnapshotOrders,
+#it returns (the ones matching the filters, the last order id that was read, or None at the end)
+def read_chunk(orders, after_id, chunk_size, filters):
+    positions = list(islice(orders.live_positions(orders.position_after(after_id)), chunk_size))
+    if not positions:
+        return [], None
+    chunk = [orders.order_at(position) for position in positions]
+    return [order for order in chunk if order_matches(order, **filters)], chunk[-1]["order_id"]
+
+#yield the matching orders of one order store in chunks, the lock is only held while one chunk is read
+def iter_store_chunks(orders, lock, chunk_size, filters):
+    last_id = 0
+    while last_id is not None:
+        with lock:
+            chunk, last_id = read_chunk(orders, last_id, chunk_size, filters)
+        if chunk:
+            yield chunk
+
+# ---------- Order Journal Functions ----------
+
+#every journal record is written as a 4-byte length followed by the pickled record
+RECORD_HEADER = struct.Struct("<I")
+
+#the journal is kept next to the orders file (orders.pkl -> orders.pkl.log)
+def journal_file_name(file_name):
+    return file_name + ".log"
+
+#while a compaction is running the previous journal is kept under this name
+def old_journal_file_name(file_name):
+    return file_name + ".log.old"
+
+#a function to save an orders snapshot together with the last journal record it includes
+def save_snapshot(file_name, orders, journal_seq):
+    try:
+        temp_name = file_name + ".tmp"
+        with open(temp_name, 'wb') as file:
+            pickle.dump(orders, file)  # the list comes first so older versions can still read the file
+            pickle.dump(journal_seq, file)  # then the sequence number of the last record in the snapshot
+            file.flush()
+            os.fsync(file.fileno())
+            size = file.tell()
+        os.replace(temp_name, file_name)  # swap the new snapshot in at once
+        record_io(file_name, "written", size)
+    except Exception as e:  # catch any errors during saving
+        raise IOError(f"Could not save data: {e}")  # Raise an error
+
+#read the journal sequence number stored after the orders list (0 for plain pickle files)
+def load_snapshot_seq(file):
+    try:
+        seq = pickle.load(file)
+        return seq if isinstance(seq, int) else 0
+    except EOFError:
+        return 0
+
+#append one length-prefixed record to an open journal file
+def append_record(file, record):
+    payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+    file.write(RECORD_HEADER.pack(len(payload)) + payload)
+    record_io(file.name, "written", RECORD_HEADER.size + len(payload))
+
+#read every complete record from a journal file
+def read_records(file_name):
+    records = []
+    try:
+        with open(file_name, 'rb') as file:
+            while True:
+                header = file.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                size = RECORD_HEADER.unpack(header)[0]
+                payload = file.read(size)
+                if len(payload) < size:
+                    break  # the last write was cut off, so it was never confirmed to the user
+                records.append(pickle.loads(payload))
+            record_io(file_name, "read", file.tell())
+    except FileNotFoundError:
+        pass
+    return records
+
+#apply the journal records that are newer than the snapshot to the orders,
+#on_change(order, sign) is called for every added (1) or removed (-1) order if it is given
+def replay_journal(orders, file_name, snapshot_seq, on_change=None):
+    for log_name in (old_journal_file_name(file_name), journal_file_name(file_name)):
+        for seq, action, value in read_records(log_name):
+            if seq <= snapshot_seq:
+                continue  # this record is already part of the snapshot
+            if action == "add":
+                orders.append(value)
+                changes = [(value, 1)]
+            elif action == "add_many":
+                orders.extend(value)
+                changes = [(order, 1) for order in value]
+            elif action == "delete_ids":
+                changes = [(order, -1) for order in orders.remove_ids(value)]
+            else:
+                continue
+            if on_change:
+                for order, sign in changes:
+                    on_change(order, sign)
+    return orders
+
+#remove the journal files of an orders file
+def discard_journal(file_name):
+    for log_name in (old_journal_file_name(file_name), journal_file_name(file_name)):
+        if os.path.exists(log_name):
+            os.remove(log_name)
+
+# ---------- Classes ----------
+
+class OrderJournal:
+    ''' a class that appends order changes to a log instead of rewriting the whole orders file'''
+    def __init__(self, file_name, orders, lock, snapshot_seq=0, fsync_every=1, fsync_interval=1.0,
+                 compact_interval=60.0, compact_min_records=1000, tombstone_ratio=0.25, checkpoint=None,
+                 checkpoint_bytes=None, checkpoint_age=None):
+        self.file_name = file_name  #the orders snapshot file
+        self.log_name = journal_file_name(file_name)  #the journal next to it
+        self.orders = orders  #the in-memory orders list (already replayed)
+        self.lock = lock  #shared with the model so compaction sees a consistent list
+
+        self.fsync_every = fsync_every  #fsync after this many records (0 = only on the timer)
+        self.fsync_interval = fsync_interval  #seconds between timed fsyncs of pending records
+        self.compact_interval = compact_interval  #seconds between compaction checks (None = never)
+        self.compact_min_records = compact_min_records  #do not compact very short journals
+        self.tombstone_ratio = tombstone_ratio  #compact once this share of the orders are deleted ones (None = never)
+        self.checkpoint = checkpoint or self.compact  #the function that folds the journal into a new snapshot
+        self.checkpoint_bytes = checkpoint_bytes  #fold the journal once its file is this big (None = never)
+        self.checkpoint_age = checkpoint_age  #fold the journal once its oldest record is this many seconds old (None = never)
+
+        #continue numbering after the last record that is already on disk
+        records = read_records(old_journal_file_name(file_name)) + read_records(self.log_name)
+        self.seq = max([snapshot_seq] + [record[0] for record in records[-1:]])
+        self.records_in_log = len(records)
+        self.unsynced = 0  #records written since the last fsync
+        self.first_record_time = time.monotonic() if records else None  #when the oldest record of the journal was written
+
+        self.log = open(self.log_name, 'ab')
+
+        #a background thread that syncs pending records and compacts the journal
+        self.stopped = threading.Event()
+        self.worker = threading.Thread(target=self.run_background, daemon=True)
+        self.worker.start()
+
+    #write one change to the end of the journal (the caller holds the lock)
+    def append(self, action, value):
+        self.seq += 1
+        append_record(self.log, (self.seq, action, value))
+        self.log.flush()  #hand the record to the operating system
+        self.records_in_log += 1
+        if self.first_record_time is None:
+            self.first_record_time = time.monotonic()
+        self.unsynced += 1
+        if self.fsync_every and self.unsynced >= self.fsync_every:
+            self.sync()
+
+    #force the pending records to disk (the caller holds the lock)
+    def sync(self):
+        if self.unsynced:
+            os.fsync(self.log.fileno())
+            self.unsynced = 0
+
+    #start a new, empty journal and return the sequence number of the last record in the old one
+    #(the caller holds the lock and removes the old journal once a snapshot with its records is saved)
+    def rotate(self):
+        self.sync()
+        self.log.close()
+        os.replace(self.log_name, old_journal_file_name(self.file_name))  #keep the old records until the snapshot is safe
+        self.log = open(self.log_name, 'ab')
+        self.records_in_log = 0
+        self.first_record_time = None
+        return self.seq
+
+    #write the current orders to a fresh snapshot and start a new, empty journal
+    def compact(self):
+        with self.lock:
+            if self.records_in_log == 0 and not self.orders.dead_count:
+                return
+            self.orders.compact()  #drop the tombstones in memory (one pass over the columns)
+            seq = self.rotate()
+            orders = self.orders.copy()  #a cheap copy of the order columns
+
+        #the slow part runs without the lock, so purchases can continue meanwhile
+        save_snapshot(self.file_name, orders, seq)
+        os.remove(old_journal_file_name(self.file_name))
+
+    #true when the journal file is big or old enough to be folded into a new snapshot (the caller holds the lock)
+    def checkpoint_due(self):
+        if self.records_in_log == 0:
+            return False
+        if self.checkpoint_bytes is not None and self.log.tell() >= self.checkpoint_bytes:
+            return True
+        return self.checkpoint_age is not None and time.monotonic() - self.first_record_time >= self.checkpoint_age
+
+    #the loop of the background thread
+    def run_background(self):
+        waited = 0.0
+        while not self.stopped.wait(self.fsync_interval):
+            with self.lock:
+                self.sync()
+                due = self.checkpoint_due()
+            if due:
+                self.checkpoint()  #a long journal would make the next start slow
+            waited += self.fsync_interval
+            if self.compact_interval is not None and waited >= self.compact_interval:
+                waited = 0.0
+                if self.records_in_log >= self.compact_min_records:
+                    self.checkpoint()
+            if self.tombstone_ratio is not None:
+                with self.lock:  #the orders are changed by the other threads
+                    ratio = self.orders.tombstone_ratio()
+                if ratio >= self.tombstone_ratio:
+                    self.checkpoint()  #many orders were deleted, so reclaim their space now
+
+    #stop the background thread (it finishes a checkpoint that is running)
+    def stop(self):
+        self.stopped.set()
+        self.worker.join()
+
+    #stop the background thread and make sure everything is on disk
+    def close(self):
+        self.stop()
+        with self.lock:
+            self.sync()
+            self.log.close()
+
+# ---------- Group Commit ----------
+
+class GroupCommitter:
+    ''' a class that lets concurrent purchases share one write to storage'''
+    def __init__(self, flush, window=0.01, max_batch=100):
+        self.flush = flush  #the function that saves a list of orders in one write
+        self.window = window  #how many seconds to wait for more orders before writing
+        self.max_batch = max_batch  #write at once when this many orders are waiting
+        self.pending = []  #[(order, done event, [error])]
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    #queue one order and wait until the write that contains it has finished
+    def submit(self, order):
+        entry = (order, threading.Event(), [])
+        with self.condition:
+            if self.stopped:
+                raise IOError("Could not save data: storage is closed")
+            self.pending.append(entry)
+            self.condition.notify()
+        entry[1].wait()
+        if entry[2]:
+            raise entry[2][0]  #the shared write failed, so this purchase failed too
+
+    #the loop of the writer thread
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopped:
+                    self.condition.wait()
+                if not self.pending:
+                    return  #stopped and nothing left to write
+                #keep collecting orders until the window is over or the batch is full
+                deadline = time.monotonic() + self.window
+                while len(self.pending) < self.max_batch and not self.stopped:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                batch, self.pending = self.pending[:self.max_batch], self.pending[self.max_batch:]
+
+            try:
+                self.flush([order for order, done, error in batch])
+            except Exception as e:
+                for order, done, error in batch:
+                    error.append(e)
+            for order, done, error in batch:
+                done.set()
+
+    #write the waiting orders and stop the writer thread
+    def close(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.worker.join()
+
+# ---------- Background Writer ----------
+
+class BackgroundWriter:
+    ''' a class that saves .pkl files on its own thread and merges repeated saves of the same file'''
+    def __init__(self):
+        self.dirty = {}  #{file_name: function that returns the data to save}
+        self.results = queue.Queue()  #(file_name, error or None) for the GUI to pick up
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    #note that a file has changed, a newer notification for the same file replaces the older one
+    def mark_dirty(self, file_name, get_data):
+        with self.condition:
+            self.dirty[file_name] = get_data
+            self.condition.notify_all()
+
+    #the loop of the writer thread
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.dirty and not self.stopped:
+                    self.condition.wait()
+                if not self.dirty:
+                    return  #stopped and nothing left to save
+                files, self.dirty = self.dirty, {}
+
+            for file_name, get_data in files.items():
+                try:
+                    save_data(file_name, get_data())
+                    self.results.put((file_name, None))
+                except Exception as e:
+                    self.results.put((file_name, e))
+
+    #return the results of the writes that finished since the last call
+    def get_results(self):
+        results = []
+        while not self.results.empty():
+            results.append(self.results.get_nowait())
+        return results
+
+    #save what is left and stop the writer thread
+    def close(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        self.worker.join()
+
+# ---------- Storage Backends ----------
+
+class PickleStorage:
+    ''' a class that keeps accounts and orders in memory and saves them to .pkl files'''
+    def __init__(self, accounts_file="accounts.pkl", orders_file="orders.pkl", journal=False,
+                 fsync_every=1, compact_interval=60.0, group_commit_window=None, group_commit_size=100,
+                 background_writes=False, tombstone_ratio=0.25):
+        self.accounts_file = accounts_file
+        self.orders_file = orders_file
+        self.summary_file = "sales_summary.pkl"  #the saved sales summary of these orders
+        self.lock = threading.Lock()  #guards the orders list against the journal thread
+        self.tombstone_ratio = tombstone_ratio  #share of deleted orders that starts a compaction
+
+        #an OrderStore that reads like a list of order dictionaries
+        self.orders, snapshot_seq = load_orders(self.orders_file)
+
+        #in journal mode every purchase or delete only appends one record to orders.pkl.log
+        self.journal = None
+        if journal:
+            self.journal = OrderJournal(self.orders_file, self.orders, self.lock, snapshot_seq,
+                                        fsync_every=fsync_every, compact_interval=compact_interval,
+                                        tombstone_ratio=tombstone_ratio)
+        elif os.path.exists(journal_file_name(self.orders_file)) or os.path.exists(old_journal_file_name(self.orders_file)):
+            #the journal was replayed above, so fold it into a normal orders file
+            save_data(self.orders_file, self.orders)
+            discard_journal(self.orders_file)
+
+        #with a group commit window, single purchases made at the same time share one write
+        self.committer = None
+        if group_commit_window is not None:
+            self.committer = GroupCommitter(self.add_orders, group_commit_window, group_commit_size)
+
+        #with background writes the full .pkl files are saved on a separate thread
+        self.writer = BackgroundWriter() if background_writes else None
+
+    # ---------- Accounts ----------
+
+    #load the accounts dictionary {username: password}
+    def load_accounts(self):
+        return load_data(self.accounts_file)
+
+    #save the accounts after one of them was added, changed or removed
+    def save_account(self, accounts, username):
+        if self.writer:
+            accounts_copy = dict(accounts)  #the caller may change the dictionary again before it is saved
+            self.writer.mark_dirty(self.accounts_file, lambda: accounts_copy)
+        else:
+            save_data(self.accounts_file, accounts)
+
+    # ---------- Orders ----------
+
+    #store a new order
+    def add_order(self, order):
+        if self.committer:
+            self.committer.submit(order)
+        else:
+            self.add_orders([order])
+
+    #store several orders with one write, either all of them are saved or none
+    def add_orders(self, orders):
+        with self.lock:
+            added = 0
+            try:
+                self.orders.extend(orders)  #add the orders to the list (this gives every order its order_id)
+                added = len(orders)
+                if len(orders) == 1:
+                    self.save_order_change("add", orders[0])  #save updated orders
+                else:
+                    self.save_order_change("add_many", list(orders))
+            except Exception:
+                if added:
+                    self.orders.discard_last(added)  #the write failed, so undo the change
+                raise
+
+    #delete an order by its position (the n-th order that is not deleted)
+    def delete_order(self, index):
+        with self.lock:
+            if 0 <= index < len(self.orders):  # make sure that the index is valid
+                order = self.orders.pop(index)  #only marks it as deleted, nothing is moved
+                self.save_order_change("delete_ids", [order["order_id"]])
+                self.compact_if_needed()
+                return order
+        return None
+
+    #persist a change to the orders, either as one journal record or as a full rewrite
+    def save_order_change(self, action, value):
+        if self.journal:
+            self.journal.append(action, value)
+        elif self.writer:
+            self.writer.mark_dirty(self.orders_file, self.copy_orders)
+        else:
+            save_data(self.orders_file, self.orders)
+
+    #without a journal the tombstones are dropped once there are enough of them (the cost is shared by all
+    #the deletes since the last compaction), with a journal its background thread does it
+    def compact_if_needed(self):
+        if not self.journal and self.orders.tombstone_ratio() >= self.tombstone_ratio:
+            self.orders.compact()
+
+    #a cheap copy of the order columns for the writer thread
+    def copy_orders(self):
+        with self.lock:
+            return self.orders.copy()
+
+    #return the results of the background writes that finished since the last call
+    def get_write_results(self):
+        return self.writer.get_results() if self.writer else []
+
+    #return the orders, optionally only the ones matching the filters
+    def get_orders(self, username=None, date=None, ticket_type=None):
+        with self.lock:
+            if username is None and date is None and ticket_type is None:
+                return self.orders.copy()  #a copy of the columns, so a purchase or delete can not change it while it is read
+            return [self.orders.order_at(position) for position in self.orders.positions_matching(username, date, ticket_type)]
+
+    #return (number of matching orders, [(order id, order)]) for one page of the orders
+    def get_orders_page(self, offset, limit, username=None, date=None, ticket_type=None):
+        with self.lock:
+            if username is None and date is None and ticket_type is None:
+                total = len(self.orders)
+                positions = []
+                if offset < total:
+                    positions = islice(self.orders.live_positions(self.orders.physical(offset)), limit)
+            else:
+                matches = self.orders.positions_matching(username, date, ticket_type)
+                total, positions = len(matches), matches[offset:offset + limit]
+            orders = [self.orders.order_at(position) for position in positions]
+            return total, [(order["order_id"], order) for order in orders]
+
+    #yield the orders matching the filters in lists of at most chunk_size orders (for exports),
+    #orders can be bought and deleted in between because every chunk starts after the last order id
+    def iter_orders(self, chunk_size=5000, username=None, start=None, end=None, ticket_type=None):
+        filters = {"username": username, "start": start, "end": end, "ticket_type": ticket_type}
+        return iter_store_chunks(self.orders, self.lock, chunk_size, filters)
+
+    #delete the orders with the given ids with one save, it returns the removed orders
+    def delete_orders(self, order_ids):
+        with self.lock:
+            removed = self.orders.remove_ids(order_ids)  #only marks them as deleted, nothing is moved
+            if not removed:
+                return []
+            self.save_order_change("delete_ids", [order["order_id"] for order in removed])
+            self.compact_if_needed()
+            return removed
+
+    #the digest of the orders, the saved sales summary is only used if it was made from these orders
+    def summary_key(self):
+        with self.lock:
+            return self.orders.digest()
+
+    #build the sales summary with one pass over the orders
+    def sales_totals(self):
+        summary = empty_sales_summary()
+        for order in self.orders:
+            update_sales_summary(summary, order, 1)
+        return summary
+
+    #the order count, ticket quantity and spend of every user (one pass over the orders)
+    def customer_totals(self):
+        totals = {}
+        for order in self.orders:
+            update_customer_totals(totals, order, 1)
+        return totals
+
+    #finish all pending writes
+    def close(self):
+        if self.committer:
+            self.committer.close()
+        if self.journal:
+            self.journal.close()
+        if self.writer:
+            self.writer.close()
+
+class SnapshotStorage(PickleStorage):
+    ''' a class that keeps the orders in a memory-mapped snapshot file plus a journal of newer changes
+
+    Opening it only reads the snapshot header, so startup does not depend on how many orders there are.
+    The orders are decoded when a screen or query uses them, and the counts and summaries come from the
+    snapshot. All changes go to the journal, which the journal thread folds into a new snapshot once it is
+    big or old enough (a checkpoint), so the journal that is replayed on the next start stays short.'''
+    def __init__(self, accounts_file="accounts.pkl", snapshot_file="orders.snap", import_file="orders.pkl",
+                 fsync_every=1, group_commit_window=None, group_commit_size=100, background_writes=False,
+                 compact_interval=60.0, compact_min_records=1000, tombstone_ratio=0.25,
+                 checkpoint_bytes=4 * 1024 * 1024, checkpoint_age=300.0):
+        self.accounts_file = accounts_file
+        self.orders_file = snapshot_file
+        self.summary_file = None  #the sales summary is saved in the snapshot itself
+        self.lock = threading.Lock()  #guards the orders and the totals against the journal thread
+        self.writer = BackgroundWriter() if background_writes else None  #only used for accounts.pkl here
+
+        #the first time, the orders of the .pkl file are written into a snapshot
+        if not os.path.exists(snapshot_file) and os.path.exists(import_file):
+            orders = load_orders(import_file)[0]
+            self.save_snapshot(orders, 0, self.build_aggregates(orders))
+
+        #open the snapshot and take the totals from it, then replay the newer changes from the journal
+        self.orders = SnapshotOrders(snapshot_file)
+        aggregates = self.orders.read_aggregates() or self.build_aggregates(self.orders)
+        self.sales_summary = aggregates["sales_summary"]
+        self.customer_stats = aggregates["customer_stats"]
+        replay_journal(self.orders, snapshot_file, self.orders.journal_seq(), self.update_totals)
+
+        #every change is a journal record, the journal thread folds them into a new snapshot (see checkpoint)
+        self.journal = OrderJournal(snapshot_file, self.orders, self.lock, self.orders.journal_seq(),
+                                    fsync_every=fsync_every, compact_interval=compact_interval,
+                                    compact_min_records=compact_min_records, tombstone_ratio=tombstone_ratio,
+                                    checkpoint=self.checkpoint, checkpoint_bytes=checkpoint_bytes,
+                                    checkpoint_age=checkpoint_age)
+
+        self.committer = None
+        if group_commit_window is not None:
+            self.committer = GroupCommitter(self.add_orders, group_commit_window, group_commit_size)
+
+    #the totals that are saved inside a snapshot
+    def build_aggregates(self, orders):
+        sales_summary, customer_stats = empty_sales_summary(), {}
+        for order in orders:
+            update_sales_summary(sales_summary, order, 1)
+            update_customer_totals(customer_stats, order, 1)
+        return {"sales_summary": sales_summary, "customer_stats": customer_stats}
+
+    #write the orders into a new snapshot file (the old one is closed before it is replaced)
+    def save_snapshot(self, orders, journal_seq, aggregates):
+        temp_name = write_snapshot(self.orders_file, orders, journal_seq, aggregates)
+        size = os.path.getsize(temp_name)
+        if isinstance(orders, SnapshotOrders):
+            orders.close()
+        os.replace(temp_name, self.orders_file)
+        record_io(self.orders_file, "written", size)
+
+    #write the orders into a new snapshot while the storage stays open (called by the journal thread)
+    def checkpoint(self):
+        with self.lock:
+            if self.journal.records_in_log == 0 and not self.orders.tombstone_ratio():
+                return
+            seq = self.journal.rotate()
+            orders = self.orders.copy()  #shares the mapped file, only the tombstones and new orders are copied
+            aggregates = pickle.loads(pickle.dumps({"sales_summary": self.sales_summary,
+                                                    "customer_stats": self.customer_stats}))
+
+        #the slow part runs without the lock, so purchases can continue meanwhile
+        temp_name = write_snapshot(self.orders_file, orders, seq, aggregates)
+        size = os.path.getsize(temp_name)
+        with self.lock:
+            self.orders.close()  #the old file is closed before it is replaced
+            os.replace(temp_name, self.orders_file)
+            self.orders = SnapshotOrders(self.orders_file)  #the deleted orders are gone from the new file
+            replay_journal(self.orders, self.orders_file, seq)  #the changes made while the snapshot was written
+            self.journal.orders = self.orders
+        os.remove(old_journal_file_name(self.orders_file))
+        record_io(self.orders_file, "written", size)
+
+    #keep the totals up to date for every added (1) or removed (-1) order
+    def update_totals(self, order, sign):
+        update_sales_summary(self.sales_summary, order, sign)
+        update_customer_totals(self.customer_stats, order, sign)
+
+    # ---------- Orders ----------
+
+    #store several orders with one journal record
+    def add_orders(self, orders):
+        super().add_orders(orders)
+        with self.lock:
+            for order in orders:
+                self.update_totals(order, 1)
+
+    #delete an order by its position
+    def delete_order(self, index):
+        order = super().delete_order(index)
+        if order is not None:
+            with self.lock:
+                self.update_totals(order, -1)
+        return order
+
+    #delete the orders with the given ids with one journal record
+    def delete_orders(self, order_ids):
+        removed = super().delete_orders(order_ids)
+        with self.lock:
+            for order in removed:
+                self.update_totals(order, -1)
+        return removed
+
+    #the sales summary and customer totals are read from the snapshot and kept up to date
+    def sales_totals(self):
+        with self.lock:
+            summary = {group: dict(totals) for group, totals in self.sales_summary.items()}
+            for group in ("tickets", "race_days"):
+                summary[group] = {date: dict(sales) for date, sales in summary[group].items()}
+            summary["daily_totals"] = {date: {group: {name: list(values) for name, values in totals.items()}
+                                              for group, totals in daily.items()}
+                                       for date, daily in summary["daily_totals"].items()}
+            return summary
+
+    def customer_totals(self):
+        with self.lock:
+            return {username: dict(stats) for username, stats in self.customer_stats.items()}
+
+    #release the mapped file, the journal is only folded into a new snapshot if a checkpoint is due
+    #(a short journal is cheap to replay on the next start, and an empty one means nothing changed)
+    def close(self):
+        if self.committer:
+            self.committer.close()
+        if self.writer:
+            self.writer.close()
+        self.journal.stop()  #so no checkpoint of the journal thread runs at the same time
+        with self.lock:
+            due = self.journal.checkpoint_due()
+        if due:
+            self.checkpoint()
+        self.journal.close()
+        self.orders.close()
+
+# ---------- Sharded Storage ----------
+
+#add the numbers of one totals dictionary into another, it works for the sales summary and the customer totals
+def merge_totals(target, source):
+    for key, value in source.items():
+        if isinstance(value, dict):
+            merge_totals(target.setdefault(key, {}), value)
+        elif isinstance(value, list):  #[quantity, revenue] of the daily totals
+            target[key] = [old + new for old, new in zip(target.get(key, [0] * len(value)), value)]
+        else:
+            target[key] = target.get(key, 0) + value
+    return target
+
+#load one shard file and build its totals (this runs in a worker process, so it has to be a plain function)
+def load_shard(file_name):
+    orders = load_orders(file_name)[0]
+    sales_summary, customer_stats = empty_sales_summary(), {}
+    for order in orders:
+        update_sales_summary(sales_summary, order, 1)
+        update_customer_totals(customer_stats, order, 1)
+    return orders, sales_summary, customer_stats
+
+class ShardedStorage(PickleStorage):
+    ''' a class that splits the orders into several .pkl files (shards) by username or by month
+
+    The shards are loaded in parallel by worker processes, which also build the totals of their
+    shard (map). The totals of the whole store are the sum of the shard totals (reduce), and they
+    are kept up to date per shard after every change. A change only rewrites the shard it touches.'''
+    META_FILE = "shards.pkl"  #remembers how the orders were split, so a restart uses the same layout
+
+    def __init__(self, accounts_file="accounts.pkl", shard_dir="order_shards", shard_by="username", shard_count=8,
+                 import_file="orders.pkl", workers=None, group_commit_window=None, group_commit_size=100,
+                 background_writes=False, tombstone_ratio=0.25, snapshot_file="orders.snap"):
+        self.accounts_file = accounts_file
+        self.shard_dir = shard_dir
+        self.summary_file = None  #the sales summary is added up from the totals of the shards
+        self.lock = threading.Lock()  #guards all the shards
+        self.journal = None  #every shard is saved as a whole, it is small compared to the full history
+        self.tombstone_ratio = tombstone_ratio
+        os.makedirs(shard_dir, exist_ok=True)
+
+        #the layout of existing shards always wins over the arguments
+        meta_file = os.path.join(shard_dir, self.META_FILE)
+        layout = load_data(meta_file) if os.path.exists(meta_file) else {}
+        self.shard_by = layout.get("shard_by", shard_by)
+        self.shard_count = layout.get("shard_count", shard_count)
+        if self.shard_by not in ("username", "month"):
+            raise ValueError(f"Unknown shard key: {self.shard_by}")
+        save_data(meta_file, {"shard_by": self.shard_by, "shard_count": self.shard_count})
+
+        self.shards = {}  #{shard file: OrderStore}
+        self.shard_summaries = {}  #{shard file: sales summary of that shard}
+        self.shard_customers = {}  #{shard file: customer totals of that shard}
+
+        #the first time, the orders of the default backend (the snapshot, or the .pkl file before it existed)
+        #are split into shards
+        files = self.shard_files()
+        if not files and (os.path.exists(snapshot_file) or os.path.exists(import_file)):
+            for order in load_current_orders(import_file, snapshot_file):
+                self.shards.setdefault(self.shard_file(order), OrderStore()).append(order)
+            for file_name, orders in self.shards.items():
+                save_data(file_name, orders)
+            self.shards = {}
+            files = self.shard_files()
+        self.load_shards(files, workers)
+        self.next_id = max([orders.next_id for orders in self.shards.values()] + [1])  #ids are unique in all shards
+
+        #the threads are started after the worker processes are done
+        self.committer = None
+        if group_commit_window is not None:
+            self.committer = GroupCommitter(self.add_orders, group_commit_window, group_commit_size)
+        self.writer = BackgroundWriter() if background_writes else None
+
+    # ---------- Shards ----------
+
+    #the shard files that exist, in order (by month they are in date order)
+    def shard_files(self):
+        return sorted(os.path.join(self.shard_dir, name) for name in os.listdir(self.shard_dir)
+                      if name.startswith("orders_") and name.endswith(".pkl"))
+
+    #the shard file an order belongs to (crc32 is used because hash() changes between runs)
+    def shard_file(self, order):
+        if self.shard_by == "month":
+            key = order["date"][:7]
+        else:
+            key = f"{zlib.crc32(order['username'].encode('utf-8')) % self.shard_count:03d}"
+        return os.path.join(self.shard_dir, f"orders_{key}.pkl")
+
+    #load the shards and their totals, in parallel when there is more than one shard
+    def load_shards(self, files, workers):
+        if len(files) > 1 and workers != 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(load_shard, files))
+            for file_name in files:  #the worker processes can not reach the metrics, so their reads are counted here
+                record_io(file_name, "read", os.path.getsize(file_name))
+        else:
+            results = [load_shard(file_name) for file_name in files]
+        for file_name, (orders, sales_summary, customer_stats) in zip(files, results):
+            self.add_shard(file_name, orders, sales_summary, customer_stats)
+
+    def add_shard(self, file_name, orders=None, sales_summary=None, customer_stats=None):
+        self.shards[file_name] = orders if orders is not None else OrderStore()
+        self.shard_summaries[file_name] = sales_summary or empty_sales_summary()
+        self.shard_customers[file_name] = customer_stats or {}
+
+    #the shards that can hold orders matching the filters (the others are skipped)
+    def shards_for(self, username=None, date=None):
+        if self.shard_by == "username" and username is not None:
+            file_name = self.shard_file({"username": username})
+        elif self.shard_by == "month" and date is not None:
+            file_name = self.shard_file({"date": date})
+        else:
+            return [(file_name, self.shards[file_name]) for file_name in sorted(self.shards)]
+        return [(file_name, self.shards[file_name])] if file_name in self.shards else []
+
+    #save one shard (on the writer thread with background writes)
+    def save_shard(self, file_name):
+        if self.writer:
+            self.writer.mark_dirty(file_name, lambda: self.copy_shard(file_name))
+        else:
+            save_data(file_name, self.shards[file_name])
+
+    def copy_shard(self, file_name):
+        with self.lock:
+            return self.shards[file_name].copy()
+
+    #keep the totals of a shard up to date for every added (1) or removed (-1) order
+    def update_totals(self, file_name, order, sign):
+        update_sales_summary(self.shard_summaries[file_name], order, sign)
+        update_customer_totals(self.shard_customers[file_name], order, sign)
+
+    #save the shards that lost orders, dropping their tombstones first once there are enough of them
+    def save_deletes(self, removed_by_shard):
+        for file_name, removed in removed_by_shard.items():
+            orders = self.shards[file_name]
+            if orders.tombstone_ratio() >= self.tombstone_ratio:
+                orders.compact()
+            for order in removed:
+                self.update_totals(file_name, order, -1)
+            self.save_shard(file_name)
+
+    # ---------- Orders ----------
+
+    #store several orders, every shard they go to is saved once
+    def add_orders(self, orders):
+        with self.lock:
+            groups = {}
+            for order in orders:
+                order["order_id"] = self.next_id
+                self.next_id += 1
+                groups.setdefault(self.shard_file(order), []).append(order)
+            extended, saved = [], []
+            try:
+                for file_name, group in groups.items():
+                    if file_name not in self.shards:
+                        self.add_shard(file_name)
+                    self.shards[file_name].extend(group)  #all orders of the group or none
+                    extended.append(file_name)
+                for file_name in groups:
+                    self.save_shard(file_name)
+                    saved.append(file_name)
+            except Exception:
+                #undo the change, and save the shards that were already written again without the orders
+                for file_name in extended:
+                    self.shards[file_name].discard_last(len(groups[file_name]))
+                for file_name in saved:
+                    save_data(file_name, self.shards[file_name])
+                raise
+            for file_name, group in groups.items():
+                for order in group:
+                    self.update_totals(file_name, order, 1)
+
+    #delete an order by its position (counted through the shards in order)
+    def delete_order(self, index):
+        with self.lock:
+            if index < 0:
+                return None
+            for file_name, orders in self.shards_for():
+                if index < len(orders):
+                    order = orders.pop(index)
+                    self.save_deletes({file_name: [order]})
+                    return order
+                index -= len(orders)
+        return None
+
+    #delete the orders with the given ids, it returns the removed orders
+    def delete_orders(self, order_ids):
+        order_ids = list(order_ids)
+        with self.lock:
+            removed_by_shard = {}
+            for file_name, orders in self.shards_for():
+                removed = orders.remove_ids(order_ids)
+                if removed:
+                    removed_by_shard[file_name] = removed
+            self.save_deletes(removed_by_shard)
+            return [order for removed in removed_by_shard.values() for order in removed]
+
+    #return the orders, optionally only the ones matching the filters
+    def get_orders(self, username=None, date=None, ticket_type=None):
+        with self.lock:
+            if username is None and date is None and ticket_type is None:
+                return [order for file_name, orders in self.shards_for() for order in orders]
+            return [orders.order_at(position) for file_name, orders in self.shards_for(username, date)
+                    for position in orders.positions_matching(username, date, ticket_type)]
+
+    #return (number of matching orders, [(order id, order)]) for one page, the shards are read one after another
+    def get_orders_page(self, offset, limit, username=None, date=None, ticket_type=None):
+        with self.lock:
+            total, page = 0, []
+            for file_name, orders in self.shards_for(username, date):
+                start = max(0, offset - total)  #where the page starts in this shard
+                if username is None and date is None and ticket_type is None:
+                    count = len(orders)
+                    if start < count and len(page) < limit:
+                        positions = islice(orders.live_positions(orders.physical(start)), limit - len(page))
+                        page.extend(orders.order_at(position) for position in positions)
+                else:
+                    matches = orders.positions_matching(username, date, ticket_type)
+                    count = len(matches)
+                    page.extend(orders.order_at(position) for position in matches[start:start + limit - len(page)])
+                total += count
+            return total, [(order["order_id"], order) for order in page]
+
+    #yield the orders matching the filters in chunks, one shard after another
+    #(when sharding by month, the months outside the date range are skipped)
+    def iter_orders(self, chunk_size=5000, username=None, start=None, end=None, ticket_type=None):
+        filters = {"username": username, "start": start, "end": end, "ticket_type": ticket_type}
+        with self.lock:
+            shards = self.shards_for(username)
+        for file_name, orders in shards:
+            if self.shard_by == "month":
+                month = os.path.basename(file_name)[len("orders_"):-len(".pkl")]
+                if (start and month < start[:7]) or (end and month > end[:7]):
+                    continue
+            yield from iter_store_chunks(orders, self.lock, chunk_size, filters)
+
+    #the sales summary of all shards (reduce: the shard summaries are added together)
+    def sales_totals(self):
+        with self.lock:
+            summary = empty_sales_summary()
+            for file_name in sorted(self.shard_summaries):
+                merge_totals(summary, self.shard_summaries[file_name])
+        for group in ("tickets", "revenue_by_date", "daily_totals", "race_days"):  #show the dates in order
+            summary[group] = dict(sorted(summary[group].items()))
+        return summary
+
+    #the customer totals of all shards (by username every customer is in one shard only)
+    def customer_totals(self):
+        with self.lock:
+            totals = {}
+            for customers in self.shard_customers.values():
+                merge_totals(totals, customers)
+            return totals
+
+    #finish all pending writes
+    def close(self):
+        if self.committer:
+            self.committer.close()
+        if self.writer:
+            self.writer.close()
+
+class SQLiteStorage:
+    ''' a class that keeps accounts and orders in an SQLite database with indexed order queries'''
+    ORDER_COLUMNS = ("username", "ticket_type", "quantity", "total_cost", "payment_method", "date", "price_version",
+                     "race_date")
+
+    def __init__(self, db_file="booking.db", group_commit_window=None, group_commit_size=100):
+        self.db_file = db_file
+        self.summary_file = None  #the sales summary comes from grouped queries on the database
+        self.lock = threading.Lock()  #one connection is shared, so only one statement runs at a time
+        self.connection = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+
+        with self.connection:
+            #WAL lets readers continue while an order is being written
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("""CREATE TABLE IF NOT EXISTS accounts (
+                                           username TEXT PRIMARY KEY,
+                                           password TEXT NOT NULL)""")
+            self.connection.execute("""CREATE TABLE IF NOT EXISTS orders (
+                                           id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                           username TEXT NOT NULL,
+                                           ticket_type TEXT NOT NULL,
+                                           quantity INTEGER NOT NULL,
+                                           total_cost INTEGER NOT NULL,
+                                           payment_method TEXT NOT NULL,
+                                           date TEXT NOT NULL,
+                                           price_version INTEGER NOT NULL DEFAULT 0,
+                                           race_date TEXT NOT NULL)""")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS orders_username ON orders (username)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS orders_date ON orders (date)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS orders_ticket_type ON orders (ticket_type)")
+
+        #with a group commit window, single purchases made at the same time share one transaction
+        self.committer = None
+        if group_commit_window is not None:
+            self.committer = GroupCommitter(self.add_orders, group_commit_window, group_commit_size)
+
+    #turn a database row into the same dictionary the pickle backend uses (the row id is the order id)
+    def row_to_order(self, row):
+        order = {"order_id": row["id"]}
+        order.update((column, row[column]) for column in self.ORDER_COLUMNS)
+        return order
+
+    # ---------- Accounts ----------
+
+    #load the accounts dictionary {username: password}
+    def load_accounts(self):
+        with self.lock:
+            rows = self.connection.execute("SELECT username, password FROM accounts").fetchall()
+        return {row["username"]: row["password"] for row in rows}
+
+    #save the account after it was added, changed or removed
+    def save_account(self, accounts, username):
+        with self.lock, self.connection:
+            if username in accounts:
+                self.connection.execute("INSERT OR REPLACE INTO accounts (username, password) VALUES (?, ?)",
+                                        (username, accounts[username]))
+            else:
+                self.connection.execute("DELETE FROM accounts WHERE username = ?", (username,))
+
+    # ---------- Orders ----------
+
+    #store a new order
+    def add_order(self, order):
+        if self.committer:
+            self.committer.submit(order)
+        else:
+            self.add_orders([order])
+
+    #store several orders in one transaction, every order gets its row id as order_id
+    #(an order that already has an order_id, e.g. from a migration, keeps it)
+    def add_orders(self, orders):
+        with self.lock, self.connection:
+            for order in orders:
+                cursor = self.connection.execute(
+                    "INSERT INTO orders (id, username, ticket_type, quantity, total_cost, payment_method, date, "
+                    "price_version, race_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (order.get("order_id"),) + tuple(order_value(order, column) for column in self.ORDER_COLUMNS))
+                order["order_id"] = cursor.lastrowid
+
+    #delete an order by its position (orders are kept in the order they were made)
+    def delete_order(self, index):
+        if index < 0:
+            return None
+        with self.lock, self.connection:
+            row = self.connection.execute("SELECT * FROM orders ORDER BY id LIMIT 1 OFFSET ?", (index,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("DELETE FROM orders WHERE id = ?", (row["id"],))
+            return self.row_to_order(row)
+
+    #build the WHERE part of a query for the optional filters
+    def where_clause(self, username=None, date=None, ticket_type=None):
+        conditions, values = [], []
+        for column, value in (("username", username), ("date", date), ("ticket_type", ticket_type)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                values.append(value)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), values
+
+    #return the orders, optionally only the ones matching the filters (uses the indexes)
+    def get_orders(self, username=None, date=None, ticket_type=None):
+        where, values = self.where_clause(username, date, ticket_type)
+        with self.lock:
+            rows = self.connection.execute("SELECT * FROM orders" + where + " ORDER BY id", values).fetchall()
+        return [self.row_to_order(row) for row in rows]
+
+    #return (number of matching orders, [(order id, order)]) for one page of the orders
+    def get_orders_page(self, offset, limit, username=None, date=None, ticket_type=None):
+        where, values = self.where_clause(username, date, ticket_type)
+        with self.lock:
+            total = self.connection.execute("SELECT COUNT(*) FROM orders" + where, values).fetchone()[0]
+            rows = self.connection.execute("SELECT * FROM orders" + where + " ORDER BY id LIMIT ? OFFSET ?",
+                                           values + [limit, offset]).fetchall()
+        return total, [(row["id"], self.row_to_order(row)) for row in rows]
+
+    #yield the orders matching the filters in chunks, every query starts after the last id (no OFFSET)
+    def iter_orders(self, chunk_size=5000, username=None, start=None, end=None, ticket_type=None):
+        conditions, values = ["id > ?"], []
+        for condition, value in (("username = ?", username), ("ticket_type = ?", ticket_type),
+                                 ("date >= ?", start), ("date <= ?", end)):
+            if value is not None:
+                conditions.append(condition)
+                values.append(value)
+        query = "SELECT * FROM orders WHERE " + " AND ".join(conditions) + " ORDER BY id LIMIT ?"
+        last_id = 0
+        while True:
+            with self.lock:
+                rows = self.connection.execute(query, [last_id] + values + [chunk_size]).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1]["id"]
+            yield [self.row_to_order(row) for row in rows]
+
+    #delete the orders with the given ids in one transaction, it returns the removed orders
+    def delete_orders(self, order_ids):
+        order_ids = list(order_ids)
+        if not order_ids:
+            return []
+        marks = ", ".join("?" for _ in order_ids)
+        with self.lock, self.connection:
+            rows = self.connection.execute(f"SELECT * FROM orders WHERE id IN ({marks})", order_ids).fetchall()
+            self.connection.execute(f"DELETE FROM orders WHERE id IN ({marks})", order_ids)
+        return [self.row_to_order(row) for row in rows]
+
+    #build the sales summary with grouped queries
+    def sales_totals(self):
+        summary = empty_sales_summary()
+        with self.lock:
+            for date, ticket_type, quantity in self.connection.execute(
+                    "SELECT date, ticket_type, SUM(quantity) FROM orders GROUP BY date, ticket_type ORDER BY date"):
+                summary["tickets"].setdefault(date, {})[ticket_type] = quantity
+            for race_date, ticket_type, quantity in self.connection.execute(
+                    "SELECT race_date, ticket_type, SUM(quantity) FROM orders GROUP BY race_date, ticket_type "
+                    "ORDER BY race_date"):
+                summary["race_days"].setdefault(race_date, {})[ticket_type] = quantity
+            for column, group in (("date", "revenue_by_date"), ("ticket_type", "revenue_by_ticket_type"),
+                                  ("payment_method", "revenue_by_payment_method")):
+                for key, revenue in self.connection.execute(
+                        f"SELECT {column}, SUM(total_cost) FROM orders GROUP BY {column} ORDER BY {column}"):
+                    summary[group][key] = revenue
+            for column in ("ticket_type", "payment_method"):
+                for date, name, quantity, revenue in self.connection.execute(
+                        f"SELECT date, {column}, SUM(quantity), SUM(total_cost) FROM orders GROUP BY date, {column}"):
+                    summary["daily_totals"].setdefault(date, {}).setdefault(column, {})[name] = [quantity, revenue]
+        return summary
+
+    #the order count, ticket quantity and spend of every user (one grouped query)
+    def customer_totals(self):
+        with self.lock:
+            rows = self.connection.execute("SELECT username, COUNT(*), SUM(quantity), SUM(total_cost) "
+                                           "FROM orders GROUP BY username").fetchall()
+        return {row[0]: {"orders": row[1], "quantity": row[2], "total_spent": row[3]} for row in rows}
+
+    #every write to the database finishes before the call returns, so there is nothing to report
+    def get_write_results(self):
+        return []
+
+    #close the database connection
+    def close(self):
+        if self.committer:
+            self.committer.close()
+        with self.lock:
+            self.connection.close()
+
+# ---------- Migration ----------
+
+#a one-shot function that copies the accounts and the orders of the default backend into an SQLite database
+#(the orders come from orders.snap if it exists, because orders.pkl is not updated after that),
+#a database that already has orders is refused, so the same orders are never imported twice
+def migrate_pickle_to_sqlite(accounts_file="accounts.pkl", orders_file="orders.pkl", db_file="booking.db",
+                             snapshot_file="orders.snap"):
+    accounts = load_data(accounts_file)
+    orders = load_current_orders(orders_file, snapshot_file)
+    target = SQLiteStorage(db_file)
+    try:
+        with target.lock:
+            migrated = target.connection.execute("SELECT 1 FROM orders LIMIT 1").fetchone() is not None
+        if migrated:
+            raise ValueError(f"{db_file} already has orders (it was migrated before or the app used it), "
+                             f"remove it first to migrate again")
+        with target.lock, target.connection:
+            target.connection.executemany("INSERT OR REPLACE INTO accounts (username, password) VALUES (?, ?)",
+                                          list(accounts.items()))
+        target.add_orders(orders)
+        return len(accounts), len(orders)
+    finally:
+        target.close()
@@ -0,0 +1,92 @@
+# Import necessary modules
+import random  # this is used to make random orders and date ranges
+import unittest  # the test framework of the standard library
+from dateindex import DateRangeIndex, FenwickTree  # the module that is tested
+
+TICKET_TYPES = ("Single Race Pass", "Weekend Package", "Season Membership")
+PAYMENT_METHODS = ("Credit Card", "Debit Card")
+
+#a function to make one random order
+def random_order():
+    quantity = random.randint(1, 5)
+    return {"date": f"2026-{random.randint(1, 3):02d}-{random.randint(1, 28):02d}", "quantity": quantity,
+            "total_cost": quantity * random.choice((100, 250, 400)), "ticket_type": random.choice(TICKET_TYPES),
+            "payment_method": random.choice(PAYMENT_METHODS)}
+
+#the answer of DateRangeIndex.query, worked out by going through every order
+def brute_force(orders, start, end):
+    result = {"ticket_type": {}, "payment_method": {}, "quantity": 0, "revenue": 0}
+    for order in orders:
+        if (start and order["date"] < start) or (end and order["date"] > end):
+            continue
+        for group in ("ticket_type", "payment_method"):
+            totals = result[group].setdefault(order[group], {"quantity": 0, "revenue": 0})
+            totals["quantity"] += order["quantity"]
+            totals["revenue"] += order["total_cost"]
+        result["quantity"] += order["quantity"]
+        result["revenue"] += order["total_cost"]
+    for group in ("ticket_type", "payment_method"):
+        result[group] = {name: totals for name, totals in result[group].items() if totals["quantity"] or totals["revenue"]}
+    return result
+
+#a random range, sometimes open at one end or outside the sold days
+def random_range():
+    start = f"2026-{random.randint(1, 3):02d}-{random.randint(1, 30):02d}"
+    end = f"2026-{random.randint(1, 4):02d}-{random.randint(1, 30):02d}"
+    return random.choice((None, start)), random.choice((None, end))
+
+class TestFenwickTree(unittest.TestCase):
+    ''' a class that checks the prefix sums of the FenwickTree against sum()'''
+
+    def test_prefix_sums(self):
+        random.seed(1)
+        values = [random.randint(-50, 50) for _ in range(100)]
+        tree = FenwickTree(values)
+        for _ in range(200):
+            position = random.randrange(len(values))
+            delta = random.randint(-20, 20)
+            values[position] += delta
+            tree.add(position, delta)
+            if random.random() < 0.1:
+                values.append(delta)
+                tree.append(delta)
+        for n in range(len(values) + 1):
+            self.assertEqual(tree.prefix(n), sum(values[:n]))
+        self.assertEqual(tree.values(), values)
+
+class TestDateRangeIndex(unittest.TestCase):
+    ''' a class that checks the range sums of the DateRangeIndex against going through the orders'''
+
+    def test_built_from_daily_totals(self):
+        random.seed(2)
+        orders = [random_order() for _ in range(500)]
+        daily_totals = {}
+        for order in orders:
+            daily = daily_totals.setdefault(order["date"], {})
+            for group in ("ticket_type", "payment_method"):
+                values = daily.setdefault(group, {}).setdefault(order[group], [0, 0])
+                values[0] += order["quantity"]
+                values[1] += order["total_cost"]
+        index = DateRangeIndex(daily_totals)
+        for _ in range(200):
+            start, end = random_range()
+            self.assertEqual(index.query(start, end), brute_force(orders, start, end))
+
+    def test_updates_in_any_date_order(self):
+        random.seed(3)
+        index, orders = DateRangeIndex(), []
+        for _ in range(400):
+            if orders and random.random() < 0.2:  #a deleted order
+                order = orders.pop(random.randrange(len(orders)))
+                index.update(order, -1)
+            else:  #a new order, its day can be before, between or after the known days
+                order = random_order()
+                orders.append(order)
+                index.update(order, 1)
+            if random.random() < 0.1:
+                start, end = random_range()
+                self.assertEqual(index.query(start, end), brute_force(orders, start, end))
+        self.assertEqual(index.query(), brute_force(orders, None, None))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+# Import necessary modules
+import threading  # this is used to buy seats from several threads at once
+import time  # this is used to wait for a hold to expire
+import unittest  # the test framework of the standard library
+from inventory import Inventory  # the module that is tested
+
+DAY = "2026-05-01"
+
+class TestInventory(unittest.TestCase):
+    ''' a class that checks the holds and counters of the Inventory'''
+
+    def setUp(self):
+        self.inventory = Inventory({"Weekend Package": 10, "Season Membership": None}, sold={DAY: {"Weekend Package": 4}})
+
+    def test_sold_seats_are_counted(self):
+        self.assertEqual(self.inventory.status("Weekend Package", DAY),
+                         {"capacity": 10, "sold": 4, "held": 0, "available": 6})
+        self.assertIsNone(self.inventory.available("Season Membership", DAY))  #no limit
+
+    def test_a_hold_keeps_the_seats_until_it_is_committed(self):
+        hold_id = self.inventory.reserve("Weekend Package", DAY, 5)
+        self.assertIsNotNone(hold_id)
+        self.assertIsNone(self.inventory.reserve("Weekend Package", DAY, 2))  #only 1 seat is left
+        self.assertFalse(self.inventory.commit(hold_id, quantity=4))  #it does not match the hold
+        self.assertTrue(self.inventory.commit(hold_id, "Weekend Package", DAY, 5))
+        self.assertFalse(self.inventory.commit(hold_id))  #a hold is used only once
+        self.assertEqual(self.inventory.status("Weekend Package", DAY)["sold"], 9)
+
+    def test_a_released_hold_gives_the_seats_back(self):
+        hold_id = self.inventory.reserve("Weekend Package", DAY, 6)
+        self.assertEqual(self.inventory.available("Weekend Package", DAY), 0)
+        self.assertTrue(self.inventory.release(hold_id))
+        self.assertFalse(self.inventory.release(hold_id))
+        self.assertEqual(self.inventory.available("Weekend Package", DAY), 6)
+
+    def test_an_expired_hold_gives_the_seats_back(self):
+        hold_id = self.inventory.reserve("Weekend Package", DAY, 6, seconds=0.05)
+        time.sleep(0.1)
+        self.assertEqual(self.inventory.available("Weekend Package", DAY), 6)
+        self.assertFalse(self.inventory.commit(hold_id))
+
+    def test_a_capacity_of_one_day(self):
+        self.inventory.set_capacity("Weekend Package", DAY, 5)
+        self.assertEqual(self.inventory.available("Weekend Package", DAY), 1)
+        self.assertEqual(self.inventory.available("Weekend Package", "2026-05-02"), 10)
+        self.inventory.set_capacity("Weekend Package", DAY, None)
+        self.assertEqual(self.inventory.available("Weekend Package", DAY), 6)
+
+    def test_seats_are_never_oversold(self):
+        results = []
+        def buy():
+            for _ in range(20):
+                results.append(self.inventory.take("Weekend Package", DAY, 1))
+        threads = [threading.Thread(target=buy) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 6)
+        self.assertEqual(self.inventory.status("Weekend Package", DAY)["sold"], 10)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+# Import necessary modules
+import pickle  # this is used to check that a store survives saving
+import random  # this is used to make many different orders
+import unittest  # the test framework of the standard library
+from orderstore import OrderStore  # the module that is tested
+
+#a function to make one order dictionary
+def make_order(number, order_id=None):
+    order = {"username": f"user{number % 7}", "ticket_type": ("Single Race Pass", "Weekend Package")[number % 2],
+             "quantity": number % 5 + 1, "total_cost": (number % 5 + 1) * 100, "payment_method": "Credit Card",
+             "date": f"2026-01-{number % 28 + 1:02d}", "price_version": 1, "race_date": "2026-03-01"}
+    if order_id is not None:
+        order["order_id"] = order_id
+    return order
+
+class TestOrderStore(unittest.TestCase):
+    ''' a class that checks the invariants of the OrderStore against a plain list of dictionaries'''
+
+    def test_ids_increase_and_find_works(self):
+        store = OrderStore(make_order(number) for number in range(50))
+        ids = [order["order_id"] for order in store]
+        self.assertEqual(ids, sorted(set(ids)))
+        for position, order_id in enumerate(ids):
+            self.assertEqual(store.find(order_id), position)
+        self.assertIsNone(store.find(ids[-1] + 1))
+
+    def test_an_id_that_is_not_greater_is_rejected(self):
+        store = OrderStore([make_order(0), make_order(1, order_id=10)])
+        for order_id in (10, 3):
+            with self.assertRaises(ValueError):
+                store.append(make_order(2, order_id=order_id))
+        self.assertEqual(len(store), 2)
+
+    def test_a_rejected_batch_changes_nothing(self):
+        store = OrderStore(make_order(number) for number in range(3))
+        before = list(store)
+        bad = make_order(4)
+        bad["quantity"] = -1
+        with self.assertRaises(ValueError):
+            store.extend([make_order(3), bad])
+        self.assertEqual(list(store), before)
+        self.assertEqual({len(column) for column in store.columns.values()}, {3})
+
+    def test_deletes_match_a_list(self):
+        random.seed(7)
+        store = OrderStore(make_order(number) for number in range(3000))
+        expected = list(store)
+        for _ in range(800):
+            position = random.randrange(len(expected))
+            self.assertEqual(store.pop(position), expected.pop(position))
+            if random.random() < 0.01:
+                store.compact()
+        self.assertEqual(len(store), len(expected))
+        self.assertEqual(list(store), expected)
+        self.assertEqual([store[position] for position in (0, 500, -1)], [expected[0], expected[500], expected[-1]])
+
+    def test_deleted_ids_are_not_used_again(self):
+        store = OrderStore(make_order(number) for number in range(5))
+        last = store.pop()
+        store.compact()
+        store.append(make_order(5))
+        self.assertGreater(store[-1]["order_id"], last["order_id"])
+
+    def test_filters_match_a_list(self):
+        store = OrderStore(make_order(number) for number in range(200))
+        del store[10]
+        orders = list(store)
+        positions = store.positions_matching(username="user3", ticket_type="Weekend Package")
+        expected = [order for order in orders if order["username"] == "user3" and order["ticket_type"] == "Weekend Package"]
+        self.assertEqual([store.decode(position) for position in positions], expected)
+
+    def test_copy_and_pickle_keep_the_orders(self):
+        store = OrderStore(make_order(number) for number in range(20))
+        del store[3]
+        copy = store.copy()
+        store.append(make_order(20))
+        self.assertEqual(len(copy), 19)
+        loaded = pickle.loads(pickle.dumps(store))
+        self.assertEqual(list(loaded), list(store))
+        self.assertEqual(loaded.next_id, store.next_id)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+# Import necessary modules
+import time  # this is used for the time windows of the discount rules
+import unittest  # the test framework of the standard library
+from pricing import PriceEngine  # the module that is tested
+
+BASE_PRICES = {"Single Race Pass": 200, "Weekend Package": 500}
+
+class TestPriceEngine(unittest.TestCase):
+    ''' a class that checks the price versions and discount rules of the PriceEngine'''
+
+    def setUp(self):
+        self.saved = []
+        self.engine = PriceEngine(BASE_PRICES, save=self.saved.append)
+
+    def test_every_change_is_a_new_version(self):
+        self.assertEqual(self.engine.quote("Weekend Package", 2), (1000, 1))
+        self.assertEqual(self.engine.add_rule("spring", 10, ["Weekend Package"]), 2)
+        self.assertEqual(self.engine.quote("Weekend Package", 2), (900, 2))
+        self.assertEqual(self.engine.quote("Single Race Pass", 1), (200, 2))  #the rule is not for this type
+        self.assertEqual(self.engine.remove_rule("spring"), 3)
+        self.assertIsNone(self.engine.remove_rule("spring"))
+        self.assertEqual(self.engine.quote("Weekend Package", 2), (1000, 3))
+
+    def test_old_versions_are_kept(self):
+        self.engine.add_rule("spring", 10)
+        self.engine.add_rule("spring", 20)  #the same name replaces the rule
+        self.assertEqual(self.engine.history[2]["prices"]["Weekend Package"], 450)
+        self.assertEqual(self.engine.history[3]["prices"]["Weekend Package"], 400)
+        self.assertEqual(len(self.engine.table.rules), 1)
+
+    def test_the_biggest_discount_is_used(self):
+        self.engine.add_rule("a", 10)
+        self.engine.add_rule("b", 25, ["Single Race Pass"])
+        self.assertEqual(self.engine.current().prices["Single Race Pass"], 150)
+        self.assertEqual(self.engine.current().prices["Weekend Package"], 450)
+
+    def test_a_timed_discount_makes_a_version_when_it_starts(self):
+        start = time.time() + 0.1
+        version = self.engine.add_rule("flash", 50, start=start, end=start + 60)
+        self.assertEqual(self.engine.quote("Weekend Package", 1), (500, version))
+        time.sleep(0.15)
+        cost, new_version = self.engine.quote("Weekend Package", 1)
+        self.assertEqual((cost, new_version), (250, version + 1))
+
+    def test_the_version_survives_a_restart(self):
+        self.engine.add_rule("spring", 10)
+        state = self.saved[-1]
+        same = PriceEngine(BASE_PRICES, state)
+        self.assertEqual(same.table.version, self.engine.table.version)
+        changed = PriceEngine(dict(BASE_PRICES, **{"Weekend Package": 600}), state)
+        self.assertEqual(changed.table.version, self.engine.table.version + 1)
+        self.assertEqual(changed.quote("Weekend Package", 1), (540, changed.table.version))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+# Import necessary modules
+import os  # this is used to replace the snapshot file
+import shutil  # this is used to remove the temporary folder
+import tempfile  # this is used so the tests never touch the real data files
+import unittest  # the test framework of the standard library
+from orderstore import OrderStore  # the orders that are written into a snapshot
+from snapshot import BLOCK_RECORDS, HEADER, SnapshotOrders, write_snapshot  # the module that is tested
+from storage import empty_sales_summary, update_customer_totals, update_sales_summary  # the saved totals
+from test_orderstore import make_order  # the same orders as the OrderStore tests
+
+#the sales summary and customer totals of some orders, as they are saved in a snapshot
+def build_aggregates(orders):
+    sales_summary, customer_stats = empty_sales_summary(), {}
+    for order in orders:
+        update_sales_summary(sales_summary, order, 1)
+        update_customer_totals(customer_stats, order, 1)
+    return {"sales_summary": sales_summary, "customer_stats": customer_stats}
+
+class TestSnapshot(unittest.TestCase):
+    ''' a class that writes snapshots and reads them back through the memory-mapped SnapshotOrders'''
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.folder, "orders.snap")
+        self.opened = []
+
+    def tearDown(self):
+        for orders in self.opened:
+            orders.close()
+        shutil.rmtree(self.folder)
+
+    #write a snapshot of the orders and open it
+    def write(self, orders, journal_seq=0):
+        temp_name = write_snapshot(self.file_name, orders, journal_seq, build_aggregates(orders))
+        os.replace(temp_name, self.file_name)
+        return self.open()
+
+    def open(self):
+        orders = SnapshotOrders(self.file_name)
+        self.opened.append(orders)
+        return orders
+
+    def test_round_trip(self):
+        store = OrderStore(make_order(number) for number in range(2 * BLOCK_RECORDS + 10))  #more than one block
+        for position in (0, 5, BLOCK_RECORDS, -1):
+            del store[position]
+        snapshot = self.write(store, journal_seq=42)
+        self.assertEqual(len(snapshot), len(store))
+        self.assertEqual(list(snapshot), list(store))
+        self.assertEqual(snapshot[BLOCK_RECORDS], store[BLOCK_RECORDS])
+        self.assertEqual(snapshot.journal_seq(), 42)
+        self.assertEqual(snapshot.next_id, store.next_id)
+        self.assertEqual(snapshot.read_aggregates(), build_aggregates(store))
+        for order in store[:20]:
+            self.assertEqual(snapshot.order_at(snapshot.find(order["order_id"])), order)
+
+    def test_changes_after_the_snapshot(self):
+        store = OrderStore(make_order(number) for number in range(100))
+        snapshot = self.write(store)
+        removed = snapshot.remove_ids([store[3]["order_id"], store[50]["order_id"]])
+        snapshot.append(make_order(100))
+        expected = list(store)
+        del expected[50], expected[3]
+        self.assertEqual(removed, [store[3], store[50]])
+        self.assertEqual(list(snapshot)[:-1], expected)
+        self.assertEqual(snapshot[-1]["order_id"], store.next_id)
+
+        #a snapshot written from a snapshot holds the same orders, without the deleted ones
+        again = self.write(snapshot.copy())
+        self.assertEqual(list(again), list(snapshot))
+        self.assertEqual(again.dead_count, 0)
+
+    def test_a_snapshot_of_another_layout_is_refused(self):
+        self.write(OrderStore(make_order(number) for number in range(10))).close()
+        with open(self.file_name, 'rb') as file:
+            data = bytearray(file.read())
+        #record size, records per block and flags
+        for field, value in ((5, 99), (4, 7), (2, 1)):
+            values = list(HEADER.unpack_from(data, 0))
+            values[field] = value
+            changed = bytearray(data)
+            HEADER.pack_into(changed, 0, *values)
+            with open(self.file_name, 'wb') as file:
+                file.write(changed)
+            with self.assertRaises(IOError):
+                self.open()
+
+    def test_aggregates_that_do_not_match_are_not_used(self):
+        self.write(OrderStore(make_order(number) for number in range(10))).close()
+        with open(self.file_name, 'rb') as file:
+            data = bytearray(file.read())
+        values = list(HEADER.unpack_from(data, 0))
+        values[8] += 1  #the total revenue
+        HEADER.pack_into(data, 0, *values)
+        with open(self.file_name, 'wb') as file:
+            file.write(data)
+        self.assertIsNone(self.open().read_aggregates())
+
+if __name__ == "__main__":
+    unittest.main()
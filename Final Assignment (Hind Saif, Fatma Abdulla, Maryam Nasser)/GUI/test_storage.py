@@ -0,0 +1,94 @@
+# Import necessary modules
+import os  # this is used to check the journal files
+import shutil  # this is used to remove the temporary folder
+import tempfile  # this is used so the tests never touch the real data files
+import threading  # the journal shares a lock with the storage
+import unittest  # the test framework of the standard library
+from orderstore import OrderStore  # the orders of the pickle journal
+from storage import (OrderJournal, SnapshotStorage, journal_file_name, load_orders, old_journal_file_name,
+                     save_snapshot)  # the module that is tested
+from test_orderstore import make_order  # the same orders as the OrderStore tests
+
+class TestJournal(unittest.TestCase):
+    ''' a class that checks that the orders in the journal come back after a crash'''
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def path(self, name):
+        return os.path.join(self.folder, name)
+
+    #the program stops without closing the storage, and the last record was only half written
+    def crash(self, log_name):
+        with open(log_name, 'ab') as file:
+            file.write(b"\x40\x00\x00\x00half")
+
+    def test_pickle_journal_replay(self):
+        file_name = self.path("orders.pkl")
+        orders = OrderStore(make_order(number) for number in range(10))
+        save_snapshot(file_name, orders, 0)
+        journal = OrderJournal(file_name, orders, threading.Lock(), compact_interval=None, tombstone_ratio=None)
+        added = make_order(10)
+        orders.append(added)
+        journal.append("add", added)
+        removed = orders.remove_ids([3, 4])
+        journal.append("delete_ids", [3, 4])
+        journal.stop()  #no compaction and no close, like a crash
+        journal.log.close()
+        self.crash(journal_file_name(file_name))
+
+        loaded, seq = load_orders(file_name)
+        self.assertEqual(list(loaded), list(orders))
+        self.assertEqual(len(removed), 2)
+        self.assertEqual(seq, 0)
+
+    def test_pickle_journal_replay_after_an_unfinished_compaction(self):
+        file_name = self.path("orders.pkl")
+        orders = OrderStore(make_order(number) for number in range(5))
+        save_snapshot(file_name, orders, 0)
+        journal = OrderJournal(file_name, orders, threading.Lock(), compact_interval=None, tombstone_ratio=None)
+        for number in range(5, 8):
+            order = make_order(number)
+            orders.append(order)
+            journal.append("add", order)
+        with journal.lock:
+            journal.rotate()  #the compaction stops before its snapshot is written
+        order = make_order(8)
+        orders.append(order)
+        journal.append("add", order)
+        journal.close()
+
+        self.assertTrue(os.path.exists(old_journal_file_name(file_name)))
+        self.assertEqual(list(load_orders(file_name)[0]), list(orders))
+
+    def test_snapshot_storage_replay(self):
+        snapshot_file = self.path("orders.snap")
+        def open_storage():
+            return SnapshotStorage(self.path("accounts.pkl"), snapshot_file, self.path("orders.pkl"),
+                                   compact_interval=None, checkpoint_age=None)
+
+        storage = open_storage()
+        storage.add_orders([make_order(number) for number in range(20)])
+        storage.journal.checkpoint()  #the first 20 orders are in the snapshot
+        storage.add_order(make_order(20))
+        storage.delete_orders([2, 7])
+        expected, totals = list(storage.orders), storage.sales_totals()
+        storage.journal.stop()  #no checkpoint and no close, like a crash
+        storage.journal.log.close()
+        storage.orders.close()
+        self.crash(journal_file_name(snapshot_file))
+
+        storage = open_storage()
+        try:
+            self.assertEqual(list(storage.orders), expected)
+            self.assertEqual(storage.sales_totals(), totals)
+            storage.add_order(make_order(21))
+            self.assertEqual(storage.orders[-1]["order_id"], expected[-1]["order_id"] + 1)
+        finally:
+            storage.close()
+
+if __name__ == "__main__":
+    unittest.main()
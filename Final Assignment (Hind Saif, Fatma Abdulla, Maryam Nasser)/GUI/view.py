@@ -1,9 +1,17 @@
 import tkinter as tk  # Tkinter for GUI components
+from datetime import datetime  # to show the start and end of the discounts
+from tkinter import filedialog  # to choose the export file
 from tkinter import messagebox  # to show popup alerts
+from tkinter import ttk  # for the order list (Treeview)
 
 # View class responsible for displaying all GUI components
 class TicketBookingView:
-    ''' a class that is responsible for displaying all GUI components'''
+    ''' a class that is responsible for displaying all GUI components
+
+    Every screen is built once, the first time it is shown, and kept in its own frame. The frames lie on
+    top of each other and navigating raises one of them, so going back to a screen does not create its
+    widgets again. The parts that show data are refreshed in place: a label is only changed when its text
+    changed, and labels are only created or destroyed for lines that were added or removed.'''
     def __init__(self, root, controller):
         self.root = root  #reference to the Tkinter root window
         self.controller = controller  #reference to the controller
@@ -13,9 +21,11 @@ class TicketBookingView:
         #store the logged-in user for session tracking
         self.logged_in_user = None
 
-        #the main GUI container (Frame)
+        #the main GUI container (Frame), every screen is a frame in the same cell of its grid
         self.main_frame = tk.Frame(self.root)
         self.main_frame.pack()
+        self.screens = {}  #{screen name: frame}
+        self.current_screen = None
 
         #the default selections for ticket type and payment method
         self.selected_ticket = tk.StringVar()
@@ -24,142 +34,443 @@ class TicketBookingView:
         self.payment_method = tk.StringVar()
         self.payment_method.set("Credit Card")  #default payment option
 
+        self.race_date = tk.StringVar()  #the race day the tickets are for (empty = today)
+
         self.quantity_entry = None  #entry widget to input how many tickets the customer wants to get
+        self.form_callbacks = {}  #{form title: the function its button calls}
+        self.delete_account_callback = None
+        self.ticket_texts = {}  #{ticket_type: StringVar} the text of every ticket type on the purchase screen
+
+        #the order list only holds one page of orders at a time
+        self.orders_page_size = 100
+        self.orders_offset = 0
+        self.orders_tree = None
+
+        #the labels of the screens that show data: {section: {key: [label, text]}}
+        self.data_labels = {}
+
+        #a status line below the screens that shows whether the changes are saved
+        self.status = tk.StringVar()
+        tk.Label(self.root, textvariable=self.status, fg="gray").pack(side="bottom", pady=2)
+
+        #the progress of the running export (kept here because the export goes on when the screen changes)
+        self.export_progress = tk.StringVar()
 
         #display main menu at launch
         self.build_main_menu()
 
-    #clear all the widgets from the current frame (for navigation)
-    def clear_frame(self):
-        for widget in self.main_frame.winfo_children():
-            widget.destroy()
+    #show a screen, it is built by build(frame) the first time only, it returns the frame of the screen
+    def show_screen(self, name, build):
+        frame = self.screens.get(name)
+        if frame is None:
+            frame = self.screens[name] = tk.Frame(self.main_frame)
+            frame.grid(row=0, column=0, sticky="nsew")
+            build(frame)
+        frame.tkraise()
+        self.current_screen = name
+        return frame
+
+    #show the lines {key: (text, font)} in a frame, reusing the labels that are already there
+    #(only changed texts are updated, and only new lines create a label)
+    def update_labels(self, section, parent, lines):
+        labels = self.data_labels.setdefault(section, {})
+        for key in [key for key in labels if key not in lines]:
+            labels.pop(key)[0].destroy()
+        in_order = list(labels) == [key for key in lines if key in labels]
+        added = []
+        for key, (text, font) in lines.items():
+            entry = labels.get(key)
+            if entry is None:
+                labels[key] = [tk.Label(parent, text=text, font=font), text]
+                added.append(key)
+            elif entry[1] != text:
+                entry[0].config(text=text)
+                entry[1] = text
+        new_at_end = list(lines)[len(lines) - len(added):] == added
+        if in_order and new_at_end:  #the usual case: nothing moved, new lines (a new day) come last
+            for key in added:
+                labels[key][0].pack()
+        elif added or not in_order:  #a line was added in the middle, so all of them are packed again in order
+            for key in lines:
+                labels[key][0].pack_forget()
+            for key in lines:
+                labels[key][0].pack()
+            self.data_labels[section] = {key: labels[key] for key in lines}
+
+    #empty the text fields of a screen (a screen that is shown again starts with empty fields)
+    def clear_entries(self, *entries):
+        for entry in entries:
+            entry.delete(0, "end")
 
     # ------------------- The Main Menu -------------------
     def build_main_menu(self):
-        self.clear_frame()
-        tk.Label(self.main_frame, text="Grand Prix Ticket Booking System", font=("Arial", 16)).pack(pady=10)
-        tk.Button(self.main_frame, text="Account Management", command=self.controller.show_account_menu).pack(pady=5)
-        tk.Button(self.main_frame, text="Ticket Purchasing", command=self.controller.show_ticket_menu).pack(pady=5)
-        tk.Button(self.main_frame, text="Admin Dashboard", command=self.controller.show_admin_menu).pack(pady=5)
+        self.show_screen("main", self.create_main_menu)
+
+    def create_main_menu(self, frame):
+        tk.Label(frame, text="Grand Prix Ticket Booking System", font=("Arial", 16)).pack(pady=10)
+        tk.Button(frame, text="Account Management", command=self.controller.show_account_menu).pack(pady=5)
+        tk.Button(frame, text="Ticket Purchasing", command=self.controller.show_ticket_menu).pack(pady=5)
+        tk.Button(frame, text="Admin Dashboard", command=self.controller.show_admin_menu).pack(pady=5)
 
     # ------------------- Account Management Screens -------------------
     def build_account_menu(self):
-        self.clear_frame()
-        tk.Label(self.main_frame, text="Account Management", font=("Arial", 14)).pack(pady=10)
-        tk.Button(self.main_frame, text="Add Account", command=self.controller.add_account_screen).pack(pady=5)
-        tk.Button(self.main_frame, text="Login", command=self.controller.login_screen).pack(pady=5)
-        tk.Button(self.main_frame, text="Edit Account", command=self.controller.edit_account_screen).pack(pady=5)
-        tk.Button(self.main_frame, text="Delete Account", command=self.controller.delete_account_screen).pack(pady=5)
-        tk.Button(self.main_frame, text="Display Customer Details", command=self.controller.display_customer_details).pack(pady=5)
-        tk.Button(self.main_frame, text="Delete Orders", command=self.controller.delete_orders_screen).pack(pady=5)
-        tk.Button(self.main_frame, text="Back to Main Menu", command=self.build_main_menu).pack(pady=10)
-
-    #generic form to handle add, edit, login operations
+        self.show_screen("account", self.create_account_menu)
+
+    def create_account_menu(self, frame):
+        tk.Label(frame, text="Account Management", font=("Arial", 14)).pack(pady=10)
+        tk.Button(frame, text="Add Account", command=self.controller.add_account_screen).pack(pady=5)
+        tk.Button(frame, text="Login", command=self.controller.login_screen).pack(pady=5)
+        tk.Button(frame, text="Edit Account", command=self.controller.edit_account_screen).pack(pady=5)
+        tk.Button(frame, text="Delete Account", command=self.controller.delete_account_screen).pack(pady=5)
+        tk.Button(frame, text="Display Customer Details", command=self.controller.display_customer_details).pack(pady=5)
+        tk.Button(frame, text="Delete Orders", command=self.controller.delete_orders_screen).pack(pady=5)
+        tk.Button(frame, text="Back to Main Menu", command=self.build_main_menu).pack(pady=10)
+
+    #generic form to handle add, edit, login operations (one screen per title)
     def account_form(self, title, button_text, action_callback):
-        self.clear_frame()
-        tk.Label(self.main_frame, text=title).pack(pady=5)
+        self.form_callbacks[title] = action_callback  #the button calls the callback of the last call
 
-        #username input
-        username_entry = tk.Entry(self.main_frame)
-        tk.Label(self.main_frame, text="Username").pack()
-        username_entry.pack()
+        def create_form(frame):
+            tk.Label(frame, text=title).pack(pady=5)
 
-        #password input (hidden for security)
-        password_entry = tk.Entry(self.main_frame, show="*")
-        tk.Label(self.main_frame, text="Password").pack()
-        password_entry.pack()
+            #username input
+            username_entry = tk.Entry(frame)
+            tk.Label(frame, text="Username").pack()
+            username_entry.pack()
 
-        #a submit button
-        tk.Button(self.main_frame, text=button_text,
-                  command=lambda: action_callback(username_entry.get(), password_entry.get())).pack(pady=10)
+            #password input (hidden for security)
+            password_entry = tk.Entry(frame, show="*")
+            tk.Label(frame, text="Password").pack()
+            password_entry.pack()
+            frame.entries = (username_entry, password_entry)
 
-        #back to account menu button
-        tk.Button(self.main_frame, text="Back", command=self.build_account_menu).pack(pady=5)
+            #a submit button
+            tk.Button(frame, text=button_text,
+                      command=lambda: self.form_callbacks[title](username_entry.get(), password_entry.get())).pack(pady=10)
+
+            #back to account menu button
+            tk.Button(frame, text="Back", command=self.build_account_menu).pack(pady=5)
+
+        frame = self.show_screen(f"form:{title}", create_form)
+        self.clear_entries(*frame.entries)
 
     #a form to delete a user account (you only need to write the username that you want it to be deleted)
     def delete_account_form(self, action_callback):
-        self.clear_frame()
-        tk.Label(self.main_frame, text="Delete Account").pack(pady=5)
+        self.delete_account_callback = action_callback
+
+        def create_form(frame):
+            tk.Label(frame, text="Delete Account").pack(pady=5)
+
+            username_entry = tk.Entry(frame)
+            tk.Label(frame, text="Username").pack()
+            username_entry.pack()
+            frame.entries = (username_entry,)
 
-        username_entry = tk.Entry(self.main_frame)
-        tk.Label(self.main_frame, text="Username").pack()
-        username_entry.pack()
+            tk.Button(frame, text="Delete",
+                      command=lambda: self.delete_account_callback(username_entry.get())).pack(pady=10)
 
-        tk.Button(self.main_frame, text="Delete",
-                  command=lambda: action_callback(username_entry.get())).pack(pady=10)
+            tk.Button(frame, text="Back", command=self.build_account_menu).pack(pady=5)
 
-        tk.Button(self.main_frame, text="Back", command=self.build_account_menu).pack(pady=5)
+        frame = self.show_screen("delete_account", create_form)
+        self.clear_entries(*frame.entries)
 
-    #display the list of customers and how many orders they placed
+    #display the list of customers, how many orders they placed and how much they spent
     def display_customers(self, customer_list):
-        self.clear_frame()
-        tk.Label(self.main_frame, text="Customer Details", font=("Arial", 14)).pack(pady=10)
-        for customer, orders in customer_list.items():
-            tk.Label(self.main_frame, text=f"{customer} - {orders} orders").pack()
-        tk.Button(self.main_frame, text="Back", command=self.build_account_menu).pack(pady=10)
-
-    #show all the orders and allow the user (not the customer) to delete any of them
-    def display_orders(self, orders_list, delete_callback):
-        self.clear_frame()
-        tk.Label(self.main_frame, text="Delete Orders", font=("Arial", 14)).pack(pady=10)
-
-        if not orders_list:
-            tk.Label(self.main_frame, text="No orders found.").pack(pady=5)
+        def create_screen(frame):
+            tk.Label(frame, text="Customer Details", font=("Arial", 14)).pack(pady=10)
+            frame.customers = tk.Frame(frame)
+            frame.customers.pack()
+            tk.Button(frame, text="Back", command=self.build_account_menu).pack(pady=10)
+
+        frame = self.show_screen("customers", create_screen)
+        self.update_labels("customers", frame.customers, {
+            customer: (f"{customer} - {stats['orders']} orders, {stats['quantity']} tickets (${stats['total_spent']})", None)
+            for customer, stats in customer_list.items()})
+
+    #show the orders page by page and allow the user (not the customer) to delete any of them
+    def display_orders(self, ticket_types, page_callback, delete_callback):
+        self.orders_page_callback = page_callback
+        self.orders_delete_callback = delete_callback
+        self.show_screen("orders", self.create_orders_screen)
+        self.orders_ticket_type.config(values=[""] + ticket_types)  #the filters are kept from the last visit
+
+    def create_orders_screen(self, frame):
+        tk.Label(frame, text="Delete Orders", font=("Arial", 14)).pack(pady=10)
+
+        #the filters (an empty field matches everything)
+        filters = tk.Frame(frame)
+        filters.pack(pady=5)
+        tk.Label(filters, text="Username").grid(row=0, column=0)
+        self.orders_username_entry = tk.Entry(filters, width=14)
+        self.orders_username_entry.grid(row=0, column=1, padx=5)
+        tk.Label(filters, text="Date (YYYY-MM-DD)").grid(row=0, column=2)
+        self.orders_date_entry = tk.Entry(filters, width=12)
+        self.orders_date_entry.grid(row=0, column=3, padx=5)
+        tk.Label(filters, text="Ticket Type").grid(row=0, column=4)
+        self.orders_ticket_type = ttk.Combobox(filters, values=[""], state="readonly", width=20)
+        self.orders_ticket_type.grid(row=0, column=5, padx=5)
+        tk.Button(filters, text="Filter", command=lambda: self.load_orders_page(0)).grid(row=0, column=6)
+
+        #the list itself, only the rows of the current page are created
+        columns = ("order_id", "username", "ticket_type", "quantity", "total_cost", "payment_method", "date")
+        self.orders_tree = ttk.Treeview(frame, columns=columns, show="headings",
+                                        height=15, selectmode="extended")
+        for column in columns:
+            self.orders_tree.heading(column, text=column.replace("_", " ").title())
+            self.orders_tree.column(column, width=70 if column in ("order_id", "quantity") else 110)
+        self.orders_tree.pack(padx=10)
+
+        #the page controls
+        pages = tk.Frame(frame)
+        pages.pack(pady=5)
+        tk.Button(pages, text="< Previous", command=lambda: self.load_orders_page(self.orders_offset - self.orders_page_size)).pack(side="left")
+        self.orders_page_label = tk.Label(pages, text="")
+        self.orders_page_label.pack(side="left", padx=10)
+        tk.Button(pages, text="Next >", command=lambda: self.load_orders_page(self.orders_offset + self.orders_page_size)).pack(side="left")
+
+        tk.Button(frame, text="Delete Selected",
+                  command=lambda: self.orders_delete_callback([int(key) for key in self.orders_tree.selection()])).pack(pady=5)
+        tk.Button(frame, text="Back", command=self.build_account_menu).pack(pady=10)
+
+    #ask the controller for a page of orders with the current filters
+    def load_orders_page(self, offset):
+        self.orders_page_callback(max(0, offset), self.orders_username_entry.get(),
+                                  self.orders_date_entry.get(), self.orders_ticket_type.get())
+
+    #load the current page again (after a delete)
+    def refresh_orders_page(self):
+        self.load_orders_page(self.orders_offset)
+
+    #put the rows of one page into the list (every row is named after its order id)
+    def show_orders_page(self, offset, total, rows):
+        self.orders_offset = offset
+        self.orders_tree.delete(*self.orders_tree.get_children())
+        for order_id, order in rows:
+            self.orders_tree.insert("", "end", iid=str(order_id),
+                                    values=(order_id, order["username"], order["ticket_type"], order["quantity"],
+                                            f"${order['total_cost']}", order["payment_method"], order["date"]))
+        if total:
+            last = offset + len(rows)
+            self.orders_page_label.config(text=f"Orders {offset + 1}-{last} of {total}")
         else:
-            for i, order in enumerate(orders_list):
-                order_text = f"{i+1}. {order['username']} - {order['ticket_type']} x{order['quantity']} (${order['total_cost']})"
-                tk.Button(self.main_frame, text=order_text, command=lambda idx=i: delete_callback(idx)).pack(pady=2)
-
-        tk.Button(self.main_frame, text="Back", command=self.build_account_menu).pack(pady=10)
+            self.orders_page_label.config(text="No orders found.")
 
     # ------------------- Ticket Purchase Screen -------------------
-    def build_ticket_menu(self, tickets):
-        self.clear_frame()
-        tk.Label(self.main_frame, text="Ticket Purchasing", font=("Arial", 14)).pack(pady=10)
+    def build_ticket_menu(self, tickets, seats=None, race_date=None):
+        frame = self.show_screen("tickets", self.create_ticket_menu)
 
-        #show all the ticket types
+        #show all the ticket types (and the seats left on the race day), only the texts are changed
+        seats = seats or {}
         for ticket_type, info in tickets.items():
             text = f"{ticket_type} - ${info['price']} ({info['validity']})\nFeatures: {info['features']}"
-            tk.Radiobutton(self.main_frame, text=text, variable=self.selected_ticket,
-                           value=ticket_type, justify="left").pack(anchor="w")
+            if seats.get(ticket_type) is not None:
+                text += f"\n{seats[ticket_type]} left on {race_date}" if seats[ticket_type] else f"\nSold out on {race_date}"
+            if ticket_type not in self.ticket_texts:  #a ticket type that was not there before
+                self.ticket_texts[ticket_type] = tk.StringVar()
+                tk.Radiobutton(frame.ticket_types, textvariable=self.ticket_texts[ticket_type],
+                               variable=self.selected_ticket, value=ticket_type, justify="left").pack(anchor="w")
+            self.ticket_texts[ticket_type].set(text)
+        self.clear_entries(self.quantity_entry)
+
+    def create_ticket_menu(self, frame):
+        tk.Label(frame, text="Ticket Purchasing", font=("Arial", 14)).pack(pady=10)
+        frame.ticket_types = tk.Frame(frame)  #filled by build_ticket_menu
+        frame.ticket_types.pack(anchor="w")
+
+        #the race day, the seats above are shown for this day
+        tk.Label(frame, text="Race Day (YYYY-MM-DD, empty = today)").pack()
+        tk.Entry(frame, textvariable=self.race_date).pack(pady=5)
+        tk.Button(frame, text="Show Seats", command=self.controller.show_ticket_menu).pack()
 
         #quantity input
-        tk.Label(self.main_frame, text="Select Quantity").pack()
-        self.quantity_entry = tk.Entry(self.main_frame)
+        tk.Label(frame, text="Select Quantity").pack()
+        self.quantity_entry = tk.Entry(frame)
         self.quantity_entry.pack(pady=5)
 
         #the payment method selection
-        tk.Label(self.main_frame, text="Payment Method").pack()
-        tk.Radiobutton(self.main_frame, text="Credit Card", variable=self.payment_method, value="Credit Card").pack()
-        tk.Radiobutton(self.main_frame, text="Debit Card", variable=self.payment_method, value="Debit Card").pack()
+        tk.Label(frame, text="Payment Method").pack()
+        tk.Radiobutton(frame, text="Credit Card", variable=self.payment_method, value="Credit Card").pack()
+        tk.Radiobutton(frame, text="Debit Card", variable=self.payment_method, value="Debit Card").pack()
 
         #the submit purchase button
-        tk.Button(self.main_frame, text="Submit Purchase", command=self.controller.purchase_ticket).pack(pady=10)
-        tk.Button(self.main_frame, text="Back", command=self.build_main_menu).pack(pady=10)
+        tk.Button(frame, text="Submit Purchase", command=self.controller.purchase_ticket).pack(pady=10)
+        tk.Button(frame, text="Back", command=self.build_main_menu).pack(pady=10)
 
     # ------------------- Admin Dashboard Screen -------------------
-    def build_admin_menu(self, ticket_sales_summary):
-        self.clear_frame()
-        tk.Label(self.main_frame, text="Admin Dashboard", font=("Arial", 16)).pack(pady=10)
-        tk.Label(self.main_frame, text="Tickets Sold Per Day", font=("Arial", 12, "underline")).pack(pady=5)
+    def build_admin_menu(self, ticket_sales_summary, sales_summary, performance=None, ticket_types=(), prices=None):
+        frame = self.show_screen("admin", self.create_admin_menu)
 
-        #show the grouped sales by date and type
+        #the grouped sales by date and type
+        lines = {}
         for date, sales in ticket_sales_summary.items():
-            tk.Label(self.main_frame, text=f"Date: {date}", font=("Arial", 10, "bold")).pack()
+            lines[("date", date)] = (f"Date: {date}", ("Arial", 10, "bold"))
             for ticket_type, qty in sales.items():
-                tk.Label(self.main_frame, text=f"  {ticket_type}: {qty} tickets").pack()
+                lines[("tickets", date, ticket_type)] = (f"  {ticket_type}: {qty} tickets", None)
+            lines[("revenue", date)] = (f"  Revenue: ${sales_summary['revenue_by_date'].get(date, 0)}", None)
+        self.update_labels("admin_days", frame.days, lines)
+
+        #the revenue per ticket type and per payment method
+        lines = {("ticket_type", ticket_type): (f"{ticket_type}: ${revenue}", None)
+                 for ticket_type, revenue in sales_summary["revenue_by_ticket_type"].items()}
+        lines.update((("payment_method", payment_method), (f"Paid by {payment_method}: ${revenue}", None))
+                     for payment_method, revenue in sales_summary["revenue_by_payment_method"].items())
+        self.update_labels("admin_revenue", frame.revenue, lines)
+
+        self.export_ticket_type.config(values=[""] + list(ticket_types))
+        self.discount_ticket_type.config(values=[""] + list(ticket_types))
+
+        #the current prices and the discount rules that make them
+        if prices is not None:
+            lines = {"version": (f"Price version {prices['version']}", ("Arial", 10, "bold"))}
+            lines.update((("price", ticket_type), (f"{ticket_type}: ${price} (normally ${prices['base_prices'][ticket_type]})",
+                                                   None))
+                         for ticket_type, price in prices["prices"].items())
+            lines.update((("rule", rule["name"]), (self.describe_discount(rule), None)) for rule in prices["rules"])
+            self.update_labels("admin_prices", frame.prices, lines)
+
+        #the performance metrics (only when the program was started with --metrics)
+        if performance is None:
+            lines = {"off": ("Metrics are off.", None)}
+        else:
+            lines = {("operation", name): (f"{name}: {stats['count']} calls, mean {stats['mean_ms']:.2f} ms, "
+                                           f"max {stats['max_ms']:.2f} ms", None)
+                     for name, stats in performance["operations"].items()}
+            lines.update((("file", file_name), (f"{file_name}: {totals['read']} bytes read, "
+                                                f"{totals['written']} bytes written", None))
+                         for file_name, totals in performance["files"].items())
+            frame.save_metrics.pack(pady=5)
+        self.update_labels("admin_performance", frame.performance, lines)
+
+    def create_admin_menu(self, frame):
+        tk.Label(frame, text="Admin Dashboard", font=("Arial", 16)).pack(pady=10)
+        tk.Label(frame, text="Tickets Sold Per Day", font=("Arial", 12, "underline")).pack(pady=5)
+        frame.days = tk.Frame(frame)  #the lines are filled in by build_admin_menu
+        frame.days.pack()
+
+        #the revenue per ticket type and per payment method
+        tk.Label(frame, text="\nRevenue", font=("Arial", 12, "underline")).pack(pady=5)
+        frame.revenue = tk.Frame(frame)
+        frame.revenue.pack()
+
+        #the sales between two dates (answered by the model's date index)
+        tk.Label(frame, text="\nSales Between Dates", font=("Arial", 12, "underline")).pack(pady=5)
+        dates = tk.Frame(frame)
+        dates.pack()
+        tk.Label(dates, text="From (YYYY-MM-DD)").grid(row=0, column=0)
+        from_entry = tk.Entry(dates, width=12)
+        from_entry.grid(row=0, column=1, padx=5)
+        tk.Label(dates, text="To").grid(row=0, column=2)
+        to_entry = tk.Entry(dates, width=12)
+        to_entry.grid(row=0, column=3, padx=5)
+        tk.Button(dates, text="Show",
+                  command=lambda: self.controller.show_sales_between(from_entry.get(), to_entry.get())).grid(row=0, column=4)
+        self.sales_range = tk.StringVar()
+        tk.Label(frame, textvariable=self.sales_range, justify="left").pack()
+
+        #export the orders or the sales report to a file (runs in the background)
+        tk.Label(frame, text="\nExport", font=("Arial", 12, "underline")).pack(pady=5)
+        export = tk.Frame(frame)
+        export.pack()
+        tk.Label(export, text="Username").grid(row=0, column=0)
+        export_user = tk.Entry(export, width=12)
+        export_user.grid(row=0, column=1, padx=5)
+        tk.Label(export, text="Ticket Type").grid(row=0, column=2)
+        self.export_ticket_type = ttk.Combobox(export, values=[""], state="readonly", width=20)
+        self.export_ticket_type.grid(row=0, column=3, padx=5)
+        compress = tk.BooleanVar()
+        tk.Checkbutton(export, text="gzip", variable=compress).grid(row=0, column=4)
+        tk.Label(export, text="The From and To dates above are used too.", fg="gray").grid(row=1, column=0, columnspan=5)
+
+        #ask for the file and start the export, the file type chooses CSV or JSON Lines
+        def start_export(report):
+            file_name = filedialog.asksaveasfilename(
+                title="Export", defaultextension=".csv",
+                initialfile="sales_report.csv" if report else "orders.csv",
+                filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("All files", "*.*")])
+            if file_name:
+                file_format = "jsonl" if file_name.endswith(".jsonl") else "csv"
+                self.controller.start_export(file_name, report, file_format, compress.get(), from_entry.get(),
+                                             to_entry.get(), export_user.get(), self.export_ticket_type.get())
+
+        buttons = tk.Frame(frame)
+        buttons.pack(pady=5)
+        tk.Button(buttons, text="Export Orders", command=lambda: start_export(False)).pack(side="left", padx=5)
+        tk.Button(buttons, text="Export Sales Report", command=lambda: start_export(True)).pack(side="left", padx=5)
+        tk.Button(buttons, text="Cancel Export", command=self.controller.cancel_export).pack(side="left", padx=5)
+        tk.Label(frame, textvariable=self.export_progress).pack()
 
         #the buttons to apply or disable discounts
-        tk.Label(self.main_frame, text="\nDiscount Options", font=("Arial", 12, "underline")).pack(pady=10)
-        tk.Button(self.main_frame, text="Apply 50% Discount to ALL Tickets", command=self.controller.apply_discount).pack(pady=5)
-        tk.Button(self.main_frame, text="Disable Discount for ALL Tickets", command=self.controller.disable_discount).pack(pady=5)
+        tk.Label(frame, text="\nDiscount Options", font=("Arial", 12, "underline")).pack(pady=10)
+        frame.prices = tk.Frame(frame)  #the current prices and discounts, filled in by build_admin_menu
+        frame.prices.pack()
+        tk.Button(frame, text="Apply 50% Discount to ALL Tickets", command=self.controller.apply_discount).pack(pady=5)
+        tk.Button(frame, text="Disable Discount for ALL Tickets", command=self.controller.disable_discount).pack(pady=5)
+
+        #a discount for one ticket type (empty = all) that starts and ends at a given time (empty = no limit)
+        discount = tk.Frame(frame)
+        discount.pack(pady=5)
+        tk.Label(discount, text="Name").grid(row=0, column=0)
+        discount_name = tk.Entry(discount, width=16)
+        discount_name.grid(row=0, column=1, padx=5)
+        tk.Label(discount, text="Ticket Type").grid(row=0, column=2)
+        self.discount_ticket_type = ttk.Combobox(discount, values=[""], state="readonly", width=20)
+        self.discount_ticket_type.grid(row=0, column=3, padx=5)
+        tk.Label(discount, text="Percent").grid(row=0, column=4)
+        discount_percent = tk.Entry(discount, width=5)
+        discount_percent.grid(row=0, column=5, padx=5)
+        tk.Label(discount, text="Starts").grid(row=1, column=0)
+        discount_start = tk.Entry(discount, width=16)
+        discount_start.grid(row=1, column=1, padx=5)
+        tk.Label(discount, text="Ends").grid(row=1, column=2)
+        discount_end = tk.Entry(discount, width=16)
+        discount_end.grid(row=1, column=3, padx=5)
+        tk.Label(discount, text="YYYY-MM-DD [HH:MM]", fg="gray").grid(row=1, column=4, columnspan=2)
+        discount_buttons = tk.Frame(frame)
+        discount_buttons.pack()
+        tk.Button(discount_buttons, text="Add Discount",
+                  command=lambda: self.controller.add_discount_rule(
+                      discount_name.get(), self.discount_ticket_type.get(), discount_percent.get(),
+                      discount_start.get(), discount_end.get())).pack(side="left", padx=5)
+        tk.Button(discount_buttons, text="Remove Discount (by Name)",
+                  command=lambda: self.controller.remove_discount_rule(discount_name.get())).pack(side="left", padx=5)
+
+        #the performance metrics (the button is only shown when the program was started with --metrics)
+        tk.Label(frame, text="\nPerformance", font=("Arial", 12, "underline")).pack(pady=5)
+        frame.performance = tk.Frame(frame)
+        frame.performance.pack()
+        performance_buttons = tk.Frame(frame)
+        performance_buttons.pack()
+        frame.save_metrics = tk.Button(performance_buttons, text="Save Metrics to JSON", command=self.controller.dump_metrics)
 
         #a button to return to the main menu
-        tk.Button(self.main_frame, text="Back", command=self.build_main_menu).pack(pady=20)
+        tk.Button(frame, text="Back", command=self.build_main_menu).pack(pady=20)
+
+    #one line about a discount rule, for example "Early bird: 20% off Weekend Package from 2025-05-01 00:00"
+    def describe_discount(self, rule):
+        text = f"{rule['name']}: {rule['percent']}% off {', '.join(rule['ticket_types'] or ['all tickets'])}"
+        for word, moment in (("from", rule["start"]), ("until", rule["end"])):
+            if moment is not None:
+                text += f" {word} {datetime.fromtimestamp(moment).strftime('%Y-%m-%d %H:%M')}"
+        return text
+
+    #show the result of a date range query below the From and To fields
+    def show_sales_range(self, sales):
+        lines = [f"{sales['quantity']} tickets, ${sales['revenue']}"]
+        for group in ("ticket_type", "payment_method"):
+            for name, totals in sales[group].items():
+                lines.append(f"{name}: {totals['quantity']} tickets, ${totals['revenue']}")
+        self.sales_range.set("\n".join(lines))
+
+    #show how far the export is (also when another screen is open, the next Admin Dashboard shows it)
+    def show_export_progress(self, msg):
+        self.export_progress.set(msg)
 
     # ------------------- the popups messages -------------------
     def show_message(self, title, msg):
         messagebox.showinfo(title, msg)  # show a success/info message
 
     def show_error(self, title, msg):
-        messagebox.showerror(title, msg)  # show a error message
\ No newline at end of file
+        messagebox.showerror(title, msg)  # show a error message
+
+    def show_status(self, msg):
+        self.status.set(msg)  # update the status line